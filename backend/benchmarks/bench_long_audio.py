@@ -0,0 +1,128 @@
+"""
+Long Audio Benchmark
+Measures prosody analysis time and peak RSS for synthetic recordings of
+increasing length, and checks the blockwise features against whole-signal
+Librosa on a short clip.
+
+Usage:
+    cd backend
+    python -m benchmarks.bench_long_audio --minutes 10 60 --budget-mb 256
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import soundfile as sf
+
+from services.prosody_analyzer import ProsodyAnalyzer
+
+
+def write_speech_like(path: str, minutes: float, sr: int = 44100, seed: int = 0):
+    """
+    Write a voiced/silent pattern (gliding harmonics, syllable-rate envelope,
+    0.3-1.5 s gaps) to a WAV file one second at a time
+    """
+    rng = np.random.default_rng(seed)
+    with sf.SoundFile(path, 'w', samplerate=sr, channels=1, subtype='PCM_16') as out:
+        t0 = 0
+        for _ in range(int(minutes * 60)):
+            t = (t0 + np.arange(sr)) / sr
+            f0 = 140 + 40 * np.sin(2 * np.pi * 0.2 * t)
+            phase = 2 * np.pi * np.cumsum(f0) / sr
+            voice = sum(np.sin(k * phase) / k for k in range(1, 6))
+            envelope = 0.5 * (1 + np.sin(2 * np.pi * 4 * t)) * 0.3
+            if rng.random() < 0.3:
+                gap = int(rng.uniform(0.3, 1.0) * sr)
+                envelope[-gap:] = 0
+            noise = rng.normal(0, 1e-3, sr)
+            out.write((voice * envelope + noise).astype(np.float32))
+            t0 += sr
+
+
+def run_one(audio_path: str, budget_mb: float):
+    """Child process: analyze once and report time and peak RSS as JSON"""
+    analyzer = ProsodyAnalyzer(memory_budget_mb=budget_mb)
+    start = time.perf_counter()
+    metrics = analyzer.analyze(audio_path)
+    elapsed = time.perf_counter() - start
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({
+        'seconds': elapsed,
+        'peak_rss_mb': peak_kb / 1024,
+        'pauses': metrics.pause_count,
+        'wpm': metrics.speech_rate_wpm,
+    }))
+
+
+def check_exact(audio_path: str, budget_mb: float):
+    """Compare blockwise frame features with whole-signal Librosa"""
+    import librosa
+    from services.audio_io import decode_to_spool
+
+    analyzer = ProsodyAnalyzer(memory_budget_mb=budget_mb)
+    with decode_to_spool(audio_path, analyzer.sample_rate) as pcm:
+        y = pcm.read(0, len(pcm))
+        pitch, rms, onset_mean, onset_median = analyzer._extract_frame_features(pcm)
+
+    sr, hop = analyzer.sample_rate, analyzer.hop_length
+    pitches, mags = librosa.piptrack(y=y, sr=sr, hop_length=hop, fmin=75, fmax=400)
+    ref_pitch = pitches[mags.argmax(axis=0), np.arange(pitches.shape[1])]
+    ref_rms = librosa.feature.rms(y=y, hop_length=hop)[0]
+    ref_mean = librosa.onset.onset_strength(y=y, sr=sr, hop_length=hop)
+    ref_median = librosa.onset.onset_strength(y=y, sr=sr, hop_length=hop, aggregate=np.median)
+    ref_intervals = librosa.effects.split(y, top_db=analyzer.silence_threshold_db)
+
+    for name, ours, ref in [
+        ('pitch', pitch, ref_pitch), ('rms', rms, ref_rms),
+        ('onset mean', onset_mean, ref_mean), ('onset median', onset_median, ref_median),
+        ('intervals', analyzer._split_nonsilent(rms, len(y)), ref_intervals),
+    ]:
+        error = np.max(np.abs(ours - ref)) if ours.shape == ref.shape else float('nan')
+        print(f"  {name:<13} shape {str(ours.shape):<14} max abs diff {error:.3g}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--minutes', type=float, nargs='+', default=[1, 10, 60])
+    parser.add_argument('--budget-mb', type=float, default=256.0)
+    parser.add_argument('--check-minutes', type=float, default=0.5,
+                        help="Length of the clip compared with whole-signal Librosa (0 = skip)")
+    parser.add_argument('--run', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_one(args.run, args.budget_mb)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.check_minutes:
+            # A small budget forces many block boundaries
+            path = os.path.join(tmp, 'check.wav')
+            write_speech_like(path, args.check_minutes)
+            print(f"Blockwise vs whole-signal ({args.check_minutes:g} min, 8 MB budget):")
+            check_exact(path, budget_mb=8)
+
+        print(f"{'audio':>6} {'seconds':>8} {'peak RSS MB':>12} {'pauses':>7} {'wpm':>5}")
+        for minutes in args.minutes:
+            path = os.path.join(tmp, f'{minutes:g}min.wav')
+            write_speech_like(path, minutes)
+            out = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.bench_long_audio',
+                 '--run', path, '--budget-mb', str(args.budget_mb)],
+                capture_output=True, text=True, check=True
+            )
+            result = json.loads(out.stdout.strip().splitlines()[-1])
+            print(f"{minutes:>5.0f}m {result['seconds']:>8.1f} {result['peak_rss_mb']:>12.0f} "
+                  f"{result['pauses']:>7} {result['wpm']:>5}")
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
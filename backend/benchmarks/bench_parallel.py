@@ -0,0 +1,99 @@
+"""
+Parallel Efficiency Benchmark
+Runs N analyses at once in separate processes with the libraries' default
+thread pools, with per-process thread budgets, and with budgets plus CPU
+pinning, and compares them with running the same analyses one after another.
+
+Parallel efficiency = (N x single-thread job time) / (cores x wall time),
+i.e. the fraction of the machine doing useful work.
+
+Usage:
+    cd backend
+    python -m benchmarks.bench_parallel --jobs 4 --minutes 1
+    python -m benchmarks.bench_parallel --jobs 8 --stub-asr   # DSP only
+"""
+
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+
+from benchmarks.bench_long_audio import write_speech_like
+from services.thread_budget import ThreadBudget, available_cpus, cpu_summary, physical_cores, plan_budgets
+
+
+def _job(audio_path: str, budget, repeat: int, barrier, results):
+    """Child process: apply the budget, warm up, then time `repeat` analyses"""
+    from services.thread_budget import apply_budget
+    if budget is not None:
+        apply_budget(budget)
+
+    from services.filler_detector import FillerDetector
+    from services.pipeline import analyze_file
+    FillerDetector(model_size="small")  # Load the model outside the timing
+
+    barrier.wait()
+    start = time.time()
+    for _ in range(repeat):
+        analyze_file(audio_path)
+    results.put((start, time.time()))
+
+
+def run(audio_path: str, budgets, repeat: int = 1) -> float:
+    """Wall time for one process per budget, started together"""
+    context = multiprocessing.get_context('spawn')
+    barrier = context.Barrier(len(budgets))
+    results = context.Queue()
+    processes = [
+        context.Process(target=_job, args=(audio_path, budget, repeat, barrier, results))
+        for budget in budgets
+    ]
+    for process in processes:
+        process.start()
+    spans = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    return max(end for _, end in spans) - min(start for start, _ in spans)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--jobs', type=int, default=max(2, len(physical_cores()) // 2))
+    parser.add_argument('--minutes', type=float, default=1.0, help="Length of each analyzed clip")
+    parser.add_argument('--stub-asr', action='store_true', help="Replace Whisper with the stub model")
+    args = parser.parse_args()
+
+    # Gemini is remote I/O, not CPU: answer instantly
+    os.environ['SPEAKEASY_GEMINI_STUB'] = '1'
+    os.environ['SPEAKEASY_GEMINI_STUB_LATENCY'] = '0'
+    if args.stub_asr:
+        os.environ['SPEAKEASY_ASR_STUB'] = '1'
+
+    n_cpus = len(available_cpus())
+    n_cores = len(physical_cores())
+    print(f"{cpu_summary()}; {args.jobs} analyses of {args.minutes:g} min")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        audio_path = os.path.join(tmp, 'speech.wav')
+        write_speech_like(audio_path, args.minutes)
+
+        single_thread = run(audio_path, [ThreadBudget(1)])
+        serial = run(audio_path, [ThreadBudget(n_cpus)], repeat=args.jobs)
+        configs = [
+            ('serial (all cores)', serial),
+            ('parallel, default pools', run(audio_path, [None] * args.jobs)),
+            ('parallel, budgeted', run(audio_path, plan_budgets(args.jobs))),
+            ('parallel, budgeted + pinned', run(audio_path, plan_budgets(args.jobs, pin=True))),
+        ]
+
+    print(f"\nsingle job, 1 thread: {single_thread:.1f}s")
+    print(f"{'mode':<30} {'wall s':>8} {'jobs/min':>9} {'speedup':>8} {'efficiency':>11}")
+    for name, wall in configs:
+        efficiency = args.jobs * single_thread / (n_cores * wall)
+        print(f"{name:<30} {wall:>8.1f} {args.jobs / wall * 60:>9.2f} "
+              f"{serial / wall:>7.2f}x {efficiency:>10.0%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+"""
+Serialization Benchmark
+Compares encoding time and payload size of the analysis response for the
+previous Pydantic path and the direct JSON / MessagePack encoders, with and
+without gzip.
+
+Usage:
+    cd backend
+    python -m benchmarks.bench_serialization --minutes 60 --repeat 20
+"""
+
+import argparse
+import gzip
+import time
+from datetime import datetime
+
+import numpy as np
+
+from main import AnalysisResult
+from services.explainability import ExplainabilityEngine, TimelineMarker, AnalysisScores
+from services.filler_detector import FillerWord
+from services.prosody_analyzer import ProsodyMetrics
+from services.serialization import build_payload, encode_json, encode_msgpack, decode_msgpack
+
+
+def make_inputs(minutes: float, seed: int = 0):
+    """Synthetic service outputs shaped like a talk of the given length"""
+    rng = np.random.default_rng(seed)
+    duration = minutes * 60
+    colors = ExplainabilityEngine.COLORS
+
+    n_fillers = int(minutes * 6)
+    filler_starts = np.sort(rng.uniform(0, duration, n_fillers))
+    fillers = [
+        FillerWord(word='este', start=float(s), end=float(s + 0.3), confidence=float(c))
+        for s, c in zip(filler_starts, rng.uniform(0.5, 1.0, n_fillers))
+    ]
+
+    n_pauses = int(minutes * 8)
+    pauses = np.sort(rng.uniform(0, duration, n_pauses)).tolist()
+
+    markers = [
+        TimelineMarker(f.start, f.end, 'filler', 'medium', colors['filler'],
+                       f"Muletilla: '{f.word}'", "Palabra de relleno detectada (80% confianza).")
+        for f in fillers
+    ]
+    markers += [
+        TimelineMarker(p, p + 0.8, 'pause', 'low', colors['pause'],
+                       "Pausa prolongada", "Silencio detectado > 0.8s.")
+        for p in pauses
+    ]
+    kinds = ['fast', 'slow', 'nervous', 'confident']
+    for start in np.arange(0, duration, 7.0):
+        kind = kinds[int(rng.integers(len(kinds)))]
+        markers.append(TimelineMarker(float(start), float(start + 3), kind, 'low',
+                                      colors[kind], "Tramo", "Ventana de análisis local."))
+    markers.sort(key=lambda m: m.start)
+
+    prosody = ProsodyMetrics(
+        pitch_mean=160.0, pitch_std=35.0, tempo_bpm=110.0,
+        pause_count=n_pauses, pause_locations=pauses,
+        energy_variance=0.3, speech_rate_wpm=135,
+        pitch_contour=np.round(rng.uniform(80, 300, 200), 1).tolist(),
+        energy_contour=np.round(rng.uniform(0, 1, 200), 3).tolist(),
+        contour_hop_seconds=duration / 200,
+    )
+    report = {
+        'scores': AnalysisScores(7.5, 8.0, 6.5, 3.0),
+        'timeline_markers': markers,
+        'recommendations': ["Recomendación de ejemplo."] * 6,
+    }
+    transcription = "palabra " * int(minutes * 130)
+    return report, fillers, prosody, transcription, duration
+
+
+def pydantic_encode(report, fillers, prosody, transcription, duration) -> bytes:
+    """The previous response path: nested models + FastAPI-style JSON dump"""
+    result = AnalysisResult(
+        scores=vars(report['scores']),
+        timelineMarkers=[vars(m) for m in report['timeline_markers']],
+        fillerWords=[vars(f) for f in fillers],
+        prosodyMetrics=dict(
+            pitchMean=prosody.pitch_mean, pitchStd=prosody.pitch_std,
+            tempoBpm=prosody.tempo_bpm, pauseCount=prosody.pause_count,
+            pauseLocations=prosody.pause_locations, energyVariance=prosody.energy_variance,
+            speechRateWpm=prosody.speech_rate_wpm, pitchContour=prosody.pitch_contour,
+            energyContour=prosody.energy_contour, contourHopSeconds=prosody.contour_hop_seconds,
+        ),
+        recommendations=report['recommendations'],
+        transcription=transcription,
+        duration=duration,
+        analyzedAt=datetime.now().isoformat(),
+    )
+    return result.model_dump_json().encode('utf-8')
+
+
+def timed(fn, repeat: int):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - start)
+    return out, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--minutes', type=float, nargs='+', default=[1, 10, 60])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'talk':>6} {'encoder':<10} {'encode ms':>10} {'bytes':>10} {'gzip bytes':>11} {'gzip ms':>8}")
+    for minutes in args.minutes:
+        report, fillers, prosody, transcription, duration = make_inputs(minutes)
+        analyzed_at = datetime.now().isoformat()
+
+        def direct():
+            return build_payload(report, fillers, prosody, report['recommendations'],
+                                 transcription, duration, analyzed_at)
+
+        encoders = {
+            'pydantic': lambda: pydantic_encode(report, fillers, prosody, transcription, duration),
+            'json': lambda: encode_json(direct()),
+            'msgpack': lambda: encode_msgpack(direct()),
+        }
+        for name, fn in encoders.items():
+            body, seconds = timed(fn, args.repeat)
+            packed, gzip_seconds = timed(lambda: gzip.compress(body, compresslevel=6), args.repeat)
+            print(f"{minutes:>5.0f}m {name:<10} {seconds * 1000:>10.2f} {len(body):>10} "
+                  f"{len(packed):>11} {gzip_seconds * 1000:>8.2f}")
+
+        # Round-trip sanity check of the binary format
+        decoded = decode_msgpack(encode_msgpack(direct()))
+        assert len(decoded['timelineMarkers']) == len(report['timeline_markers'])
+        assert len(decoded['fillerWords']) == len(fillers)
+
+
+if __name__ == '__main__':
+    main()
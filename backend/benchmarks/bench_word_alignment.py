@@ -0,0 +1,48 @@
+"""
+Word Alignment Benchmark
+Times filler detection + transcription with Whisper's word-timestamp pass
+('whisper'), with every window aligned ('full') and with only the windows
+holding filler candidates aligned ('candidates'), and checks that the last
+two report identical filler times.
+
+Needs real speech recordings (synthetic tones don't transcribe to words).
+
+Usage:
+    cd backend
+    python -m benchmarks.bench_word_alignment --audio talk1.m4a talk2.wav --model small
+"""
+
+import argparse
+import time
+
+from services.filler_detector import ALIGNMENT_MODES, FillerDetector
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--audio', nargs='+', required=True, help="Speech recordings")
+    parser.add_argument('--model', default='small', help="Whisper model size")
+    args = parser.parse_args()
+
+    print(f"{'file':<28} {'mode':<11} {'seconds':>8} {'fillers':>8}")
+    for path in args.audio:
+        detector = FillerDetector(model_size=args.model)
+        audio = detector.load_audio(path)
+        language = detector.detect_language(audio)
+
+        results = {}
+        for mode in ALIGNMENT_MODES:
+            detector.alignment = mode
+            start = time.perf_counter()
+            fillers, _, _ = detector.analyze(audio, language)
+            elapsed = time.perf_counter() - start
+            results[mode] = fillers
+            print(f"{path[-28:]:<28} {mode:<11} {elapsed:>8.1f} {len(fillers):>8}")
+
+        same = [(f.word, f.start, f.end) for f in results['candidates']] == \
+               [(f.word, f.start, f.end) for f in results['full']]
+        print(f"{'':<28} candidates == full: {'yes' if same else 'NO'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,348 @@
+"""
+Accuracy vs Speed Evaluation
+Runs a local corpus through each analysis configuration (Whisper model,
+beam size, word alignment mode, prosody sample rate) and compares its scores,
+WPM, pause count and filler words with a reference configuration, next to
+wall time, realtime factor and peak memory. Configurations on the Pareto
+front of speed vs score deviation are marked, to choose production defaults.
+
+Corpus: a directory of recordings. An optional sidecar JSON per file
+(talk.m4a -> talk.json) holds human labels:
+    {"fillers": [{"word": "este", "start": 12.3, "end": 12.6}], "wpm": 140, "pauses": 9}
+When present, filler precision/recall and WPM/pause errors are also
+measured against the labels.
+
+Configurations: JSON list of objects with a "name" and any of the keys in
+CONFIG_ENV (default: DEFAULT_CONFIGS); the first is the reference unless
+--reference is given.
+
+Usage:
+    cd backend
+    python -m benchmarks.evaluate_tiers --corpus data/eval
+    python -m benchmarks.evaluate_tiers --corpus data/eval --configs tiers.json --reference large
+"""
+
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import queue
+import resource
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+# Configuration keys and the environment variables the pipeline reads them from
+CONFIG_ENV = {
+    'asr_model': 'SPEAKEASY_ASR_MODEL',
+    'beam_size': 'SPEAKEASY_ASR_BEAM_SIZE',
+    'alignment': 'SPEAKEASY_WORD_ALIGNMENT',
+    'prosody_sample_rate': 'SPEAKEASY_PROSODY_SAMPLE_RATE',
+}
+
+DEFAULT_CONFIGS = [
+    {'name': 'reference', 'asr_model': 'medium', 'beam_size': 5, 'alignment': 'full', 'prosody_sample_rate': 44100},
+    {'name': 'production', 'asr_model': 'small', 'beam_size': 5, 'alignment': 'candidates', 'prosody_sample_rate': 44100},
+    {'name': 'small-greedy', 'asr_model': 'small', 'beam_size': 1, 'alignment': 'candidates', 'prosody_sample_rate': 44100},
+    {'name': 'small-dsp22k', 'asr_model': 'small', 'beam_size': 5, 'alignment': 'candidates', 'prosody_sample_rate': 22050},
+    {'name': 'base', 'asr_model': 'base', 'beam_size': 5, 'alignment': 'candidates', 'prosody_sample_rate': 44100},
+    {'name': 'base-greedy-dsp16k', 'asr_model': 'base', 'beam_size': 1, 'alignment': 'candidates', 'prosody_sample_rate': 16000},
+    {'name': 'tiny-greedy', 'asr_model': 'tiny', 'beam_size': 1, 'alignment': 'candidates', 'prosody_sample_rate': 22050},
+]
+
+SCORES = ('confidence', 'clarity', 'pacing', 'nervousness')
+
+# How often the parent checks that a configuration's process is still alive (s)
+POLL_SECONDS = 5
+AUDIO_EXTENSIONS = ('wav', 'm4a', 'mp3', 'ogg', 'flac', 'webm')
+
+
+def find_corpus(directory: str) -> List[Dict]:
+    """Recordings in `directory` with their labels (if any)"""
+    items = []
+    for path in sorted(glob.glob(os.path.join(directory, '*'))):
+        stem, ext = os.path.splitext(path)
+        if ext.lstrip('.').lower() not in AUDIO_EXTENSIONS:
+            continue
+        labels = None
+        if os.path.exists(stem + '.json'):
+            with open(stem + '.json') as f:
+                labels = json.load(f)
+        items.append({'path': path, 'labels': labels})
+    return items
+
+
+def run_config(config: Dict, paths: List[str], results):
+    """
+    Child process: analyze every file with one configuration
+
+    Uses the production pipeline with the Gemini stub (no latency) and
+    reports the acoustic-only scores, so semantic fusion doesn't mask
+    acoustic differences.
+    """
+    for key, env in CONFIG_ENV.items():
+        if key in config:
+            os.environ[env] = str(config[key])
+    os.environ['SPEAKEASY_GEMINI_STUB'] = '1'
+    os.environ['SPEAKEASY_GEMINI_STUB_LATENCY'] = '0'
+
+    from services.explainability import ExplainabilityEngine
+    from services.filler_detector import FillerDetector
+    from services.pipeline import analyze_file
+
+    # Model load is a one-off cost, not per-analysis time
+    start = time.perf_counter()
+    FillerDetector(model_size=os.environ.get('SPEAKEASY_ASR_MODEL', 'small'))
+    load_seconds = time.perf_counter() - start
+
+    files = []
+    for path in paths:
+        start = time.perf_counter()
+        output = analyze_file(path)
+        wall = time.perf_counter() - start
+        language = output.payload.get('language') or 'es'
+        scores = ExplainabilityEngine(language=language).generate_report(
+            output.prosody, output.fillers, output.duration
+        )['scores']
+        files.append({
+            'path': path,
+            'duration': output.duration,
+            'wall': wall,
+            'stages': output.timings,
+            'language': language,
+            'scores': {name: float(getattr(scores, name)) for name in SCORES},
+            'wpm': float(output.prosody.speech_rate_wpm),
+            'pauses': int(output.prosody.pause_count),
+            'fillers': [[f.word, float(f.start), float(f.end)] for f in output.fillers],
+        })
+
+    results.put({
+        'name': config['name'],
+        'config': config,
+        'load_seconds': load_seconds,
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'files': files,
+    })
+
+
+def collect_run(process, results, timeout: Optional[float]) -> Tuple[Optional[Dict], Optional[str]]:
+    """
+    Wait for a configuration's results
+
+    Returns:
+        (run, None), or (None, reason) if the process died without reporting
+        (crash, OOM kill) or ran past `timeout` seconds (it is then terminated)
+    """
+    deadline = time.monotonic() + timeout if timeout else None
+    while True:
+        try:
+            return results.get(timeout=POLL_SECONDS), None
+        except queue.Empty:
+            pass
+        if process.exitcode is not None:
+            try:  # Results put right before exiting
+                return results.get(timeout=1), None
+            except queue.Empty:
+                return None, f"exit code {process.exitcode}"
+        if deadline is not None and time.monotonic() > deadline:
+            process.terminate()
+            return None, f"timed out after {timeout:.0f} s"
+
+
+def match_fillers(predicted: List, reference: List, tolerance: float) -> Tuple[int, int, int]:
+    """
+    One-to-one matching by time (centers within `tolerance` seconds)
+
+    Returns:
+        (true positives, predicted count, reference count)
+    """
+    centers = sorted((start + end) / 2 for _, start, end in reference)
+    used = [False] * len(centers)
+    hits = 0
+    for _, start, end in sorted(predicted, key=lambda f: f[1]):
+        center = (start + end) / 2
+        best, best_gap = None, tolerance
+        for i, ref in enumerate(centers):
+            gap = abs(ref - center)
+            if not used[i] and gap <= best_gap:
+                best, best_gap = i, gap
+        if best is not None:
+            used[best] = True
+            hits += 1
+    return hits, len(predicted), len(reference)
+
+
+def _ratio(numerator: int, denominator: int) -> Optional[float]:
+    return numerator / denominator if denominator else None
+
+
+def _mean(values: List[float]) -> Optional[float]:
+    return sum(values) / len(values) if values else None
+
+
+def summarize(run: Dict, reference: Dict, labels: Dict[str, Dict], tolerance: float) -> Dict:
+    """Speed and deviation of one configuration from the reference (and labels)"""
+    ref_files = {f['path']: f for f in reference['files']}
+    deviations = {name: [] for name in SCORES}
+    wpm_dev, pause_dev = [], []
+    ref_counts = [0, 0, 0]
+    label_counts = [0, 0, 0]
+    label_wpm, label_pauses = [], []
+
+    for f in run['files']:
+        ref = ref_files[f['path']]
+        for name in SCORES:
+            deviations[name].append(abs(f['scores'][name] - ref['scores'][name]))
+        wpm_dev.append(abs(f['wpm'] - ref['wpm']))
+        pause_dev.append(abs(f['pauses'] - ref['pauses']))
+        for i, n in enumerate(match_fillers(f['fillers'], ref['fillers'], tolerance)):
+            ref_counts[i] += n
+
+        label = labels.get(f['path'])
+        if label:
+            if 'fillers' in label:
+                gold = [[g.get('word', ''), g['start'], g['end']] for g in label['fillers']]
+                for i, n in enumerate(match_fillers(f['fillers'], gold, tolerance)):
+                    label_counts[i] += n
+            if 'wpm' in label:
+                label_wpm.append(abs(f['wpm'] - label['wpm']))
+            if 'pauses' in label:
+                label_pauses.append(abs(f['pauses'] - label['pauses']))
+
+    audio_seconds = sum(f['duration'] for f in run['files'])
+    wall = sum(f['wall'] for f in run['files'])
+    score_deviation = {name: _mean(values) for name, values in deviations.items()}
+    return {
+        'name': run['name'],
+        'config': run['config'],
+        'wall_seconds': wall,
+        'realtime_factor': wall / audio_seconds if audio_seconds else None,
+        'load_seconds': run['load_seconds'],
+        'peak_rss_mb': run['peak_rss_mb'],
+        'score_deviation': score_deviation,
+        'mean_score_deviation': _mean([v for v in score_deviation.values() if v is not None]),
+        'wpm_deviation': _mean(wpm_dev),
+        'pause_deviation': _mean(pause_dev),
+        'filler_precision': _ratio(ref_counts[0], ref_counts[1]),
+        'filler_recall': _ratio(ref_counts[0], ref_counts[2]),
+        'labels': {
+            'filler_precision': _ratio(label_counts[0], label_counts[1]),
+            'filler_recall': _ratio(label_counts[0], label_counts[2]),
+            'wpm_error': _mean(label_wpm),
+            'pause_error': _mean(label_pauses),
+        },
+    }
+
+
+def pareto_front(summaries: List[Dict]) -> List[str]:
+    """
+    Names not dominated in (realtime factor, mean score deviation), lower is
+    better; configurations missing either (no audio, no shared files) are left out
+    """
+    summaries = [s for s in summaries
+                 if s['realtime_factor'] is not None and s['mean_score_deviation'] is not None]
+    front = []
+    for s in summaries:
+        dominated = any(
+            o['realtime_factor'] <= s['realtime_factor']
+            and o['mean_score_deviation'] <= s['mean_score_deviation']
+            and (o['realtime_factor'] < s['realtime_factor']
+                 or o['mean_score_deviation'] < s['mean_score_deviation'])
+            for o in summaries if o is not s
+        )
+        if not dominated:
+            front.append(s['name'])
+    return front
+
+
+def print_table(summaries: List[Dict], front: List[str], reference: str):
+    def fmt(value, spec):
+        return format(value, spec) if value is not None else '-'
+
+    print(f"\nDeviation from '{reference}' (mean absolute; * = Pareto front of RTF vs score deviation)")
+    print(f"{'config':<22} {'RTF':>6} {'peak MB':>8} {'score':>6} "
+          + ' '.join(f"{n[:5]:>6}" for n in SCORES)
+          + f" {'WPM':>6} {'pause':>6} {'fill P':>7} {'fill R':>7}")
+    for s in sorted(summaries, key=lambda s: s['realtime_factor'] or 0):
+        mark = '*' if s['name'] in front else ' '
+        print(f"{mark}{s['name']:<21} {fmt(s['realtime_factor'], '6.3f')} {fmt(s['peak_rss_mb'], '8.0f')} "
+              f"{fmt(s['mean_score_deviation'], '6.2f')} "
+              + ' '.join(fmt(s['score_deviation'][n], '6.2f') for n in SCORES)
+              + f" {fmt(s['wpm_deviation'], '6.1f')} {fmt(s['pause_deviation'], '6.1f')}"
+              f" {fmt(s['filler_precision'], '7.2f')} {fmt(s['filler_recall'], '7.2f')}")
+
+    labeled = [s for s in summaries if any(v is not None for v in s['labels'].values())]
+    if labeled:
+        print(f"\nAgainst labels\n{'config':<22} {'fill P':>7} {'fill R':>7} {'WPM err':>8} {'pause err':>10}")
+        for s in labeled:
+            l = s['labels']
+            print(f" {s['name']:<21} {fmt(l['filler_precision'], '7.2f')} {fmt(l['filler_recall'], '7.2f')} "
+                  f"{fmt(l['wpm_error'], '8.1f')} {fmt(l['pause_error'], '10.1f')}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--corpus', required=True, help="Directory of recordings (+ optional label JSON)")
+    parser.add_argument('--configs', help="JSON file with the configurations to compare")
+    parser.add_argument('--reference', help="Name of the reference configuration (default: the first)")
+    parser.add_argument('--tolerance', type=float, default=0.3, help="Filler match tolerance in seconds")
+    parser.add_argument('--timeout', type=float, help="Seconds allowed per configuration (default: no limit)")
+    parser.add_argument('--out', help="Results file (default benchmarks/results/eval_<timestamp>.json)")
+    args = parser.parse_args()
+
+    corpus = find_corpus(args.corpus)
+    if not corpus:
+        parser.error(f"No recordings in {args.corpus}")
+    configs = DEFAULT_CONFIGS
+    if args.configs:
+        with open(args.configs) as f:
+            configs = json.load(f)
+    reference_name = args.reference or configs[0]['name']
+    if reference_name not in {c['name'] for c in configs}:
+        parser.error(f"Unknown reference configuration: {reference_name}")
+
+    # One process per configuration: peak memory is its own and models
+    # don't accumulate
+    context = multiprocessing.get_context('spawn')
+    paths = [item['path'] for item in corpus]
+    runs, failed = {}, {}
+    for config in configs:
+        print(f"Running '{config['name']}' on {len(paths)} file(s)...")
+        results = context.Queue()
+        process = context.Process(target=run_config, args=(config, paths, results))
+        process.start()
+        run, reason = collect_run(process, results, args.timeout)
+        process.join()
+        if run is None:
+            print(f"Configuration '{config['name']}' failed ({reason}), skipping it")
+            failed[config['name']] = reason
+            continue
+        runs[config['name']] = run
+    if reference_name not in runs:
+        raise SystemExit(f"Reference configuration '{reference_name}' failed ({failed[reference_name]})")
+
+    labels = {item['path']: item['labels'] for item in corpus if item['labels']}
+    summaries = [summarize(run, runs[reference_name], labels, args.tolerance) for run in runs.values()]
+    front = pareto_front(summaries)
+    print_table(summaries, front, reference_name)
+
+    out = args.out or os.path.join(
+        os.path.dirname(__file__), 'results', f"eval_{datetime.now():%Y%m%d-%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(out) or '.', exist_ok=True)
+    with open(out, 'w') as f:
+        json.dump({
+            'finished_at': datetime.now().isoformat(),
+            'corpus': args.corpus,
+            'reference': reference_name,
+            'pareto_front': front,
+            'failed': failed,
+            'summaries': summaries,
+            'runs': runs,
+        }, f, indent=2)
+    print(f"\nResults saved to {out}")
+
+
+if __name__ == '__main__':
+    main()
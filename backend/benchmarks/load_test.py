@@ -0,0 +1,291 @@
+"""
+Load Test
+Drives /api/analyze with generated audio of mixed durations and formats at a
+fixed concurrency and reports latency percentiles, error rates, throughput
+and per-stage timings (from the Server-Timing header).
+
+By default the app is started locally with the Gemini stub (and, with
+--stub-asr, the Whisper stub) so runs are reproducible and free. Results are
+written to a JSON file; pass --compare to diff against an earlier run.
+
+Usage:
+    cd backend
+    python -m benchmarks.load_test --concurrency 4 --requests 40 --stub-asr
+    python -m benchmarks.load_test --url http://staging:8000 --compare results/load_a.json
+"""
+
+import argparse
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List
+
+import numpy as np
+
+from benchmarks.bench_long_audio import write_speech_like
+
+CONTENT_TYPES = {'wav': 'audio/wav', 'm4a': 'audio/mp4', 'webm': 'audio/webm', 'ogg': 'audio/ogg;codecs=opus'}
+FFMPEG_CODECS = {
+    'm4a': ['-c:a', 'aac', '-b:a', '64k'],
+    'webm': ['-c:a', 'libopus', '-b:a', '32k'],
+    # The advertised capture format (GET /api/capture-format)
+    'ogg': ['-ac', '1', '-ar', '16000', '-c:a', 'libopus', '-b:a', '24k'],
+}
+
+
+def generate_corpus(directory: str, durations: List[float], formats: List[str]) -> List[Dict]:
+    """One file per (duration, format); formats other than wav need ffmpeg"""
+    if not shutil.which('ffmpeg') and set(formats) - {'wav'}:
+        print("ffmpeg not found: only generating wav")
+        formats = ['wav']
+
+    corpus = []
+    for seconds in durations:
+        wav_path = os.path.join(directory, f"speech_{seconds:g}s.wav")
+        write_speech_like(wav_path, seconds / 60, seed=int(seconds))
+        for fmt in formats:
+            path = wav_path
+            if fmt != 'wav':
+                path = wav_path[:-3] + fmt
+                subprocess.run(
+                    ['ffmpeg', '-nostdin', '-v', 'error', '-y', '-i', wav_path, *FFMPEG_CODECS[fmt], path],
+                    check=True
+                )
+            with open(path, 'rb') as f:
+                corpus.append({'format': fmt, 'seconds': seconds, 'name': os.path.basename(path), 'data': f.read()})
+    return corpus
+
+
+def multipart(item: Dict, user_id: str):
+    boundary = uuid.uuid4().hex
+    head = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="user_id"\r\n\r\n{user_id}\r\n'
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="file"; filename="{item["name"]}"\r\n'
+        f"Content-Type: {CONTENT_TYPES[item['format']]}\r\n\r\n"
+    ).encode()
+    body = head + item['data'] + f"\r\n--{boundary}--\r\n".encode()
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+def parse_server_timing(header: str) -> Dict[str, float]:
+    """'prosody;dur=812.3, asr;dur=...' -> {'prosody': 0.8123, ...}"""
+    stages = {}
+    for entry in filter(None, (e.strip() for e in (header or '').split(','))):
+        name, _, params = entry.partition(';')
+        if params.startswith('dur='):
+            stages[name] = float(params[4:]) / 1000
+    return stages
+
+
+def send(url: str, item: Dict, timeout: float) -> Dict:
+    body, content_type = multipart(item, user_id='loadtest')
+    request = urllib.request.Request(
+        f"{url}/api/analyze", data=body, method='POST', headers={'Content-Type': content_type}
+    )
+    start = time.perf_counter()
+    status, stages = 0, {}
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            status = response.status
+            stages = parse_server_timing(response.headers.get('Server-Timing'))
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except Exception as e:
+        status = type(e).__name__
+    return {
+        'format': item['format'],
+        'seconds': item['seconds'],
+        'bytes': len(item['data']),
+        'status': status,
+        'latency': time.perf_counter() - start,
+        'stages': stages,
+    }
+
+
+def percentiles(values) -> Dict[str, float]:
+    if not len(values):
+        return {}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {'p50': float(p50), 'p95': float(p95), 'p99': float(p99), 'mean': float(np.mean(values))}
+
+
+def summarize(samples: List[Dict], wall_seconds: float) -> Dict:
+    ok = [s for s in samples if s['status'] == 200]
+    errors = defaultdict(int)
+    for s in samples:
+        if s['status'] != 200:
+            errors[str(s['status'])] += 1
+
+    by_input = defaultdict(list)
+    stages = defaultdict(list)
+    for s in ok:
+        by_input[f"{s['format']}/{s['seconds']:g}s"].append(s['latency'])
+        for name, seconds in s['stages'].items():
+            stages[name].append(seconds)
+
+    return {
+        'requests': len(samples),
+        'ok': len(ok),
+        'error_rate': 1 - len(ok) / max(1, len(samples)),
+        'errors': dict(errors),
+        'throughput_rps': len(ok) / wall_seconds if wall_seconds else 0.0,
+        'audio_seconds_per_second': sum(s['seconds'] for s in ok) / wall_seconds if wall_seconds else 0.0,
+        'latency': percentiles([s['latency'] for s in ok]),
+        'latency_by_input': {k: percentiles(v) for k, v in sorted(by_input.items())},
+        'stages': {k: percentiles(v) for k, v in stages.items()},
+    }
+
+
+def print_report(summary: Dict, baseline: Dict = None):
+    def delta(path):
+        if not baseline:
+            return ""
+        old = baseline
+        for key in path:
+            old = old.get(key, {}) if isinstance(old, dict) else {}
+        new = summary
+        for key in path:
+            new = new.get(key, {})
+        return f" ({(new - old) / old:+.0%})" if isinstance(old, float) and old else ""
+
+    lat = summary['latency']
+    print(f"\nrequests {summary['requests']}, ok {summary['ok']}, "
+          f"error rate {summary['error_rate']:.1%} {summary['errors'] or ''}")
+    print(f"throughput {summary['throughput_rps']:.2f} req/s{delta(['throughput_rps'])}, "
+          f"{summary['audio_seconds_per_second']:.1f} audio s/s")
+    if lat:
+        print("latency  " + "  ".join(
+            f"{k} {lat[k]:.2f}s{delta(['latency', k])}" for k in ('p50', 'p95', 'p99')
+        ))
+    print(f"\n{'input':<14} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for name, p in summary['latency_by_input'].items():
+        print(f"{name:<14} {p['p50']:>8.2f} {p['p95']:>8.2f} {p['p99']:>8.2f}")
+    print(f"\n{'stage':<14} {'mean':>8} {'p95':>8}")
+    for name, p in summary['stages'].items():
+        print(f"{name:<14} {p['mean']:>8.3f} {p['p95']:>8.3f}")
+
+
+def start_server(port: int, args, db_dir: str) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        SPEAKEASY_GEMINI_STUB='1',
+        SPEAKEASY_DB_PATH=os.path.join(db_dir, 'loadtest.db'),
+        SPEAKEASY_SPOOL_DIR=os.path.join(db_dir, 'spool'),
+        SPEAKEASY_MAX_CONCURRENT=str(args.max_concurrent),
+        SPEAKEASY_MAX_QUEUE=str(args.max_queue),
+    )
+    if args.stub_asr:
+        env['SPEAKEASY_ASR_STUB'] = '1'
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'main:app', '--port', str(port), '--log-level', 'warning'],
+        env=env
+    )
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError("Server exited during startup")
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1).read()
+            return server
+        except OSError:
+            time.sleep(0.5)
+    server.terminate()
+    raise RuntimeError("Server did not start in time")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--url', help="Existing server (default: start one with stubs)")
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=40)
+    parser.add_argument('--durations', type=float, nargs='+', default=[15, 60, 300],
+                        help="Audio lengths in seconds")
+    parser.add_argument('--formats', nargs='+', default=['wav', 'm4a', 'webm'], choices=list(CONTENT_TYPES))
+    parser.add_argument('--stub-asr', action='store_true', help="Replace Whisper with the stub model")
+    parser.add_argument('--max-concurrent', type=int, default=2, help="Server SPEAKEASY_MAX_CONCURRENT")
+    parser.add_argument('--max-queue', type=int, default=64, help="Server SPEAKEASY_MAX_QUEUE")
+    parser.add_argument('--timeout', type=float, default=600)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', help="Results file (default benchmarks/results/load_<timestamp>.json)")
+    parser.add_argument('--compare', help="Earlier results file to diff against")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = generate_corpus(tmp, args.durations, args.formats)
+        rng = np.random.default_rng(args.seed)
+        schedule = [corpus[i] for i in rng.integers(len(corpus), size=args.requests)]
+
+        server = None
+        url = args.url
+        if not url:
+            port = free_port()
+            server = start_server(port, args, tmp)
+            url = f"http://127.0.0.1:{port}"
+
+        try:
+            print(f"{args.requests} requests at concurrency {args.concurrency} against {url}")
+            done = 0
+            lock = threading.Lock()
+
+            def run(item):
+                nonlocal done
+                sample = send(url, item, args.timeout)
+                with lock:
+                    done += 1
+                    print(f"\r{done}/{args.requests}", end='', flush=True)
+                return sample
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+                samples = list(pool.map(run, schedule))
+            wall = time.perf_counter() - start
+        finally:
+            if server:
+                server.terminate()
+                server.wait(timeout=30)
+
+    summary = summarize(samples, wall)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['summary']
+    print_report(summary, baseline)
+
+    out = args.out or os.path.join(
+        os.path.dirname(__file__), 'results', f"load_{datetime.now():%Y%m%d-%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(out) or '.', exist_ok=True)
+    config = {k: v for k, v in vars(args).items() if k not in ('out', 'compare')}
+    with open(out, 'w') as f:
+        json.dump({
+            'config': config,
+            'finished_at': datetime.now().isoformat(),
+            'summary': summary,
+            'samples': samples,
+        }, f, indent=2)
+    print(f"\nResults saved to {out}")
+
+
+if __name__ == '__main__':
+    main()
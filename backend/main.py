@@ -6,17 +6,37 @@ AI-Powered Speech Analysis with Prosody Detection
 # Add FFmpeg to PATH for Windows (if not already in system PATH)
 import os
 import sys
+import json
+import time
+import uuid
+import asyncio
 ffmpeg_path = r'C:\ffmpeg\bin'
 if os.path.exists(ffmpeg_path) and ffmpeg_path not in os.environ['PATH']:
     os.environ['PATH'] = ffmpeg_path + os.pathsep + os.environ['PATH']
     print(f"✅ FFmpeg added to PATH: {ffmpeg_path}")
 
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from pydantic import BaseModel
 from typing import List, Optional
 import uvicorn
-from datetime import datetime
+
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from services.serialization import negotiate, encode, encode_json, MSGPACK_MEDIA_TYPE
+from services.admission import AdmissionConfig, AdmissionController, AdmissionRejected
+from services.audio_io import CAPTURE_FORMAT, metric_extension, probe_duration, estimate_duration
+from services.pipeline import analyze_file, persist_analysis
+from services.job_queue import JobQueue
+from services.history_store import HistoryStore
+from services.feature_store import FeatureStore
+from services.timeline_store import TimelineStore
+from services.metrics import metrics
+from services.memory_stats import process_memory
+from services.thread_budget import apply_budget, budget_from_env, cpu_summary
+from services.tracing import InMemoryExporter, exporters_from_env, tracer
 
 # Import analysis services (to be created)
 # from services.prosody_analyzer import ProsodyAnalyzer
@@ -29,6 +49,69 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Admission control: bounded concurrency + wait queue for /api/analyze
+admission_config = AdmissionConfig.from_env()
+admission = AdmissionController(admission_config)
+metrics.gauge("admission_slots_in_use", lambda: admission.in_use, "Analysis slots currently held")
+metrics.gauge("admission_queue_length", lambda: admission.queued, "Requests waiting for a slot")
+
+def _own_memory(field: str) -> float:
+    usage = process_memory()
+    return getattr(usage, field) if usage else 0.0
+
+# Memory of the worker answering the scrape (see serve.py --memory for all)
+metrics.gauge("process_resident_memory_bytes", lambda: _own_memory('rss'), "Resident memory of this worker")
+metrics.gauge("process_proportional_memory_bytes", lambda: _own_memory('pss'), "Resident memory with shared pages split among sharers")
+metrics.gauge("process_unique_memory_bytes", lambda: _own_memory('uss'), "Memory private to this worker")
+metrics.describe("upload_bytes", "Bytes per uploaded recording, by container")
+metrics.describe("upload_bytes_total", "Bytes received in uploads, by container")
+
+# Cap torch/BLAS/numba threads so concurrent analyses don't oversubscribe
+# the cores (API nodes in worker mode don't analyze)
+if os.getenv("SPEAKEASY_MODE", "standalone") != "api":
+    thread_budget = budget_from_env(admission_config.max_concurrent)
+    if thread_budget:
+        print(f"Thread budget per analysis ({cpu_summary()}): {apply_budget(thread_budget)}")
+
+# Per-request traces of /api/analyze (SPEAKEASY_TRACE_EXPORTER: memory, file, none)
+tracer.configure(exporters_from_env())
+
+@app.middleware("http")
+async def reject_when_saturated(request: Request, call_next):
+    """Fail fast (before the upload body is read) when oversized or saturated"""
+    if request.method == "POST" and request.url.path == "/api/analyze":
+        content_length = request.headers.get("content-length")
+        try:
+            declared = int(content_length) if content_length else None
+        except ValueError:
+            declared = -1
+        if declared is not None and declared < 0:
+            return JSONResponse(status_code=400, content={"detail": "Invalid Content-Length header"})
+        # Allow some slack for the multipart envelope
+        if declared is not None and declared > admission_config.max_upload_bytes + 64 * 1024:
+            return JSONResponse(
+                status_code=413,
+                content={"detail": f"File too large (max {admission_config.max_upload_mb:.0f} MB)"}
+            )
+        if admission.saturated:
+            return JSONResponse(
+                status_code=429,
+                content={"detail": "Analysis queue is full"},
+                headers={"Retry-After": str(admission.retry_after())}
+            )
+    return await call_next(request)
+
+@app.middleware("http")
+async def trace_analysis(request: Request, call_next):
+    """Trace each analysis request; the trace id is returned in X-Trace-Id"""
+    if not (tracer.enabled and request.method == "POST" and request.url.path == "/api/analyze"):
+        return await call_next(request)
+    with tracer.trace("analyze", mode="api" if QUEUE_MODE else "standalone") as span:
+        response = await call_next(request)
+        span.set(status_code=response.status_code)
+        response.headers["X-Trace-Id"] = span.trace_id
+    return response
+
 # CORS configuration for Expo development
 app.add_middleware(
     CORSMiddleware,
@@ -41,8 +124,26 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Trace-Id"],
 )
 
+# Server-side session history (embedded SQLite)
+history_store = HistoryStore(os.getenv("SPEAKEASY_DB_PATH", "speakeasy.db"))
+feature_store = FeatureStore(os.getenv("SPEAKEASY_DB_PATH", "speakeasy.db"))
+timeline_store = TimelineStore(os.getenv("SPEAKEASY_DB_PATH", "speakeasy.db"))
+
+# Deployment mode: 'standalone' analyzes in-process; 'api' hands uploads to
+# worker nodes (worker.py) through the shared job queue
+QUEUE_MODE = os.getenv("SPEAKEASY_MODE", "standalone") == "api"
+SPOOL_DIR = os.getenv("SPEAKEASY_SPOOL_DIR", ".")
+JOB_POLL_SECONDS = float(os.getenv("SPEAKEASY_JOB_POLL_SECONDS", "0.5"))
+JOB_TIMEOUT_SECONDS = float(os.getenv("SPEAKEASY_JOB_TIMEOUT", "900"))
+os.makedirs(SPOOL_DIR, exist_ok=True)
+job_queue = JobQueue(os.getenv("SPEAKEASY_QUEUE_PATH", "jobs.db")) if QUEUE_MODE else None
+
+# Compress large responses (long talks carry thousands of markers/words)
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 # Pydantic models for request/response
 class TimelineMarker(BaseModel):
     start: float
@@ -73,6 +174,9 @@ class ProsodyMetrics(BaseModel):
     pauseLocations: List[float]
     energyVariance: float
     speechRateWpm: int
+    pitchContour: List[float] = []  # Downsampled pitch (Hz, 0 = unvoiced)
+    energyContour: List[float] = []  # Downsampled normalized RMS
+    contourHopSeconds: float = 0.0  # Seconds between contour points
 
 class GeminiAnalysis(BaseModel):
     content_score: float
@@ -93,6 +197,107 @@ class AnalysisResult(BaseModel):
     duration: float
     analyzedAt: str
     geminiAnalysis: Optional[GeminiAnalysis] = None
+    analysisId: Optional[str] = None
+    language: Optional[str] = None  # Detected spoken language ('es', 'en')
+
+class SessionSummary(BaseModel):
+    id: str
+    analyzedAt: str
+    duration: float
+    scores: AnalysisScores
+    fillerRate: float
+
+class MetricAverages(BaseModel):
+    confidence: float
+    clarity: float
+    pacing: float
+    nervousness: float
+    filler_rate: float
+
+class ProgressRollup(BaseModel):
+    userId: str
+    sessionCount: int
+    totalDuration: float
+    firstAt: str
+    lastAt: str
+    windowSize: int   # Configured recent window
+    windowCount: int  # Sessions currently in it (fewer for new users)
+    allTime: MetricAverages
+    recent: MetricAverages
+    ema: MetricAverages
+
+class JobStatus(BaseModel):
+    jobId: str
+    status: str  # 'queued', 'running', 'done', 'failed'
+    attempts: int
+    error: Optional[str] = None
+    result: Optional[AnalysisResult] = None
+
+class RescoreRequest(BaseModel):
+    thresholds: dict = {}  # ExplainabilityEngine overrides, e.g. {"OPTIMAL_WPM_RANGE": [115, 145]}
+    analysisIds: Optional[List[str]] = None
+    userId: Optional[str] = None
+    since: Optional[str] = None  # ISO timestamp
+    fuseSemantic: bool = False
+    includeDetails: bool = False
+
+class DailyProgress(BaseModel):
+    day: str
+    sessionCount: int
+    totalDuration: float
+    averages: MetricAverages
+
+class TimelineItem(BaseModel):
+    kind: str  # 'marker' or 'filler'
+    start: float
+    end: float
+    # Marker fields
+    type: Optional[str] = None
+    severity: Optional[str] = None
+    color: Optional[str] = None
+    label: Optional[str] = None
+    reason: Optional[str] = None
+    # Filler word fields
+    word: Optional[str] = None
+    confidence: Optional[float] = None
+
+class TimelinePage(BaseModel):
+    analysisId: str
+    start: float
+    end: float
+    duration: float
+    itemCount: int
+    items: List[TimelineItem]
+    nextCursor: Optional[int] = None
+
+class TraceSpan(BaseModel):
+    traceId: str
+    spanId: str
+    parentId: Optional[str] = None
+    name: str
+    startTime: float  # Unix time (seconds)
+    durationMs: Optional[float] = None
+    attributes: dict
+    error: Optional[str] = None
+
+class Trace(BaseModel):
+    traceId: str
+    spans: List[TraceSpan]  # Finish order; the root span ('analyze') is last
+
+class AudioFormat(BaseModel):
+    container: str
+    codec: str
+    mimeType: str
+    extension: str
+    sampleRate: int
+    channels: int
+    bitRate: int
+
+class CaptureFormat(BaseModel):
+    preferred: AudioFormat
+    alternatives: List[AudioFormat]
+    maxUploadMb: float
+    maxDurationSeconds: float
 
 @app.get("/")
 async def root():
@@ -103,11 +308,44 @@ async def root():
         "version": "1.0.0"
     }
 
-@app.post("/api/analyze", response_model=AnalysisResult)
-async def analyze_speech(file: UploadFile = File(...)):
+@app.get("/api/capture-format", response_model=CaptureFormat)
+async def get_capture_format():
+    """
+    Recording format clients should use
+    
+    Uploads in these formats are decoded in-process (no ffmpeg subprocess)
+    and are the smallest that keep full accuracy.
+    """
+    return CaptureFormat(
+        **CAPTURE_FORMAT,
+        maxUploadMb=admission_config.max_upload_mb,
+        maxDurationSeconds=admission_config.max_duration_seconds
+    )
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Process metrics in the Prometheus text format"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.post(
+    "/api/analyze",
+    response_model=AnalysisResult,
+    responses={200: {"content": {MSGPACK_MEDIA_TYPE: {}}}}
+)
+async def analyze_speech(
+    request: Request,
+    file: UploadFile = File(...),
+    user_id: Optional[str] = Form(None)
+):
     """
     Analyze uploaded speech audio file
     
+    The result is saved to the session history under `user_id`
+    (default: 'anonymous') and its id returned as `analysisId`.
+    
+    The response is JSON by default; send `Accept: application/x-msgpack`
+    for the compact binary encoding with typed-array timelines.
+    
     Returns:
     - Prosody metrics (pitch, tempo, pauses)
     - Filler word detection
@@ -123,148 +361,61 @@ async def analyze_speech(file: UploadFile = File(...)):
             detail="Invalid file type. Please upload an audio file."
         )
     
+    temp_path = None
+    handed_off = False  # Queued jobs own their spool file
+    timings = {}  # Seconds per stage, reported in the Server-Timing header
     try:
-        # Save uploaded file temporarily with safe filename
-        import time
-        
-        # Create safe temp filename
-        timestamp = str(time.time()).replace('.', '_')
-        
-        # Determine file extension safely from content type
-        file_ext = 'm4a'  # Default for audio
-        
-        # Map content type to extension
-        if file.content_type:
-            content_type_map = {
-                'audio/mp4': 'm4a',
-                'audio/mpeg': 'mp3',
-                'audio/wav': 'wav',
-                'audio/wave': 'wav',
-                'audio/x-wav': 'wav',
-                'audio/x-m4a': 'm4a',
-                'audio/webm': 'webm',
-                'audio/webm;codecs=opus': 'webm',
-            }
-            file_ext = content_type_map.get(file.content_type, 'webm' if 'webm' in file.content_type else 'wav')
-        
-        # Only use filename extension if it doesn't contain blob: or http:
-        if file.filename and 'blob:' not in file.filename and 'http:' not in file.filename:
-            parts = file.filename.split('.')
-            if len(parts) > 1 and len(parts[-1]) <= 4:  # Valid extension
-                file_ext = parts[-1]
-        
-        temp_path = f"temp_{timestamp}.{file_ext}"
-        
-        print(f"Receiving file: {file.filename}, content_type: {file.content_type}")
-        print(f"Saving as: {temp_path}")
+        start = time.perf_counter()
+        temp_path, size = await _save_upload(file)
+        cost = await _admission_cost(temp_path, size)
+        owner = user_id or 'anonymous'
+        timings['upload'] = tracer.record('upload', start, bytes=size, content_type=file.content_type)
         
-        # Write file content
-        with open(temp_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
-        
-        print(f"Saved temp file: {temp_path}, size: {len(content)} bytes")
-        
-        # Get audio duration
-        import librosa
-        y, sr = librosa.load(temp_path)
-        duration = float(len(y) / sr)
-        
-        # Initialize analysis services
-        from services.prosody_analyzer import ProsodyAnalyzer
-        from services.filler_detector import FillerDetector
-        from services.explainability import ExplainabilityEngine
-        from services.gemini_coach import GeminiCoach
+        start = time.perf_counter()
+        if QUEUE_MODE:
+            # API node: a worker runs the analysis and persists it
+            async with admission.admit(cost):
+                timings['admission'] = tracer.record('admission', start, cost=cost)
+                start = time.perf_counter()
+                job_id = await run_in_threadpool(job_queue.enqueue, temp_path, owner)
+                handed_off = True
+                payload = await _wait_for_job(job_id)
+                timings['job'] = tracer.record('job', start, job_id=job_id)
+        else:
+            # Run the analysis in a worker thread once admitted
+            async with admission.admit(cost):
+                timings['admission'] = tracer.record('admission', start, cost=cost)
+                output = await run_in_threadpool(analyze_file, temp_path)
+            timings.update(output.timings)
+            start = time.perf_counter()
+            analysis_id = await run_in_threadpool(
+                persist_analysis, output, owner, history_store, feature_store, timeline_store
+            )
+            timings['persist'] = tracer.record('persist', start, analysis_id=analysis_id)
+            payload = output.payload
         
-        # Perform prosody analysis
-        prosody_analyzer = ProsodyAnalyzer()
-        prosody_metrics = prosody_analyzer.analyze(temp_path)
+        start = time.perf_counter()
+        media_type = negotiate(request.headers.get('accept'))
+        body = encode(payload, media_type)
+        timings['encode'] = tracer.record('encode', start, media_type=media_type, bytes=len(body))
         
-        # Detect filler words
-        filler_detector = FillerDetector(model_size="small")
-        fillers = filler_detector.detect(temp_path, language='es')
-        transcription = filler_detector.get_transcription(temp_path, language='es')
-        
-        # Generate explainability report
-        explainability_engine = ExplainabilityEngine()
-        report = explainability_engine.generate_report(
-            prosody_metrics,
-            fillers,
-            duration
+        return Response(
+            content=body,
+            media_type=media_type,
+            headers={'Vary': 'Accept', 'Server-Timing': _server_timing(timings)}
         )
-
-        # Perform Semantic Analysis with Gemini
-        gemini_coach = GeminiCoach()
-        gemini_result = gemini_coach.analyze(transcription)
-        
-        # Merge recommendations (Physical + Semantic)
-        combined_recommendations = report['recommendations']
-        
-        if gemini_result:
-            # Add top improvement from Gemini as prioritization
-            if gemini_result.get('key_improvements'):
-                combined_recommendations.insert(0, f"🧠 CONTENIDO: {gemini_result['key_improvements'][0]}")
-            
-            # Add positive highlight
-            if gemini_result.get('positive_highlights'):
-                combined_recommendations.append(f"✨ DESTACADO: {gemini_result['positive_highlights'][0]}")
         
-        # Build response
-        result = AnalysisResult(
-            scores=AnalysisScores(
-                confidence=report['scores'].confidence,
-                clarity=report['scores'].clarity,
-                pacing=report['scores'].pacing,
-                nervousness=report['scores'].nervousness
-            ),
-            timelineMarkers=[
-                TimelineMarker(
-                    start=m.start,
-                    end=m.end,
-                    type=m.type,
-                    severity=m.severity,
-                    color=m.color,
-                    label=m.label,
-                    reason=m.reason
-                )
-                for m in report['timeline_markers']
-            ],
-            fillerWords=[
-                FillerWord(
-                    word=f.word,
-                    start=f.start,
-                    end=f.end,
-                    confidence=f.confidence
-                )
-                for f in fillers
-            ],
-            prosodyMetrics=ProsodyMetrics(
-                pitchMean=prosody_metrics.pitch_mean,
-                pitchStd=prosody_metrics.pitch_std,
-                tempoBpm=prosody_metrics.tempo_bpm,
-                pauseCount=prosody_metrics.pause_count,
-                pauseLocations=prosody_metrics.pause_locations,
-                energyVariance=prosody_metrics.energy_variance,
-                speechRateWpm=prosody_metrics.speech_rate_wpm
-            ),
-            recommendations=combined_recommendations,
-            transcription=transcription,
-            duration=duration,
-            analyzedAt=datetime.now().isoformat(),
-            geminiAnalysis=GeminiAnalysis(**gemini_result) if gemini_result else None
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=429,
+            detail=e.reason,
+            headers={"Retry-After": str(e.retry_after)}
         )
-        
-        # Clean up temp file
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
-        
-        return result
-        
+    
+    except HTTPException:
+        raise
+    
     except Exception as e:
-        # Clean up temp file on error
-        if 'temp_path' in locals() and os.path.exists(temp_path):
-            os.remove(temp_path)
-        
         # Log full error details
         import traceback
         error_msg = str(e)
@@ -280,11 +431,265 @@ async def analyze_speech(file: UploadFile = File(...)):
             status_code=500,
             detail=f"Analysis failed: {error_msg if error_msg else 'Unknown error - check server logs'}"
         )
+    
+    finally:
+        # Clean up temp file
+        if temp_path and not handed_off and os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def _server_timing(timings: dict) -> str:
+    """Server-Timing header value (durations in milliseconds)"""
+    return ', '.join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items())
+
+async def _save_upload(file: UploadFile):
+    """
+    Stream an upload to the spool directory, enforcing the size limit
+    
+    Returns:
+        (temp_path, size_bytes)
+    """
+    # Create safe temp filename (unique across API nodes sharing the spool)
+    timestamp = str(time.time()).replace('.', '_')
+    
+    # Determine file extension safely from content type
+    file_ext = 'm4a'  # Default for audio
+    
+    # Map content type to extension
+    if file.content_type:
+        content_type_map = {
+            'audio/mp4': 'm4a',
+            'audio/mpeg': 'mp3',
+            'audio/wav': 'wav',
+            'audio/wave': 'wav',
+            'audio/x-wav': 'wav',
+            'audio/x-m4a': 'm4a',
+            'audio/webm': 'webm',
+            'audio/webm;codecs=opus': 'webm',
+            'audio/ogg': 'ogg',
+            'audio/ogg;codecs=opus': 'ogg',
+            'audio/opus': 'ogg',
+            'audio/flac': 'flac',
+            'audio/x-flac': 'flac',
+        }
+        content_type = file.content_type.replace(' ', '').lower()
+        file_ext = content_type_map.get(content_type, 'webm' if 'webm' in content_type else 'wav')
+    
+    # Only use filename extension if it doesn't contain blob: or http:
+    if file.filename and 'blob:' not in file.filename and 'http:' not in file.filename:
+        parts = file.filename.split('.')
+        if len(parts) > 1 and len(parts[-1]) <= 4:  # Valid extension
+            file_ext = parts[-1]
+    
+    temp_path = os.path.join(SPOOL_DIR, f"temp_{timestamp}_{uuid.uuid4().hex[:8]}.{file_ext}")
+    
+    print(f"Receiving file: {file.filename}, content_type: {file.content_type}")
+    print(f"Saving as: {temp_path}")
+    
+    size = 0
+    try:
+        with open(temp_path, "wb") as buffer:
+            while chunk := await file.read(1024 * 1024):
+                size += len(chunk)
+                if size > admission_config.max_upload_bytes:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"File too large (max {admission_config.max_upload_mb:.0f} MB)"
+                    )
+                buffer.write(chunk)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    
+    print(f"Saved temp file: {temp_path}, size: {size} bytes")
+    metrics.summary("upload_bytes", format=metric_extension(file_ext)).observe(size)
+    metrics.inc("upload_bytes_total", size, format=metric_extension(file_ext))
+    return temp_path, size
+
+async def _admission_cost(temp_path: str, size: int) -> int:
+    """Probe duration from the header (no decode) to enforce limits and price the request"""
+    duration = await run_in_threadpool(probe_duration, temp_path)
+    if duration is not None and duration > admission_config.max_duration_seconds:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Audio too long (max {admission_config.max_duration_seconds:.0f} s)"
+        )
+    return admission.estimate_cost(duration if duration is not None else estimate_duration(size))
+
+async def _wait_for_job(job_id: str) -> dict:
+    """Poll the job queue until a worker finishes the job"""
+    deadline = time.monotonic() + JOB_TIMEOUT_SECONDS
+    while time.monotonic() < deadline:
+        job = await run_in_threadpool(job_queue.get, job_id)
+        if job.status == 'done':
+            return json.loads(job.result)
+        if job.status == 'failed':
+            raise RuntimeError(job.error or "Analysis job failed")
+        await asyncio.sleep(JOB_POLL_SECONDS)
+    raise HTTPException(status_code=504, detail=f"Analysis job {job_id} did not finish in time")
+
+@app.post("/api/jobs", status_code=202, response_model=JobStatus)
+async def submit_job(file: UploadFile = File(...), user_id: Optional[str] = Form(None)):
+    """
+    Queue an analysis and return immediately (requires SPEAKEASY_MODE=api)
+    
+    Poll `GET /api/jobs/{job_id}` for the result.
+    """
+    if not QUEUE_MODE:
+        raise HTTPException(status_code=404, detail="Job queue disabled (SPEAKEASY_MODE is not 'api')")
+    if not file.content_type.startswith('audio/'):
+        raise HTTPException(status_code=400, detail="Invalid file type. Please upload an audio file.")
+    
+    temp_path, size = await _save_upload(file)
+    try:
+        await _admission_cost(temp_path, size)
+        job_id = await run_in_threadpool(job_queue.enqueue, temp_path, user_id or 'anonymous')
+    except Exception:
+        os.remove(temp_path)
+        raise
+    return JobStatus(jobId=job_id, status='queued', attempts=0)
+
+@app.get("/api/jobs/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str):
+    """Status of a queued analysis (with the result once done)"""
+    if not QUEUE_MODE:
+        raise HTTPException(status_code=404, detail="Job queue disabled (SPEAKEASY_MODE is not 'api')")
+    job = await run_in_threadpool(job_queue.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return JobStatus(
+        jobId=job.id,
+        status=job.status,
+        attempts=job.attempts,
+        error=job.error,
+        result=json.loads(job.result) if job.result else None
+    )
+
+@app.get("/api/analyses/{analysis_id}", response_model=AnalysisResult)
+async def get_analysis(analysis_id: str):
+    """Stored analysis result by id"""
+    body = await run_in_threadpool(history_store.get_result, analysis_id)
+    if body is None:
+        raise HTTPException(status_code=404, detail="Analysis not found")
+    return Response(content=body, media_type="application/json")
+
+@app.get("/api/analyses/{analysis_id}/timeline", response_model=TimelinePage)
+async def get_timeline(
+    analysis_id: str,
+    start: float = Query(0.0, ge=0),
+    end: Optional[float] = Query(None, ge=0),
+    kind: Optional[str] = None,
+    limit: int = Query(200, ge=1, le=1000),
+    cursor: Optional[int] = None
+):
+    """
+    Markers and filler words overlapping [start, end] seconds, in time order
+    
+    `kind` filters by item kind ('marker', 'filler' or both, comma-separated).
+    Pass `nextCursor` back as `cursor` to read the next page of the window.
+    """
+    kinds = [k.strip() for k in kind.split(',') if k.strip()] if kind else None
+    if end is not None and end < start:
+        raise HTTPException(status_code=400, detail="end must not be before start")
+    
+    try:
+        page = await run_in_threadpool(_timeline_page, analysis_id, start, end, kinds, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return Response(content=encode_json(page), media_type="application/json")
+
+def _timeline_page(analysis_id: str, start: float, end: Optional[float], kinds: Optional[List[str]],
+                   limit: int, cursor: Optional[int]) -> dict:
+    """Timeline query, indexing analyses saved before the timeline index on first read"""
+    page = timeline_store.query(analysis_id, start, end, kinds, limit, cursor)
+    if page is None:
+        body = history_store.get_result(analysis_id)
+        if body is None:
+            raise HTTPException(status_code=404, detail="Analysis not found")
+        timeline_store.save(analysis_id, json.loads(body))
+        page = timeline_store.query(analysis_id, start, end, kinds, limit, cursor)
+    return page
+
+@app.get("/api/traces/{trace_id}", response_model=Trace)
+async def get_trace(trace_id: str):
+    """
+    Spans of a recent /api/analyze request (trace id from its X-Trace-Id header)
+    
+    Served from the in-memory exporter, which keeps the latest
+    SPEAKEASY_TRACE_MAX_TRACES traces.
+    """
+    exporter = tracer.exporter(InMemoryExporter)
+    if exporter is None:
+        raise HTTPException(status_code=404, detail="In-memory tracing disabled (SPEAKEASY_TRACE_EXPORTER)")
+    spans = exporter.get(trace_id)
+    if spans is None:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    return Trace(traceId=trace_id, spans=spans)
+
+@app.get("/api/users/{user_id}/sessions", response_model=List[SessionSummary])
+async def list_sessions(user_id: str, limit: int = 50, before: Optional[str] = None):
+    """User's sessions, newest first (page with `before` = last `analyzedAt`)"""
+    sessions = await run_in_threadpool(history_store.list_sessions, user_id, limit=min(limit, 500), before=before)
+    return [
+        SessionSummary(
+            id=s.id,
+            analyzedAt=s.analyzed_at,
+            duration=s.duration,
+            scores=AnalysisScores(
+                confidence=s.confidence,
+                clarity=s.clarity,
+                pacing=s.pacing,
+                nervousness=s.nervousness
+            ),
+            fillerRate=s.filler_rate
+        )
+        for s in sessions
+    ]
+
+@app.get("/api/users/{user_id}/progress", response_model=ProgressRollup)
+async def get_progress(user_id: str):
+    """Precomputed rolling averages of the user's scores and filler rate"""
+    progress = await run_in_threadpool(history_store.get_progress, user_id)
+    if progress is None:
+        raise HTTPException(status_code=404, detail="No sessions for this user")
+    return progress
+
+@app.get("/api/users/{user_id}/progress/daily", response_model=List[DailyProgress])
+async def get_daily_progress(user_id: str, since: Optional[str] = None):
+    """Per-day averages (optionally from `since`, an ISO date)"""
+    return await run_in_threadpool(history_store.get_daily_trend, user_id, since=since)
+
+@app.post("/api/rescore")
+async def rescore_analyses(body: RescoreRequest):
+    """
+    Recompute scores (and optionally markers/recommendations) of stored
+    analyses with tuned thresholds, from persisted features only
+    """
+    from services.rescoring import rescore
+    
+    try:
+        # SQLite scans, feature decoding and scoring stay off the event loop
+        return await run_in_threadpool(
+            rescore,
+            feature_store,
+            body.thresholds,
+            analysis_ids=body.analysisIds,
+            user_id=body.userId,
+            since=body.since,
+            fuse_semantic=body.fuseSemantic,
+            include_details=body.includeDetails
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 if __name__ == "__main__":
+    # Auto-reload is for local development only (SPEAKEASY_RELOAD=1)
+    reload = os.getenv("SPEAKEASY_RELOAD", "0") == "1"
     uvicorn.run(
         "main:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True
+        host=os.getenv("HOST", "0.0.0.0"),
+        port=int(os.getenv("PORT", "8000")),
+        reload=reload,
+        workers=None if reload else int(os.getenv("SPEAKEASY_API_WORKERS", "1"))
     )
@@ -0,0 +1,202 @@
+"""
+SpeakEasy Coach - Prefork Server
+Loads the Whisper model(s) and warms Librosa in a master process, then forks
+uvicorn workers that share the loaded weights copy-on-write (or through a
+shared-memory segment with --share-memory), so each extra worker only costs
+its private memory
+
+Usage:
+    cd backend
+    python serve.py --workers 4 --models small
+    python serve.py --memory <master pid>    # RSS/PSS/USS of master and workers
+    kill -USR1 <master pid>                  # same table in the server log
+"""
+
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import tempfile
+import time
+import traceback
+
+from dotenv import load_dotenv
+
+from services.memory_stats import format_table, process_tree_memory
+from services.thread_budget import plan_budgets
+
+load_dotenv()
+
+# A worker that dies sooner than this after starting is restarted with a delay
+MIN_WORKER_LIFETIME = 5.0
+
+
+def preload(model_sizes, share_memory: bool = False):
+    """
+    Load models and warm the analysis libraries in the master
+
+    Runs single-threaded: libgomp (torch/BLAS OpenMP) can't be used again
+    in a child forked after its thread team started. Workers apply their
+    own thread budget when they import the app.
+    """
+    import numpy as np
+    import soundfile as sf
+    import torch
+    import whisper
+    from whisper.tokenizer import get_tokenizer
+
+    from services.filler_detector import FillerDetector, load_whisper_model
+    from services.metrics import metrics
+    from services.prosody_analyzer import ProsodyAnalyzer
+
+    torch.set_num_threads(1)
+
+    for size in model_sizes:
+        model = load_whisper_model(size)
+        if not hasattr(model, 'dims') or not hasattr(model, 'share_memory'):
+            continue  # Stub model
+        if share_memory:
+            # Weights move to shared memory: workers map the same pages
+            # whatever they touch
+            model.share_memory()
+        # Cached mel filterbank and tokenizer encodings
+        whisper.audio.mel_filters(model.device, model.dims.n_mels)
+        for language in FillerDetector.FILLER_PATTERNS:
+            get_tokenizer(model.is_multilingual, num_languages=model.num_languages,
+                          language=language, task='transcribe')
+
+    # One short analysis imports Librosa's lazy submodules and compiles its
+    # numba kernels before the fork
+    sr = 16000
+    t = np.arange(3 * sr) / sr
+    tone = 0.3 * np.sin(2 * np.pi * 150 * t) * (np.sin(2 * np.pi * 3 * t) > 0)
+    with tempfile.NamedTemporaryFile(suffix='.wav') as f:
+        sf.write(f.name, tone.astype(np.float32), sr)
+        ProsodyAnalyzer().analyze(f.name)
+
+    # Warm-up is not traffic: workers start with empty metrics
+    metrics.reset()
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    """Listening socket created once and inherited by every worker"""
+    family = socket.AF_INET6 if ':' in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def serve_worker(sock: socket.socket, args: argparse.Namespace):
+    """Forked child: import the app (own DB connections) and serve on the shared socket"""
+    signal.signal(signal.SIGUSR1, signal.SIG_IGN)
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, signal.SIG_DFL)  # uvicorn installs its own handlers
+
+    import uvicorn
+    from main import app
+
+    config = uvicorn.Config(app, log_level=args.log_level, timeout_keep_alive=5)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SpeakEasy Coach prefork server")
+    parser.add_argument('--host', default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument('--port', type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument('--workers', type=int, default=int(os.getenv("SPEAKEASY_API_WORKERS", "2")))
+    parser.add_argument('--models', nargs='+', default=[os.getenv("SPEAKEASY_ASR_MODEL", "small")],
+                        help="Whisper sizes to preload")
+    parser.add_argument('--share-memory', action='store_true',
+                        help="Keep weights in a shared-memory segment instead of copy-on-write pages")
+    parser.add_argument('--log-level', default='info')
+    parser.add_argument('--memory', type=int, metavar='PID',
+                        help="Print memory of a running master and its workers, then exit")
+    args = parser.parse_args()
+
+    if args.memory:
+        print(format_table(process_tree_memory(args.memory)))
+        return
+    if not hasattr(os, 'fork'):
+        sys.exit("serve.py needs fork(); use 'python main.py' on this platform")
+
+    # Analyses run in every worker at once: budget threads for all of them.
+    # Each worker has its own model (and inference lock), so ASR passes of
+    # different workers overlap: torch gets one worker's share of the cores
+    if "SPEAKEASY_THREADS_PER_ANALYSIS" not in os.environ:
+        concurrent = args.workers * int(os.getenv("SPEAKEASY_MAX_CONCURRENT", "2"))
+        os.environ["SPEAKEASY_THREADS_PER_ANALYSIS"] = str(plan_budgets(concurrent)[-1].threads)
+    if "SPEAKEASY_TORCH_THREADS" not in os.environ:
+        os.environ["SPEAKEASY_TORCH_THREADS"] = str(plan_budgets(args.workers)[-1].threads)
+
+    start = time.perf_counter()
+    preload(args.models, args.share_memory)
+    print(f"Preloaded {', '.join(args.models)} in {time.perf_counter() - start:.1f}s")
+
+    sock = bind_socket(args.host, args.port)
+    # Move everything loaded so far out of the collector's reach, so its
+    # passes don't write to (and un-share) the master's pages in workers
+    gc.collect()
+    gc.freeze()
+
+    workers = {}
+    stopping = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                serve_worker(sock, args)
+                code = 0
+            except BaseException:
+                traceback.print_exc()
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                os._exit(code)
+        workers[pid] = time.monotonic()
+        print(f"Worker {pid} started")
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def report(signum, frame):
+        print(format_table(process_tree_memory(os.getpid())), flush=True)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGUSR1, report)
+
+    for _ in range(args.workers):
+        spawn()
+    print(f"Serving on {args.host}:{args.port} with {args.workers} workers (master {os.getpid()})")
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        started = workers.pop(pid, None)
+        if started is None or stopping:
+            continue
+        print(f"Worker {pid} exited ({os.waitstatus_to_exitcode(status)}); restarting")
+        if time.monotonic() - started < MIN_WORKER_LIFETIME:
+            time.sleep(MIN_WORKER_LIFETIME)
+        spawn()
+
+    sock.close()
+
+
+if __name__ == '__main__':
+    main()
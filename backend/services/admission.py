@@ -0,0 +1,149 @@
+"""
+Admission Control
+Bounds concurrent analyses with a cost-weighted semaphore and a bounded
+wait queue; rejects with a Retry-After estimate when saturated
+"""
+
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Deque, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+@dataclass
+class AdmissionConfig:
+    max_concurrent: int = 2            # Analysis slots running at once
+    max_queue: int = 8                 # Requests allowed to wait for a slot
+    max_wait_seconds: float = 120.0    # Give up waiting after this long
+    cost_unit_seconds: float = 300.0   # Audio seconds per slot (long talks take more)
+    max_upload_mb: float = 50.0
+    max_duration_seconds: float = 3600.0
+
+    @classmethod
+    def from_env(cls) -> "AdmissionConfig":
+        return cls(
+            max_concurrent=int(os.getenv("SPEAKEASY_MAX_CONCURRENT", cls.max_concurrent)),
+            max_queue=int(os.getenv("SPEAKEASY_MAX_QUEUE", cls.max_queue)),
+            max_wait_seconds=float(os.getenv("SPEAKEASY_MAX_QUEUE_WAIT", cls.max_wait_seconds)),
+            cost_unit_seconds=float(os.getenv("SPEAKEASY_COST_UNIT_SECONDS", cls.cost_unit_seconds)),
+            max_upload_mb=float(os.getenv("SPEAKEASY_MAX_UPLOAD_MB", cls.max_upload_mb)),
+            max_duration_seconds=float(os.getenv("SPEAKEASY_MAX_DURATION_SECONDS", cls.max_duration_seconds)),
+        )
+
+    @property
+    def max_upload_bytes(self) -> int:
+        return int(self.max_upload_mb * 1024 * 1024)
+
+
+class AdmissionRejected(Exception):
+    """Raised when an analysis can't be admitted (maps to HTTP 429)"""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    FIFO, cost-weighted admission for the analysis endpoint
+
+    Each request costs ceil(duration / cost_unit_seconds) slots (at least 1,
+    at most `max_concurrent`). Requests that don't fit wait in a bounded
+    queue; when the queue is full or the wait times out they are rejected
+    with a Retry-After derived from the observed seconds per slot.
+
+    Must be used from a single event loop.
+    """
+
+    def __init__(self, config: Optional[AdmissionConfig] = None):
+        self.config = config or AdmissionConfig()
+        self._in_use = 0
+        self._waiters: Deque[Tuple[int, asyncio.Future]] = deque()
+        self._seconds_per_unit = 30.0  # Updated from completed analyses
+
+    def estimate_cost(self, duration: Optional[float]) -> int:
+        """Slots needed for an analysis of `duration` seconds of audio"""
+        if not duration:
+            return 1
+        units = math.ceil(duration / self.config.cost_unit_seconds)
+        return max(1, min(self.config.max_concurrent, units))
+
+    @property
+    def in_use(self) -> int:
+        return self._in_use
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    @property
+    def saturated(self) -> bool:
+        """True when a new request would be rejected without waiting"""
+        return len(self._waiters) >= self.config.max_queue
+
+    def retry_after(self) -> int:
+        """Seconds until the current backlog is expected to drain"""
+        backlog = self._in_use + sum(cost for cost, _ in self._waiters)
+        return max(1, math.ceil(backlog * self._seconds_per_unit / self.config.max_concurrent))
+
+    @asynccontextmanager
+    async def admit(self, cost: int):
+        """Hold `cost` slots for the duration of the block"""
+        await self._acquire(cost)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(cost, time.monotonic() - start)
+
+    async def _acquire(self, cost: int):
+        if not self._waiters and self._in_use + cost <= self.config.max_concurrent:
+            self._in_use += cost
+            return
+
+        if len(self._waiters) >= self.config.max_queue:
+            raise AdmissionRejected("Analysis queue is full", self.retry_after())
+
+        future = asyncio.get_running_loop().create_future()
+        entry = (cost, future)
+        self._waiters.append(entry)
+        try:
+            await asyncio.wait_for(future, self.config.max_wait_seconds)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled():
+                # Granted just as we gave up: hand the slots back
+                self._release(cost, None)
+            else:
+                if entry in self._waiters:
+                    self._waiters.remove(entry)
+                self._wake()
+            if isinstance(e, asyncio.TimeoutError):
+                raise AdmissionRejected("Timed out waiting for an analysis slot", self.retry_after())
+            raise
+
+    def _release(self, cost: int, elapsed: Optional[float]):
+        self._in_use -= cost
+        if elapsed is not None:
+            self._seconds_per_unit = 0.8 * self._seconds_per_unit + 0.2 * (elapsed / cost)
+        self._wake()
+
+    def _wake(self):
+        while self._waiters:
+            cost, future = self._waiters[0]
+            if future.done():
+                self._waiters.popleft()
+                continue
+            if self._in_use + cost > self.config.max_concurrent:
+                break
+            self._waiters.popleft()
+            self._in_use += cost
+            future.set_result(True)
@@ -0,0 +1,344 @@
+"""
+Audio I/O Helpers
+Header-only probing of uploaded audio, in-process decoding of the preferred
+capture formats and decoding to memory-mapped PCM
+"""
+
+import mmap
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from typing import Optional, Tuple
+
+import numpy as np
+import soundfile as sf
+import soxr
+
+from services.metrics import metrics
+from services.tracing import tracer
+
+# Conservative bitrate used when the container can't be probed (bits/s)
+FALLBACK_BITRATE = 32000
+
+# Containers libsndfile decodes in-process (Ogg covers Opus and Vorbis);
+# anything else (m4a, webm, mp3) goes through an ffmpeg subprocess
+IN_PROCESS_FORMATS = {'WAV', 'WAVEX', 'RF64', 'OGG', 'FLAC'}
+
+# Upload extensions reported as metric labels; anything else is 'other' so
+# client-chosen file names can't grow the label set
+METRIC_EXTENSIONS = frozenset({'wav', 'ogg', 'opus', 'flac', 'm4a', 'mp4', 'mp3', 'webm', 'aac'})
+
+# Frames per block when streaming a file through libsndfile
+DECODE_BLOCK_FRAMES = 64 * 1024
+
+# What clients should record: mono 16 kHz (Whisper's input rate) in Ogg/Opus,
+# or raw PCM in WAV. Both decode without ffmpeg.
+CAPTURE_FORMAT = {
+    'preferred': {
+        'container': 'ogg',
+        'codec': 'opus',
+        'mimeType': 'audio/ogg;codecs=opus',
+        'extension': 'ogg',
+        'sampleRate': 16000,
+        'channels': 1,
+        'bitRate': 24000,
+    },
+    'alternatives': [
+        {
+            'container': 'wav',
+            'codec': 'pcm_s16le',
+            'mimeType': 'audio/wav',
+            'extension': 'wav',
+            'sampleRate': 16000,
+            'channels': 1,
+            'bitRate': 256000,
+        },
+    ],
+}
+
+metrics.describe("audio_decode_seconds", "Time to decode an upload, by decoder")
+metrics.describe("audio_decodes_total", "Uploads decoded, by decoder and container")
+
+
+def probe_duration(audio_path: str) -> Optional[float]:
+    """
+    Read the audio duration from the file header without decoding samples
+
+    Tries libsndfile (wav/flac/ogg) first, then ffprobe (m4a/webm/mp3).
+
+    Returns:
+        Duration in seconds, or None if the container could not be probed
+    """
+    try:
+        info = sf.info(audio_path)
+        if info.samplerate > 0 and info.frames > 0:
+            return info.frames / info.samplerate
+    except Exception:
+        pass
+
+    if shutil.which('ffprobe'):
+        try:
+            out = subprocess.run(
+                [
+                    'ffprobe', '-v', 'error',
+                    '-show_entries', 'format=duration',
+                    '-of', 'default=noprint_wrappers=1:nokey=1',
+                    audio_path
+                ],
+                capture_output=True, text=True, timeout=10
+            )
+            return float(out.stdout.strip())
+        except (ValueError, subprocess.SubprocessError):
+            pass
+
+    return None
+
+
+def estimate_duration(size_bytes: int) -> float:
+    """Rough duration estimate from the upload size (used when probing fails)"""
+    return size_bytes * 8 / FALLBACK_BITRATE
+
+
+def in_process_format(audio_path: str) -> Optional[str]:
+    """
+    Container name if libsndfile can decode the file in-process, else None
+    """
+    try:
+        info = sf.info(audio_path)
+    except Exception:
+        return None
+    return info.format if info.format in IN_PROCESS_FORMATS else None
+
+
+def _record_decode(decoder: str, container: str, sample_rate: int, start: float):
+    elapsed = tracer.record('decode', start, decoder=decoder, container=container.lower(), sample_rate=sample_rate)
+    metrics.summary("audio_decode_seconds", decoder=decoder).observe(elapsed)
+    metrics.inc("audio_decodes_total", decoder=decoder, container=container.lower())
+
+
+def metric_extension(extension: str) -> str:
+    """Extension as a bounded metric label value"""
+    extension = extension.lower()
+    return extension if extension in METRIC_EXTENSIONS else 'other'
+
+
+def _extension(audio_path: str) -> str:
+    return metric_extension(os.path.splitext(audio_path)[1].lstrip('.'))
+
+
+def _iter_in_process(audio_path: str, sample_rate: int):
+    """
+    Stream a libsndfile-readable file as mono float32 blocks at `sample_rate`
+
+    Resampling uses soxr's streaming resampler at the quality librosa uses
+    by default (soxr_hq), so the output matches librosa.load.
+    """
+    with sf.SoundFile(audio_path) as f:
+        stream = None
+        if f.samplerate != sample_rate:
+            stream = soxr.ResampleStream(f.samplerate, sample_rate, 1, dtype='float32', quality='HQ')
+        for block in f.blocks(blocksize=DECODE_BLOCK_FRAMES, dtype='float32', always_2d=True):
+            mono = block.mean(axis=1) if block.shape[1] > 1 else np.ascontiguousarray(block[:, 0])
+            yield stream.resample_chunk(mono) if stream else mono
+        if stream:
+            yield stream.resample_chunk(np.zeros(0, dtype=np.float32), last=True)
+
+
+def _probe_stream(audio_path: str) -> Optional[Tuple[int, int]]:
+    """Native (sample rate, channels) of the first audio stream, via ffprobe"""
+    if not shutil.which('ffprobe'):
+        return None
+    try:
+        out = subprocess.run(
+            [
+                'ffprobe', '-v', 'error', '-select_streams', 'a:0',
+                '-show_entries', 'stream=sample_rate,channels',
+                '-of', 'default=noprint_wrappers=1:nokey=1',
+                audio_path
+            ],
+            capture_output=True, text=True, timeout=10
+        )
+        sample_rate, channels = (int(value) for value in out.stdout.split()[:2])
+    except (ValueError, subprocess.SubprocessError):
+        return None
+    return (sample_rate, channels) if sample_rate > 0 and channels > 0 else None
+
+
+def _iter_ffmpeg(audio_path: str, native_rate: int, channels: int, sample_rate: int):
+    """
+    Stream a file decoded by ffmpeg at its native rate as mono float32
+    blocks at `sample_rate`
+
+    Same samples as librosa.load on these containers: 16-bit PCM as
+    audioread reads it, channels averaged in float, and soxr_hq
+    resampling (streamed) instead of ffmpeg's own resampler.
+    """
+    process = subprocess.Popen(
+        ['ffmpeg', '-nostdin', '-v', 'error', '-i', audio_path, '-f', 's16le', '-acodec', 'pcm_s16le', '-'],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    stream = None
+    if native_rate != sample_rate:
+        stream = soxr.ResampleStream(native_rate, sample_rate, 1, dtype='float32', quality='HQ')
+    frame_bytes = 2 * channels
+    pending = b''
+    try:
+        while True:
+            data = process.stdout.read(DECODE_BLOCK_FRAMES * frame_bytes)
+            if not data:
+                break
+            data = pending + data
+            whole = len(data) - len(data) % frame_bytes
+            data, pending = data[:whole], data[whole:]
+            samples = np.frombuffer(data, '<i2').astype(np.float32) / 32768.0
+            mono = samples.reshape(-1, channels).mean(axis=1) if channels > 1 else samples
+            yield stream.resample_chunk(mono) if stream else mono
+        if stream:
+            yield stream.resample_chunk(np.zeros(0, dtype=np.float32), last=True)
+        stderr = process.stderr.read()
+        if process.wait() != 0:
+            raise subprocess.CalledProcessError(process.returncode, 'ffmpeg', stderr=stderr)
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+
+
+def decode_audio(audio_path: str, sample_rate: int = 16000) -> np.ndarray:
+    """
+    Decode an audio file to a mono float32 array at `sample_rate`
+
+    The preferred capture formats (WAV/Ogg/FLAC) are decoded in-process;
+    other containers through an ffmpeg pipe with the same arguments as
+    whisper.load_audio, so their samples are identical to Whisper's own.
+
+    Returns:
+        Samples in [-1, 1]
+    """
+    start = time.perf_counter()
+    container = in_process_format(audio_path)
+    if container is not None:
+        blocks = list(_iter_in_process(audio_path, sample_rate))
+        audio = np.concatenate(blocks) if blocks else np.zeros(0, dtype=np.float32)
+        _record_decode('soundfile', container, sample_rate, start)
+        return audio
+
+    out = subprocess.run(
+        [
+            'ffmpeg', '-nostdin', '-threads', '0',
+            '-i', audio_path,
+            '-f', 's16le', '-ac', '1', '-acodec', 'pcm_s16le', '-ar', str(sample_rate),
+            '-'
+        ],
+        capture_output=True, check=True
+    ).stdout
+    _record_decode('ffmpeg', _extension(audio_path), sample_rate, start)
+    return np.frombuffer(out, np.int16).flatten().astype(np.float32) / 32768.0
+
+
+class PcmSpool:
+    """
+    Decoded mono float32 PCM in a memory-mapped spool file
+
+    Samples are read as copies of a range; pages touched by a read are
+    released from the process afterwards, so resident memory stays at one
+    block no matter how long the recording is. The spool file is deleted
+    on close().
+    """
+
+    def __init__(self, path: str, sample_rate: int):
+        self.path = path
+        self.sample_rate = sample_rate
+        self._file = open(path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        self.n_samples = size // 4
+        # mmap can't map an empty file
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+
+    def __len__(self) -> int:
+        return self.n_samples
+
+    @property
+    def duration(self) -> float:
+        return self.n_samples / self.sample_rate
+
+    def read(self, start: int, stop: int) -> np.ndarray:
+        """
+        Copy samples [start, stop); positions outside the signal read as zeros
+        (the same constant padding librosa applies for centered frames)
+        """
+        out = np.zeros(max(0, stop - start), dtype=np.float32)
+        lo, hi = max(start, 0), min(stop, self.n_samples)
+        if self._mm is not None and hi > lo:
+            view = np.frombuffer(self._mm, dtype='<f4', count=hi - lo, offset=lo * 4)
+            out[lo - start:hi - start] = view
+            del view  # The mmap can't be released or closed while exported
+            self.release()
+        return out
+
+    def release(self):
+        """Drop mapped pages from the resident set (they stay in the page cache)"""
+        if self._mm is not None and hasattr(mmap, 'MADV_DONTNEED'):
+            self._mm.madvise(mmap.MADV_DONTNEED)
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        if not self._file.closed:
+            self._file.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def __enter__(self) -> "PcmSpool":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def decode_to_spool(audio_path: str, sample_rate: int, spool_dir: Optional[str] = None) -> PcmSpool:
+    """
+    Decode an audio file to mono float32 PCM at `sample_rate` in a spool file
+
+    WAV/Ogg/FLAC are decoded in-process block by block; other containers
+    are decoded by ffmpeg at their native rate and streamed through the
+    same soxr_hq resampler, so both match librosa.load. Either way the
+    signal is never held in memory. Without ffmpeg/ffprobe, falls back to
+    librosa.load (which does load the whole signal).
+
+    Args:
+        audio_path: Path to the audio file
+        sample_rate: Target sample rate
+        spool_dir: Directory for the spool file (system temp dir by default)
+
+    Returns:
+        PcmSpool over the decoded samples (use as a context manager)
+    """
+    fd, spool_path = tempfile.mkstemp(suffix='.f32', dir=spool_dir)
+    os.close(fd)
+    try:
+        start = time.perf_counter()
+        container = in_process_format(audio_path)
+        if container is not None:
+            with open(spool_path, 'wb') as out:
+                for block in _iter_in_process(audio_path, sample_rate):
+                    block.astype('<f4', copy=False).tofile(out)
+            _record_decode('soundfile', container, sample_rate, start)
+        elif shutil.which('ffmpeg') and (native := _probe_stream(audio_path)) is not None:
+            with open(spool_path, 'wb') as out:
+                for block in _iter_ffmpeg(audio_path, *native, sample_rate):
+                    block.astype('<f4', copy=False).tofile(out)
+            _record_decode('ffmpeg', _extension(audio_path), sample_rate, start)
+        else:
+            import librosa
+            y, _ = librosa.load(audio_path, sr=sample_rate)
+            y.astype('<f4').tofile(spool_path)
+            del y
+            _record_decode('librosa', _extension(audio_path), sample_rate, start)
+        return PcmSpool(spool_path, sample_rate)
+    except Exception:
+        os.remove(spool_path)
+        raise
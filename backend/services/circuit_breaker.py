@@ -0,0 +1,85 @@
+"""
+Circuit Breaker
+Stops calling a failing remote service and probes it again after a cool-down
+"""
+
+import threading
+import time
+from typing import Optional
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open circuit breaker
+
+    Closed: calls pass; `failure_threshold` consecutive failures open it.
+    Open: calls are refused until `reset_timeout` seconds have passed.
+    Half-open: up to `half_open_max_calls` probe calls pass; a success
+    closes the breaker, a failure opens it again.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    STATE_CODES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}  # For the metrics gauge
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, half_open_max_calls: int = 1):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._refresh()
+            return self._state
+
+    def allow(self) -> bool:
+        """Whether a call may go out now (counts half-open probes)"""
+        return self.admit() is not None
+
+    def admit(self) -> Optional[str]:
+        """
+        Admit a call if allowed
+
+        Returns:
+            The state it was admitted in (CLOSED, or HALF_OPEN for a probe,
+            which must stay a single request), or None when refused
+        """
+        with self._lock:
+            self._refresh()
+            if self._state == self.CLOSED:
+                return self.CLOSED
+            if self._state == self.HALF_OPEN and self._probes < self.half_open_max_calls:
+                self._probes += 1
+                return self.HALF_OPEN
+            return None
+
+    def record_success(self):
+        with self._lock:
+            if self._state != self.CLOSED:
+                print("Circuit breaker closed")
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probes = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    print(f"Circuit breaker opened after {self._failures} failures")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probes = 0
+
+    def _refresh(self):
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._probes = 0
@@ -3,7 +3,7 @@ Explainability Engine - Enhanced Version
 Generates comprehensive timeline markers and recommendations with improved accuracy
 """
 
-from typing import List, Dict
+from typing import List, Dict, Optional
 from dataclasses import dataclass
 from services.prosody_analyzer import ProsodyMetrics
 from services.filler_detector import FillerWord
@@ -44,6 +44,10 @@ class ExplainabilityEngine:
     
     # Energy and pauses
     OPTIMAL_ENERGY_VARIANCE = (0.25, 0.45)
+    HIGH_ENERGY_VARIANCE = 0.5  # Nervous energy
+    # Std of normalized RMS within a prosody window (values in [0, 1], so at
+    # most 0.5); steady speech with short gaps stays around 0.15-0.25
+    WINDOW_ENERGY_STD = 0.3
     EXCESSIVE_PAUSES_THRESHOLD = 8
     LONG_PAUSE_DURATION = 0.8  # seconds
     
@@ -65,6 +69,54 @@ class ExplainabilityEngine:
         'nervous': '#F472B6',     # Pink 400
     }
     
+    # Class attributes that may be overridden per instance (threshold tuning)
+    TUNABLE_THRESHOLDS = (
+        'OPTIMAL_WPM_RANGE', 'SLOW_WPM_THRESHOLD', 'FAST_WPM_THRESHOLD',
+        'OPTIMAL_PITCH_STD_RANGE', 'HIGH_PITCH_STD_THRESHOLD', 'LOW_PITCH_STD_THRESHOLD',
+        'OPTIMAL_ENERGY_VARIANCE', 'HIGH_ENERGY_VARIANCE', 'WINDOW_ENERGY_STD', 'EXCESSIVE_PAUSES_THRESHOLD',
+        'LONG_PAUSE_DURATION', 'FILLER_RATE_THRESHOLDS',
+    )
+    
+    # Per-language defaults applied before any explicit overrides. The class
+    # values above are tuned for Spanish; English carries fewer syllables
+    # per word, so comfortable presentation pace is higher in WPM.
+    LANGUAGE_THRESHOLDS = {
+        'es': {},
+        'en': {
+            'OPTIMAL_WPM_RANGE': (130, 160),
+            'SLOW_WPM_THRESHOLD': 110,
+            'FAST_WPM_THRESHOLD': 185,
+        },
+    }
+    
+    def __init__(self, thresholds: Optional[Dict] = None, language: str = 'es'):
+        """
+        Args:
+            thresholds: Optional overrides of the class thresholds, keyed by
+                attribute name (e.g. {'OPTIMAL_WPM_RANGE': (115, 145)}).
+                FILLER_RATE_THRESHOLDS may be given partially.
+            language: Spoken language ('es', 'en'); selects the WPM
+                thresholds (unknown languages use the Spanish ones)
+        """
+        self.language = language
+        for name, value in self.LANGUAGE_THRESHOLDS.get(language, {}).items():
+            setattr(self, name, value)
+        for name, value in (thresholds or {}).items():
+            if name not in self.TUNABLE_THRESHOLDS:
+                raise ValueError(f"Unknown threshold: {name}")
+            if name == 'FILLER_RATE_THRESHOLDS':
+                value = {**self.FILLER_RATE_THRESHOLDS, **value}
+            elif isinstance(value, list):
+                value = tuple(value)
+            setattr(self, name, value)
+        # The pacing ramps divide by the gaps between these
+        low, high = self.OPTIMAL_WPM_RANGE
+        if not self.SLOW_WPM_THRESHOLD < low <= high < self.FAST_WPM_THRESHOLD:
+            raise ValueError(
+                f"OPTIMAL_WPM_RANGE {low}-{high} must lie strictly between "
+                f"SLOW_WPM_THRESHOLD ({self.SLOW_WPM_THRESHOLD}) and FAST_WPM_THRESHOLD ({self.FAST_WPM_THRESHOLD})"
+            )
+    
     def generate_report(
         self,
         prosody: ProsodyMetrics,
@@ -216,7 +268,7 @@ class ExplainabilityEngine:
             nervousness += min(2.5, (filler_rate - 5) * 0.3)
         
         # Energy inconsistency (nervous energy)
-        if prosody.energy_variance > 0.5:
+        if prosody.energy_variance > self.HIGH_ENERGY_VARIANCE:
             nervousness += 1.5
         
         nervousness = max(0, min(10, nervousness))
@@ -228,6 +280,134 @@ class ExplainabilityEngine:
             nervousness=round(nervousness, 1)
         )
     
+    def calculate_scores_batch(
+        self,
+        features: Dict[str, np.ndarray],
+        fuse_semantic: bool = False
+    ) -> Dict[str, np.ndarray]:
+        """
+        Vectorized `_calculate_scores` over many sessions at once
+        
+        Args:
+            features: Equal-length arrays 'pitch_std', 'energy_variance',
+                'pause_count', 'speech_rate_wpm', 'filler_count', 'duration'
+                and, for semantic fusion, 'has_semantic',
+                'semantic_confidence', 'semantic_clarity', 'content_score'
+            fuse_semantic: Apply the acoustic/semantic fusion where available
+            
+        Returns:
+            Dictionary of score arrays (confidence, clarity, pacing, nervousness)
+        """
+        pitch_std = np.asarray(features['pitch_std'], dtype=np.float64)
+        energy = np.asarray(features['energy_variance'], dtype=np.float64)
+        wpm = np.asarray(features['speech_rate_wpm'], dtype=np.float64)
+        minutes = np.maximum(1, np.asarray(features['duration'], dtype=np.float64) / 60)
+        pause_rate = np.asarray(features['pause_count'], dtype=np.float64) / minutes
+        filler_rate = np.asarray(features['filler_count'], dtype=np.float64) / minutes
+        
+        # === CONFIDENCE ===
+        confidence = 10.0 + np.select(
+            [energy < self.OPTIMAL_ENERGY_VARIANCE[0], energy > self.OPTIMAL_ENERGY_VARIANCE[1]],
+            [-2.5, -1.5], 0.5
+        )
+        confidence += np.select(
+            [pitch_std < self.LOW_PITCH_STD_THRESHOLD, pitch_std > self.HIGH_PITCH_STD_THRESHOLD],
+            [-1.5, -2.0], 0.5
+        )
+        excess_pauses = pause_rate - self.EXCESSIVE_PAUSES_THRESHOLD
+        confidence -= np.where(excess_pauses > 0, np.minimum(2.0, excess_pauses * 0.3), 0.0)
+        confidence = np.clip(confidence, 0, 10)
+        
+        # === CLARITY ===
+        thresholds = self.FILLER_RATE_THRESHOLDS
+        clarity = np.select(
+            [
+                filler_rate < thresholds['excellent'],
+                filler_rate < thresholds['good'],
+                filler_rate < thresholds['moderate'],
+                filler_rate < thresholds['poor'],
+            ],
+            [
+                10.0,
+                8.5 - (filler_rate - 2) * 0.5,
+                7.0 - (filler_rate - 4) * 0.4,
+                5.0 - (filler_rate - 7) * 0.5,
+            ],
+            np.maximum(2.0, 5.0 - (filler_rate - 10) * 0.3)
+        )
+        clarity += np.where((energy >= 0.3) & (energy <= 0.4), 0.5, 0.0)
+        clarity = np.clip(clarity, 0, 10)
+        
+        # === HYBRID FUSION ===
+        if fuse_semantic:
+            has_semantic = np.asarray(features['has_semantic'], dtype=bool)
+            fused_confidence = np.clip(
+                confidence * 0.6 + np.asarray(features['semantic_confidence']) * 0.4, 0, 10
+            )
+            fused_clarity = clarity * 0.5 + np.asarray(features['semantic_clarity']) * 0.5
+            fused_clarity = np.where(
+                np.asarray(features['content_score']) > 8.0,
+                np.minimum(10, fused_clarity * 1.1),
+                fused_clarity
+            )
+            fused_clarity = np.clip(fused_clarity, 0, 10)
+            confidence = np.where(has_semantic, fused_confidence, confidence)
+            clarity = np.where(has_semantic, fused_clarity, clarity)
+        
+        # === PACING ===
+        low, high = self.OPTIMAL_WPM_RANGE
+        pacing = np.select(
+            [
+                (wpm >= low) & (wpm <= high),
+                wpm < self.SLOW_WPM_THRESHOLD,
+                wpm < low,
+                wpm <= self.FAST_WPM_THRESHOLD,
+            ],
+            [
+                10.0,
+                np.maximum(4.0, 10.0 - (self.SLOW_WPM_THRESHOLD - wpm) * 0.08),
+                8.0 + ((wpm - self.SLOW_WPM_THRESHOLD) / (low - self.SLOW_WPM_THRESHOLD)) * 2.0,
+                8.0 - ((wpm - high) / (self.FAST_WPM_THRESHOLD - high)) * 3.0,
+            ],
+            np.maximum(3.0, 5.0 - (wpm - self.FAST_WPM_THRESHOLD) * 0.05)
+        )
+        pacing = np.clip(pacing, 0, 10)
+        
+        # === NERVOUSNESS ===
+        excess_pitch = pitch_std - self.HIGH_PITCH_STD_THRESHOLD
+        nervousness = np.where(excess_pitch > 0, np.minimum(4.0, excess_pitch * 0.05), 0.0)
+        nervousness += np.where(excess_pauses > 0, np.minimum(3.0, excess_pauses * 0.4), 0.0)
+        nervousness += np.where(filler_rate > 5, np.minimum(2.5, (filler_rate - 5) * 0.3), 0.0)
+        nervousness += np.where(energy > self.HIGH_ENERGY_VARIANCE, 1.5, 0.0)
+        nervousness = np.clip(nervousness, 0, 10)
+        
+        # Python's round() so batch scores match the per-session scores exactly
+        def round1(values: np.ndarray) -> np.ndarray:
+            return np.array([round(v, 1) for v in values.tolist()])
+        
+        return {
+            'confidence': round1(confidence),
+            'clarity': round1(clarity),
+            'pacing': round1(pacing),
+            'nervousness': round1(nervousness),
+        }
+    
+    @staticmethod
+    def merge_semantic_recommendations(recommendations: List[str], gemini_analysis: Optional[Dict]) -> List[str]:
+        """Merge recommendations (Physical + Semantic)"""
+        combined = list(recommendations)
+        
+        if gemini_analysis:
+            # Add top improvement from Gemini as prioritization
+            if gemini_analysis.get('key_improvements'):
+                combined.insert(0, f"🧠 CONTENIDO: {gemini_analysis['key_improvements'][0]}")
+            
+            # Add positive highlight
+            if gemini_analysis.get('positive_highlights'):
+                combined.append(f"✨ DESTACADO: {gemini_analysis['positive_highlights'][0]}")
+        
+        return combined
+    
     def _generate_timeline_markers(
         self,
         prosody: ProsodyMetrics,
@@ -280,11 +460,111 @@ class ExplainabilityEngine:
                        f"Total de pausas: {prosody.pause_count}"
             ))
         
+        # Add local pace / nervousness markers from the windowed analysis
+        markers.extend(self._generate_window_markers(prosody, duration))
+        
         # Sort markers by start time
         markers.sort(key=lambda m: m.start)
         
         return markers
     
+    def _generate_window_markers(
+        self,
+        prosody: ProsodyMetrics,
+        duration: float
+    ) -> List[TimelineMarker]:
+        """
+        Generate 'fast', 'slow', 'nervous' and 'confident' markers from the
+        sliding-window prosody statistics
+        
+        Each window is classified (nervous > fast > slow > confident) and
+        consecutive windows with the same class are merged into one marker.
+        """
+        windows = prosody.windows
+        if windows is None or len(windows.starts) == 0:
+            return []
+        
+        wpm = windows.speech_rate_wpm
+        pitch_std = windows.pitch_std
+        
+        nervous = (pitch_std > self.HIGH_PITCH_STD_THRESHOLD) | \
+                  (windows.energy_std > self.WINDOW_ENERGY_STD)
+        fast = wpm > self.FAST_WPM_THRESHOLD
+        slow = (wpm > 0) & (wpm < self.SLOW_WPM_THRESHOLD)
+        confident = (wpm >= self.OPTIMAL_WPM_RANGE[0]) & (wpm <= self.OPTIMAL_WPM_RANGE[1]) & \
+                    (pitch_std >= self.OPTIMAL_PITCH_STD_RANGE[0]) & \
+                    (pitch_std <= self.OPTIMAL_PITCH_STD_RANGE[1])
+        types = np.array(['', 'nervous', 'fast', 'slow', 'confident'])
+        codes = np.select([nervous, fast, slow, confident], [1, 2, 3, 4], default=0)
+        
+        # Runs of equal class; each window "owns" the step centered in it
+        change = np.flatnonzero(np.diff(codes)) + 1
+        run_starts = np.concatenate(([0], change))
+        run_ends = np.concatenate((change, [len(codes)]))
+        offset = (windows.window_seconds - windows.step_seconds) / 2
+        
+        markers = []
+        for first, stop in zip(run_starts, run_ends):
+            marker_type = types[codes[first]]
+            if not marker_type:
+                continue
+            
+            start = max(0.0, float(windows.starts[first] + offset))
+            end = min(duration, float(windows.starts[stop - 1] + offset + windows.step_seconds))
+            run_wpm = wpm[first:stop]
+            run_pitch_std = pitch_std[first:stop]
+            
+            if marker_type == 'fast':
+                peak = float(run_wpm.max())
+                excess = peak - self.FAST_WPM_THRESHOLD
+                label = "Ritmo acelerado"
+                reason = f"Velocidad local de hasta {peak:.0f} PPM (límite {self.FAST_WPM_THRESHOLD} PPM)."
+            elif marker_type == 'slow':
+                low = float(run_wpm.min())
+                excess = self.SLOW_WPM_THRESHOLD - low
+                label = "Ritmo lento"
+                reason = f"Velocidad local de {low:.0f} PPM (mínimo recomendado {self.SLOW_WPM_THRESHOLD} PPM)."
+            elif marker_type == 'nervous':
+                pitch_peak = float(run_pitch_std.max())
+                energy_peak = float(windows.energy_std[first:stop].max())
+                # Mention only the criteria that tripped in this run
+                causes = []
+                excess = 0.0
+                if energy_peak > self.WINDOW_ENERGY_STD:
+                    causes.append(f"volumen muy irregular (desviación {energy_peak:.2f})")
+                    # Severity on a Hz-like scale: 0.1 over the limit ~ 10 Hz
+                    excess = (energy_peak - self.WINDOW_ENERGY_STD) * 100
+                if pitch_peak > self.HIGH_PITCH_STD_THRESHOLD:
+                    causes.insert(0, f"variación de tono de {pitch_peak:.0f} Hz")
+                    excess = max(excess, pitch_peak - self.HIGH_PITCH_STD_THRESHOLD)
+                label = "Posible nerviosismo"
+                reason = " y ".join(causes) + " en este tramo."
+                reason = reason[0].upper() + reason[1:]
+            else:
+                excess = 0.0
+                label = "Tramo con confianza"
+                reason = (f"Ritmo de {float(run_wpm.mean()):.0f} PPM y variación de tono natural "
+                          f"({float(run_pitch_std.mean()):.0f} Hz).")
+            
+            if excess > 30:
+                severity = 'high'
+            elif excess > 15:
+                severity = 'medium'
+            else:
+                severity = 'low'
+            
+            markers.append(TimelineMarker(
+                start=round(start, 2),
+                end=round(end, 2),
+                type=marker_type,
+                severity=severity,
+                color=self.COLORS[marker_type],
+                label=label,
+                reason=reason
+            ))
+        
+        return markers
+    
     def _generate_recommendations(
         self,
         prosody: ProsodyMetrics,
@@ -0,0 +1,235 @@
+"""
+Feature Store
+Persists the intermediate features of each analysis (prosody metrics,
+filler words, transcript, semantic result) so scores, markers and
+recommendations can be recomputed without the audio
+"""
+
+import sqlite3
+import threading
+from dataclasses import dataclass, fields
+from typing import Dict, List, Optional
+
+import msgpack
+import numpy as np
+
+from services.prosody_analyzer import ProsodyMetrics, WindowedProsody
+from services.filler_detector import FillerWord
+
+# Scalar columns read straight into NumPy arrays for batch re-scoring
+SCALAR_FEATURES = (
+    'duration',
+    'pitch_std',
+    'energy_variance',
+    'pause_count',
+    'speech_rate_wpm',
+    'filler_count',
+    'has_semantic',
+    'semantic_confidence',
+    'semantic_clarity',
+    'content_score',
+)
+
+
+@dataclass
+class StoredFeatures:
+    analysis_id: str
+    user_id: str
+    analyzed_at: str
+    duration: float
+    prosody: ProsodyMetrics
+    fillers: List[FillerWord]
+    transcription: Optional[str]
+    gemini_result: Optional[Dict]
+    language: str = 'es'
+
+
+def _pack_prosody(prosody: ProsodyMetrics) -> Dict:
+    doc = {f.name: getattr(prosody, f.name) for f in fields(ProsodyMetrics) if f.name != 'windows'}
+    doc['pause_locations'] = [float(p) for p in prosody.pause_locations]
+    if prosody.windows is not None:
+        doc['windows'] = {
+            f.name: (
+                np.asarray(getattr(prosody.windows, f.name), dtype='<f8').tobytes()
+                if isinstance(getattr(prosody.windows, f.name), np.ndarray)
+                else getattr(prosody.windows, f.name)
+            )
+            for f in fields(WindowedProsody)
+        }
+    return doc
+
+
+def _unpack_prosody(doc: Dict) -> ProsodyMetrics:
+    windows = doc.pop('windows', None)
+    if windows is not None:
+        windows = WindowedProsody(**{
+            name: np.frombuffer(value, dtype='<f8') if isinstance(value, bytes) else value
+            for name, value in windows.items()
+        })
+    return ProsodyMetrics(windows=windows, **doc)
+
+
+class FeatureStore:
+    """
+    SQLite table of per-analysis features
+
+    Each row keeps the scalar inputs of the scoring formulas as columns (so
+    an archive can be loaded into NumPy arrays with one query) and the full
+    feature set as a MessagePack blob for marker/recommendation rebuilds.
+    """
+
+    def __init__(self, db_path: str = "speakeasy.db"):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        scalar_columns = ', '.join(f"{name} REAL NOT NULL" for name in SCALAR_FEATURES)
+        with self._conn:
+            self._conn.executescript(f"""
+                CREATE TABLE IF NOT EXISTS analysis_features (
+                    analysis_id TEXT PRIMARY KEY,
+                    user_id TEXT NOT NULL,
+                    analyzed_at TEXT NOT NULL,
+                    language TEXT NOT NULL DEFAULT 'es',
+                    {scalar_columns},
+                    features BLOB NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_features_user_time
+                    ON analysis_features (user_id, analyzed_at);
+                CREATE INDEX IF NOT EXISTS idx_features_time
+                    ON analysis_features (analyzed_at);
+            """)
+            # Stores created before the language was recorded (all Spanish)
+            columns = {row['name'] for row in self._conn.execute("PRAGMA table_info(analysis_features)")}
+            if 'language' not in columns:
+                self._conn.execute(
+                    "ALTER TABLE analysis_features ADD COLUMN language TEXT NOT NULL DEFAULT 'es'"
+                )
+
+    def save(
+        self,
+        analysis_id: str,
+        user_id: str,
+        analyzed_at: str,
+        duration: float,
+        prosody: ProsodyMetrics,
+        fillers: List[FillerWord],
+        transcription: Optional[str],
+        gemini_result: Optional[Dict],
+        language: str = 'es'
+    ):
+        """Persist the features of one analysis"""
+        with self._lock, self._conn:
+            self.write(self._conn, analysis_id, user_id, analyzed_at, duration,
+                       prosody, fillers, transcription, gemini_result, language)
+
+    @staticmethod
+    def write(
+        conn: sqlite3.Connection,
+        analysis_id: str,
+        user_id: str,
+        analyzed_at: str,
+        duration: float,
+        prosody: ProsodyMetrics,
+        fillers: List[FillerWord],
+        transcription: Optional[str],
+        gemini_result: Optional[Dict],
+        language: str = 'es'
+    ):
+        """Write the features on `conn`, inside the caller's transaction"""
+        semantic = gemini_result or {}
+        scalars = {
+            'duration': float(duration),
+            'pitch_std': float(prosody.pitch_std),
+            'energy_variance': float(prosody.energy_variance),
+            'pause_count': float(prosody.pause_count),
+            'speech_rate_wpm': float(prosody.speech_rate_wpm),
+            'filler_count': float(len(fillers)),
+            'has_semantic': 1.0 if gemini_result else 0.0,
+            # Same defaults as the fusion in ExplainabilityEngine._calculate_scores
+            'semantic_confidence': float(semantic.get('semantic_confidence', 5.0)),
+            'semantic_clarity': float(semantic.get('semantic_clarity', 5.0)),
+            'content_score': float(semantic.get('content_score', 5.0)),
+        }
+        blob = msgpack.packb({
+            'prosody': _pack_prosody(prosody),
+            'fillers': [[f.word, f.start, f.end, f.confidence] for f in fillers],
+            'transcription': transcription,
+            'gemini_result': gemini_result,
+        }, use_bin_type=True)
+
+        conn.execute(
+            f"INSERT OR REPLACE INTO analysis_features "
+            f"(analysis_id, user_id, analyzed_at, language, {', '.join(SCALAR_FEATURES)}, features) "
+            f"VALUES (?, ?, ?, ?, {', '.join('?' * len(SCALAR_FEATURES))}, ?)",
+            (analysis_id, user_id, analyzed_at, language, *scalars.values(), blob)
+        )
+
+    @staticmethod
+    def _where(analysis_ids: Optional[List[str]], user_id: Optional[str], since: Optional[str]):
+        clauses, params = [], []
+        if analysis_ids is not None:
+            clauses.append(f"analysis_id IN ({', '.join('?' * len(analysis_ids))})")
+            params.extend(analysis_ids)
+        if user_id is not None:
+            clauses.append("user_id = ?")
+            params.append(user_id)
+        if since is not None:
+            clauses.append("analyzed_at >= ?")
+            params.append(since)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def load_scalars(
+        self,
+        analysis_ids: Optional[List[str]] = None,
+        user_id: Optional[str] = None,
+        since: Optional[str] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        Scalar features of the selected analyses as column arrays
+
+        Returns:
+            Dictionary with 'analysis_id' and 'language' (object arrays) and
+            one float array per name in SCALAR_FEATURES, ordered by analysis time
+        """
+        where, params = self._where(analysis_ids, user_id, since)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT analysis_id, language, {', '.join(SCALAR_FEATURES)} FROM analysis_features"
+                f"{where} ORDER BY analyzed_at", params
+            ).fetchall()
+
+        ids = np.array([row[0] for row in rows], dtype=object)
+        languages = np.array([row[1] for row in rows], dtype=object)
+        values = np.array([tuple(row)[2:] for row in rows], dtype=np.float64).reshape(len(rows), len(SCALAR_FEATURES))
+        columns = {name: values[:, i] for i, name in enumerate(SCALAR_FEATURES)}
+        columns['analysis_id'] = ids
+        columns['language'] = languages
+        return columns
+
+    def load(self, analysis_id: str) -> Optional[StoredFeatures]:
+        """Full feature set of one analysis"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT analysis_id, user_id, analyzed_at, language, duration, features "
+                "FROM analysis_features WHERE analysis_id = ?", (analysis_id,)
+            ).fetchone()
+        if row is None:
+            return None
+
+        doc = msgpack.unpackb(row['features'], raw=False)
+        return StoredFeatures(
+            analysis_id=row['analysis_id'],
+            user_id=row['user_id'],
+            analyzed_at=row['analyzed_at'],
+            duration=row['duration'],
+            prosody=_unpack_prosody(doc['prosody']),
+            fillers=[FillerWord(word, start, end, confidence) for word, start, end, confidence in doc['fillers']],
+            transcription=doc['transcription'],
+            gemini_result=doc['gemini_result'],
+            language=row['language'],
+        )
+
+    def close(self):
+        self._conn.close()
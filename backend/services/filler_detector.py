@@ -3,11 +3,64 @@ Filler Word Detection Service - Enhanced for Accuracy
 Uses Whisper 'small' model with optimized parameters to prevent hallucinations
 """
 
+import os
 import whisper
+import torch
+import numpy as np
 import re
-from typing import List, Dict
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Dict, Optional, Tuple, Union
 from dataclasses import dataclass
 
+from services.audio_io import decode_audio
+from services.metrics import metrics
+from services.stubs import StubWhisperModel, asr_stub_enabled
+from services.tracing import tracer
+
+# Whisper models are loaded once per process and shared by all detectors.
+# Decoding installs KV-cache hooks on the shared modules, so calls into one
+# model are serialized with a per-model lock.
+_MODEL_CACHE: Dict[str, object] = {}
+_MODEL_LOCK = threading.Lock()
+_INFERENCE_LOCKS: Dict[int, threading.Lock] = {}
+
+# Word alignment modes:
+#   'candidates': transcribe once without word timestamps, then align only
+#                 the windows whose text contains a filler candidate
+#   'full':       same transcription, every window aligned (reference)
+#   'whisper':    Whisper's own word-timestamp transcription plus a second
+#                 plain pass for the transcript (previous behaviour)
+ALIGNMENT_MODES = ('candidates', 'full', 'whisper')
+
+metrics.describe("asr_windows_total", "Transcribed 30-second windows, by alignment mode")
+metrics.describe("asr_windows_aligned_total", "Windows word-aligned, by alignment mode")
+
+def load_whisper_model(model_size: str):
+    """Load (or reuse) a Whisper model, falling back to 'base' on failure"""
+    # Span opened under the lock so cache_hit is what this call finds;
+    # the wait for a concurrent load is recorded separately
+    start = time.perf_counter()
+    with _MODEL_LOCK:
+        lock_wait = time.perf_counter() - start
+        with tracer.span('load_model', model_size=model_size, lock_wait=lock_wait,
+                         cache_hit=model_size in _MODEL_CACHE):
+            if model_size not in _MODEL_CACHE and asr_stub_enabled():
+                print(f"Using stub ASR model for: {model_size}")
+                _MODEL_CACHE[model_size] = StubWhisperModel(model_size)
+            if model_size not in _MODEL_CACHE:
+                print(f"Loading Whisper model: {model_size}")
+                try:
+                    _MODEL_CACHE[model_size] = whisper.load_model(model_size)
+                except Exception:
+                    print("Failed to load requested model, falling back to base")
+                    if "base" not in _MODEL_CACHE:
+                        _MODEL_CACHE["base"] = whisper.load_model("base")
+                    _MODEL_CACHE[model_size] = _MODEL_CACHE["base"]
+            _INFERENCE_LOCKS.setdefault(id(_MODEL_CACHE[model_size]), threading.Lock())
+            return _MODEL_CACHE[model_size]
+
 @dataclass
 class FillerWord:
     word: str
@@ -15,6 +68,12 @@ class FillerWord:
     end: float
     confidence: float
 
+@dataclass
+class TranscriptSegment:
+    start: float
+    end: float
+    text: str
+
 class FillerDetector:
     """
     Detects filler words in speech using Whisper transcription
@@ -32,85 +91,264 @@ class FillerDetector:
         ]
     }
     
-    def __init__(self, model_size: str = "small"):
+    # Context prompts (per language) that keep Whisper on the spoken language
+    INITIAL_PROMPTS = {
+        'en': (
+            "This is a clear recording of a speech or presentation in English. "
+            "The speaker talks fluently about a specific topic."
+        ),
+        'es': (
+            "Esta es una grabación clara de un discurso o presentación en español. "
+            "El orador habla con fluidez sobre un tema específico."
+        ),
+    }
+    
+    def __init__(
+        self,
+        model_size: str = "small",
+        alignment: Optional[str] = None,
+        beam_size: Optional[int] = None
+    ):
         """
         Initialize Whisper model
         
         Args:
             model_size: Whisper model size. Defaults to 'small' for better accuracy than 'base'.
+            alignment: Word alignment mode (see ALIGNMENT_MODES); defaults to
+                SPEAKEASY_WORD_ALIGNMENT or 'candidates'
+            beam_size: Beam search width (1 = greedy); defaults to
+                SPEAKEASY_ASR_BEAM_SIZE or 5
         """
-        print(f"Loading Whisper model: {model_size}")
-        try:
-            self.model = whisper.load_model(model_size)
-        except Exception:
-            print("Failed to load requested model, falling back to base")
-            self.model = whisper.load_model("base")
+        self.model = load_whisper_model(model_size)
         self.model_size = model_size
+        self._inference_lock = _INFERENCE_LOCKS[id(self.model)]
+        self.alignment = alignment or os.getenv("SPEAKEASY_WORD_ALIGNMENT", "candidates")
+        if self.alignment not in ALIGNMENT_MODES:
+            raise ValueError(f"Unknown word alignment mode: {self.alignment}")
+        self.beam_size = beam_size or int(os.getenv("SPEAKEASY_ASR_BEAM_SIZE", "5"))
+    
+    def load_audio(self, audio_path: str) -> np.ndarray:
+        """
+        Decode audio once (16 kHz mono float32) for language detection and
+        both transcription passes
+        
+        WAV/Ogg/FLAC uploads are decoded in-process; other containers
+        go through ffmpeg as in whisper.load_audio.
+        """
+        return decode_audio(audio_path, whisper.audio.SAMPLE_RATE)
+    
+    def detect_language(self, audio: Union[str, np.ndarray], default: str = 'es') -> str:
+        """
+        Identify the spoken language from the first 30-second window
+        
+        Only languages with a filler lexicon are considered; the most
+        probable of them is returned.
+        
+        Args:
+            audio: Decoded audio from load_audio (or a path)
+            default: Returned when the model can't identify languages
+        """
+        if isinstance(audio, str):
+            audio = self.load_audio(audio)
+        
+        if not getattr(self.model, 'is_multilingual', True):
+            return 'en'  # English-only checkpoints (*.en)
+        
+        # Same window and precision as Whisper's own detection in transcribe()
+        dtype = torch.float16 if str(self.model.device).startswith('cuda') else torch.float32
+        with tracer.span('detect_language', model_size=self.model_size) as span:
+            mel = whisper.log_mel_spectrogram(whisper.pad_or_trim(audio), self.model.dims.n_mels)
+            try:
+                with self._locked(span):
+                    _, probs = self.model.detect_language(mel.to(self.model.device).to(dtype))
+            except Exception as e:
+                print(f"Language detection failed ({e}); using '{default}'")
+                span.set(language=default, fallback=True)
+                return default
+            
+            supported = {lang: probs.get(lang, 0.0) for lang in self.FILLER_PATTERNS}
+            language = max(supported, key=supported.get)
+            span.set(language=language, probability=float(supported[language]))
+        print(f"Detected language: {language} (p={supported[language]:.2f})")
+        return language
     
-    def _transcribe_optimized(self, audio_path: str, language: str, word_timestamps: bool = False):
+    @contextmanager
+    def _locked(self, span):
+        """Hold the model's inference lock, recording the wait on `span`"""
+        start = time.perf_counter()
+        with self._inference_lock:
+            span.set(lock_wait=time.perf_counter() - start)
+            yield
+    
+    def _transcribe_optimized(self, audio: Union[str, np.ndarray], language: str, word_timestamps: bool = False):
         """
         Helper to run transcription with anti-hallucination parameters
         """
         # Context prompt helps Whisper stick to the correct language and context
-        initial_prompt = (
-            "Esta es una grabación clara de un discurso o presentación en español. "
-            "El orador habla con fluidez sobre un tema específico."
-        )
+        initial_prompt = self.INITIAL_PROMPTS.get(language, self.INITIAL_PROMPTS['es'])
         
-        return self.model.transcribe(
-            audio_path,
-            language=language,
-            word_timestamps=word_timestamps,
-            verbose=False,
-            # Anti-hallucination & Anti-loop parameters:
-            temperature=0.0,           # Deterministic output
-            best_of=5,                 # Beam search size
-            beam_size=5,               # Higher beam size
-            patience=1.0,              
+        with tracer.span(
+            'transcribe',
+            model_size=self.model_size,
+            beam_size=self.beam_size,
+            word_timestamps=word_timestamps
+        ) as span, self._locked(span):
+            return self.model.transcribe(
+                audio,
+                language=language,
+                word_timestamps=word_timestamps,
+                verbose=False,
+                # Anti-hallucination & Anti-loop parameters:
+                temperature=0.0,           # Deterministic output
+                best_of=self.beam_size,    # Beam search size
+                beam_size=self.beam_size,  # Higher beam size
+                patience=1.0,              
             
-            # CRITICAL FIXES FOR REPETITION LOOPS:
-            condition_on_previous_text=False, # Disable context looking back (prevents "Hola Hola Hola")
-            compression_ratio_threshold=1.35, # Aggressively fail if text is too repetitive
-            logprob_threshold=-0.8,           # Discard detection if confidence is low
-            no_speech_threshold=0.4,          # Higher threshold for expecting silence
+                # CRITICAL FIXES FOR REPETITION LOOPS:
+                condition_on_previous_text=False, # Disable context looking back (prevents "Hola Hola Hola")
+                compression_ratio_threshold=1.35, # Aggressively fail if text is too repetitive
+                logprob_threshold=-0.8,           # Discard detection if confidence is low
+                no_speech_threshold=0.4,          # Higher threshold for expecting silence
             
-            initial_prompt=initial_prompt
-        )
+                initial_prompt=initial_prompt
+            )
 
-    def detect(self, audio_path: str, language: str = 'es') -> List[FillerWord]:
+    def analyze(
+        self,
+        audio: Union[str, np.ndarray],
+        language: str = 'es'
+    ) -> Tuple[List[FillerWord], str, List[TranscriptSegment]]:
         """
-        Detect filler words in audio file
+        Filler words, transcription and ASR segments of audio
+        
+        In 'candidates' mode (the default) this is a single transcription
+        pass without word timestamps; only the windows whose text contains a
+        filler candidate are word-aligned afterwards. Filler times are the
+        same as aligning every window ('full').
+        
+        Args:
+            audio: Decoded audio from load_audio (or a path)
+            language: Spoken language
+        
+        Returns:
+            (fillers, transcription, segments)
         """
-        # Transcribe with word-level timestamps
-        result = self._transcribe_optimized(audio_path, language, word_timestamps=True)
+        if self.alignment == 'whisper' or isinstance(self.model, StubWhisperModel):
+            fillers = self._detect_whisper_words(audio, language)
+            transcription, segments = self.get_transcription_segments(audio, language)
+            return fillers, transcription, segments
         
-        fillers = []
+        if isinstance(audio, str):
+            audio = self.load_audio(audio)
         
-        # Get filler patterns for language
+        result = self._transcribe_optimized(audio, language, word_timestamps=False)
+        fillers = self._detect_in_windows(audio, result, language)
+        return fillers, result.get('text', '').strip(), self._segments(result)
+    
+    def detect(self, audio: Union[str, np.ndarray], language: str = 'es') -> List[FillerWord]:
+        """
+        Detect filler words in audio (a path or audio from load_audio)
+        """
+        fillers, _, _ = self.analyze(audio, language)
+        return fillers
+    
+    def _filler_pattern(self, language: str) -> str:
         patterns = self.FILLER_PATTERNS.get(language, self.FILLER_PATTERNS['en'])
-        combined_pattern = '|'.join(patterns)
+        return '|'.join(patterns)
+    
+    @staticmethod
+    def _clean_word(text: str) -> str:
+        return re.sub(r'[.,¡!¿?]', '', text.strip().lower())
+    
+    def _has_candidate(self, text: str, pattern: str) -> bool:
+        """
+        Whether segment text may hold a filler word
+        
+        Checked on the raw text, the text cleaned like a word and each
+        space-separated token, so no filler the word scan would find is
+        missed (false positives only cost an alignment).
+        """
+        if re.search(pattern, text, re.IGNORECASE) or re.search(pattern, self._clean_word(text), re.IGNORECASE):
+            return True
+        return any(re.search(pattern, self._clean_word(token), re.IGNORECASE) for token in text.split())
+    
+    def _to_filler(self, word_info: Dict) -> FillerWord:
+        return FillerWord(
+            word=self._clean_word(word_info.get('word', '')),
+            start=word_info.get('start', 0.0),
+            end=word_info.get('end', 0.0),
+            confidence=word_info.get('probability', 0.0)
+        )
+    
+    def _detect_in_windows(self, audio: np.ndarray, result: Dict, language: str) -> List[FillerWord]:
+        """Word-align the windows of a plain transcription and collect fillers"""
+        from services.word_alignment import WindowAligner
+        
+        pattern = self._filler_pattern(language)
+        is_filler = lambda word: bool(re.search(pattern, self._clean_word(word.get('word', '')), re.IGNORECASE))
+        aligner = WindowAligner(self.model, audio, result.get('segments', []), language)
+        
+        words = []
+        with tracer.span('word_alignment', mode=self.alignment) as span, self._locked(span):
+            if self.alignment == 'full':
+                for segments in aligner.align_all():
+                    words.extend(w for segment in segments for w in segment['words'] if is_filler(w))
+            else:
+                for index in range(len(aligner)):
+                    if self._has_candidate(aligner.window_text(index), pattern):
+                        words.extend(aligner.matching_words(index, is_filler))
+            span.set(windows=len(aligner), alignments=aligner.alignments, fillers=len(words))
+        
+        metrics.inc("asr_windows_total", len(aligner), mode=self.alignment)
+        metrics.inc("asr_windows_aligned_total", aligner.alignments, mode=self.alignment)
+        print(f"Word alignment ({self.alignment}): {aligner.alignments} alignments for {len(aligner)} windows")
+        return [self._to_filler(word) for word in words]
+    
+    def _detect_whisper_words(self, audio: Union[str, np.ndarray], language: str) -> List[FillerWord]:
+        """Fillers from Whisper's word-timestamp transcription of the whole clip"""
+        # Transcribe with word-level timestamps
+        result = self._transcribe_optimized(audio, language, word_timestamps=True)
+        
+        fillers = []
+        pattern = self._filler_pattern(language)
         
         # Check each segment for filler words
         for segment in result.get('segments', []):
             for word_info in segment.get('words', []):
-                word_text = word_info.get('word', '').strip().lower()
-                # Clean punctuation
-                word_text = re.sub(r'[.,¡!¿?]', '', word_text)
-                
                 # Check if word matches filler pattern
-                if re.search(combined_pattern, word_text, re.IGNORECASE):
-                    fillers.append(FillerWord(
-                        word=word_text,
-                        start=word_info.get('start', 0.0),
-                        end=word_info.get('end', 0.0),
-                        confidence=word_info.get('probability', 0.0)
-                    ))
+                if re.search(pattern, self._clean_word(word_info.get('word', '')), re.IGNORECASE):
+                    fillers.append(self._to_filler(word_info))
         
         return fillers
     
-    def get_transcription(self, audio_path: str, language: str = 'es') -> str:
+    def get_transcription(self, audio: Union[str, np.ndarray], language: str = 'es') -> str:
         """
         Get full transcription of audio
         """
-        result = self._transcribe_optimized(audio_path, language, word_timestamps=False)
-        return result.get('text', '').strip()
+        text, _ = self.get_transcription_segments(audio, language)
+        return text
+    
+    def get_transcription_segments(
+        self,
+        audio: Union[str, np.ndarray],
+        language: str = 'es'
+    ) -> Tuple[str, List[TranscriptSegment]]:
+        """
+        Get full transcription of audio along with its ASR segments
+        
+        Returns:
+            (transcription, segments) from a single transcription pass
+        """
+        result = self._transcribe_optimized(audio, language, word_timestamps=False)
+        return result.get('text', '').strip(), self._segments(result)
+    
+    @staticmethod
+    def _segments(result: Dict) -> List[TranscriptSegment]:
+        return [
+            TranscriptSegment(
+                start=segment.get('start', 0.0),
+                end=segment.get('end', 0.0),
+                text=segment.get('text', '').strip()
+            )
+            for segment in result.get('segments', [])
+        ]
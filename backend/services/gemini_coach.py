@@ -1,25 +1,76 @@
 import google.generativeai as genai
 import os
 import json
+import math
+import re
+import time
+import unicodedata
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import List, Optional, Sequence
 from dotenv import load_dotenv
 
+from services.circuit_breaker import CircuitBreaker
+from services.metrics import metrics
+from services.stubs import StubGeminiModel, gemini_stub_enabled
+from services.tracing import tracer
+
 # Cargar variables de entorno
 load_dotenv()
 
+# Shared by every coach in the process: the breaker, the latency history
+# that sets the hedge delay, and the threads running generate_content
+# (a hung call can't be cancelled, only abandoned)
+_BREAKER = CircuitBreaker(
+    failure_threshold=int(os.getenv("GEMINI_BREAKER_FAILURES", "5")),
+    reset_timeout=float(os.getenv("GEMINI_BREAKER_RESET_SECONDS", "30")),
+)
+_LATENCY = metrics.summary("gemini_request_seconds", "Latency of successful Gemini calls")
+_CALL_POOL = ThreadPoolExecutor(max_workers=16, thread_name_prefix="gemini")
+metrics.describe("gemini_calls_total", "Gemini calls by outcome (ok, hedge, error, timeout, short_circuit)")
+metrics.describe("gemini_invalid_responses_total", "Gemini responses that were not valid JSON")
+metrics.gauge(
+    "gemini_breaker_state",
+    lambda: CircuitBreaker.STATE_CODES[_BREAKER.state],
+    "Gemini circuit breaker (0 closed, 1 half-open, 2 open)"
+)
+
+
+class SemanticUnavailable(Exception):
+    """Gemini call refused by the breaker or out of latency budget"""
+
 class GeminiCoach:
     def __init__(self):
         api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
+        if gemini_stub_enabled():
+            self.model = StubGeminiModel()
+        elif not api_key:
             print("⚠️ WARNING: GEMINI_API_KEY no encontrada en .env")
             self.model = None
         else:
             genai.configure(api_key=api_key)
             self.model = genai.GenerativeModel('gemini-2.5-flash')
 
-    def analyze(self, transcription: str) -> dict:
+        # Long-transcript (map-reduce) mode
+        self.long_transcript_chars = int(os.getenv("GEMINI_LONG_TRANSCRIPT_CHARS", "12000"))
+        self.chunk_chars = int(os.getenv("GEMINI_CHUNK_CHARS", "6000"))
+        self.max_parallel = int(os.getenv("GEMINI_MAX_PARALLEL", "4"))
+
+        # Latency budget per call and hedging (a second identical request
+        # sent once the first is slower than the recent p95)
+        self.latency_budget = float(os.getenv("GEMINI_LATENCY_BUDGET", "20"))
+        self.hedge = os.getenv("GEMINI_HEDGE", "1") == "1"
+        self.hedge_percentile = float(os.getenv("GEMINI_HEDGE_PERCENTILE", "95"))
+        self.min_hedge_delay = 1.0
+
+    def analyze(self, transcription: str, segments: Optional[Sequence] = None) -> dict:
         """
         Analiza el contenido semántico del discurso usando Gemini 2.5 Flash.
         Retorna un diccionario con feedback estructurado.
+
+        Las transcripciones largas se dividen en fragmentos en los límites de
+        los segmentos del ASR (`segments`, con atributo `text`), se analizan en
+        paralelo y se combinan en el mismo esquema.
         """
         if not self.model:
             return self._get_fallback_analysis()
@@ -27,8 +78,118 @@ class GeminiCoach:
         if not transcription or len(transcription.strip()) < 10:
             return self._get_empty_analysis()
 
-        prompt = f"""
-        Actúa como un coach experto en oratoria y comunicación. Analiza la siguiente transcripción de un discurso hablado:
+        if len(transcription) > self.long_transcript_chars:
+            texts = [seg.text for seg in segments] if segments else self._split_sentences(transcription)
+            chunks = self._chunk_texts(texts)
+            if len(chunks) > 1:
+                return self._analyze_chunks(chunks)
+
+        try:
+            return self._generate(self._build_prompt(transcription))
+        except Exception as e:
+            print(f"Error analizando con Gemini: {e}")
+            return self._get_fallback_analysis()
+
+    def _generate(self, prompt: str) -> dict:
+        with tracer.span('gemini_call', prompt_chars=len(prompt)) as span:
+            admitted = _BREAKER.admit()
+            if admitted is None:
+                metrics.inc("gemini_calls_total", outcome="short_circuit")
+                span.set(outcome="short_circuit")
+                raise SemanticUnavailable("circuit breaker open")
+            # A half-open probe stays a single request
+            text = self._call_hedged(prompt, hedge=self.hedge and admitted == CircuitBreaker.CLOSED)
+        # Limpiar posible formato markdown del JSON
+        json_text = text.replace("```json", "").replace("```", "").strip()
+        try:
+            result = json.loads(json_text)
+        except ValueError:
+            # A malformed answer is a failed call for the breaker too
+            _BREAKER.record_failure()
+            metrics.inc("gemini_invalid_responses_total")
+            raise
+        _BREAKER.record_success()
+        return result
+
+    def _call(self, prompt: str, hedge: bool = False) -> str:
+        start = time.monotonic()
+        with tracer.span('gemini_request', hedge=hedge):
+            response = self.model.generate_content(
+                prompt,
+                request_options={"timeout": self.latency_budget}
+            )
+            text = response.text
+        _LATENCY.observe(time.monotonic() - start)
+        return text
+
+    def _hedge_delay(self) -> float:
+        """Recent p95 latency (half the budget until enough calls are seen)"""
+        delay = _LATENCY.percentile(self.hedge_percentile, min_samples=20)
+        if delay is None:
+            delay = self.latency_budget / 2
+        return max(self.min_hedge_delay, delay)
+
+    def _call_hedged(self, prompt: str, hedge: bool = True) -> str:
+        """
+        Call Gemini within the latency budget, hedging with a second request
+        after the hedge delay (or right away if the first one fails)
+
+        The first response wins. Timeouts and errors are recorded on the
+        breaker here; responses once they parse (in `_generate`).
+        """
+        start = time.monotonic()
+        deadline = start + self.latency_budget
+        hedge_at = start + self._hedge_delay() if hedge else None
+        call = tracer.bind(self._call)  # Requests run on pool threads
+        first = _CALL_POOL.submit(call, prompt)
+        pending = {first}
+        hedged = False
+        error = None
+
+        while True:
+            now = time.monotonic()
+            if hedge_at is not None and not hedged and (not pending or now >= hedge_at) and now < deadline:
+                hedged = True
+                pending.add(_CALL_POOL.submit(call, prompt, True))
+                metrics.inc("gemini_hedges_total", help="Hedged Gemini requests sent")
+            if not pending or now >= deadline:
+                break
+
+            wake = deadline if hedged or hedge_at is None else min(deadline, hedge_at)
+            done, pending = wait(pending, timeout=max(0.0, wake - now), return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    text = future.result()
+                except Exception as e:
+                    error = e
+                    continue
+                outcome = "hedge" if future is not first else "ok"
+                metrics.inc("gemini_calls_total", outcome=outcome)
+                tracer.set_attributes(outcome=outcome, hedged=hedged)
+                return text
+
+        _BREAKER.record_failure()
+        if pending:
+            metrics.inc("gemini_calls_total", outcome="timeout")
+            tracer.set_attributes(outcome="timeout", hedged=hedged)
+            raise SemanticUnavailable(f"no response within {self.latency_budget:g}s")
+        metrics.inc("gemini_calls_total", outcome="error")
+        tracer.set_attributes(outcome="error", hedged=hedged)
+        raise error
+
+    def _build_prompt(self, transcription: str, part: Optional[int] = None, total_parts: int = 1) -> str:
+        if part is None:
+            context = "Analiza la siguiente transcripción de un discurso hablado:"
+        else:
+            # Map step: the structure flags refer to this fragment only
+            context = (
+                f"Analiza el fragmento {part + 1} de {total_parts} de la transcripción de un discurso hablado. "
+                "Evalúa solo este fragmento; indica has_intro/has_conclusion si este fragmento contiene "
+                "la introducción o la conclusión del discurso:"
+            )
+
+        return f"""
+        Actúa como un coach experto en oratoria y comunicación. {context}
 
         ---
         TRANSCRIPCIÓN:
@@ -60,16 +221,133 @@ class GeminiCoach:
         }}
         """
 
-        try:
-            response = self.model.generate_content(prompt)
-            # Limpiar posible formato markdown del JSON
-            json_text = response.text.replace("```json", "").replace("```", "").strip()
-            return json.loads(json_text)
-        except Exception as e:
-            print(f"Error analizando con Gemini: {e}")
+    @staticmethod
+    def _split_sentences(transcription: str) -> List[str]:
+        """Sentence split used when no ASR segments are available"""
+        return [s for s in re.split(r'(?<=[.!?])\s+', transcription) if s.strip()]
+
+    def _chunk_texts(self, texts: List[str]) -> List[str]:
+        """
+        Pack consecutive segments into chunks of roughly equal length, never
+        splitting a segment
+        """
+        total = sum(len(t) + 1 for t in texts)
+        n_chunks = max(1, math.ceil(total / self.chunk_chars))
+        target = total / n_chunks
+
+        chunks, current, size = [], [], 0
+        for text in texts:
+            if current and size + len(text) > target and len(chunks) < n_chunks - 1:
+                chunks.append(" ".join(current))
+                current, size = [], 0
+            current.append(text.strip())
+            size += len(text) + 1
+        if current:
+            chunks.append(" ".join(current))
+        return chunks
+
+    def _analyze_chunks(self, chunks: List[str]) -> dict:
+        """Map: analyze chunks concurrently; reduce: merge into one analysis"""
+        def analyze_chunk(index: int) -> Optional[dict]:
+            with tracer.span('gemini_chunk', part=index + 1, parts=len(chunks), chars=len(chunks[index])):
+                try:
+                    return self._generate(self._build_prompt(chunks[index], index, len(chunks)))
+                except Exception as e:
+                    print(f"Error analizando fragmento {index + 1}/{len(chunks)} con Gemini: {e}")
+                    return None
+
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_parallel, len(chunks)))) as pool:
+            results = list(pool.map(tracer.bind(analyze_chunk), range(len(chunks))))
+
+        parts = [(r, len(c)) for r, c in zip(results, chunks) if isinstance(r, dict)]
+        if not parts:
             return self._get_fallback_analysis()
+        print(f"Gemini map-reduce: {len(parts)}/{len(chunks)} fragmentos analizados")
+        return self._merge_analyses(parts, first=results[0], last=results[-1])
+
+    @classmethod
+    def _merge_analyses(cls, parts: List[tuple], first: Optional[dict], last: Optional[dict]) -> dict:
+        """
+        Merge per-chunk analyses into the single-call schema
+
+        Scores are averaged weighted by chunk length, the intro/conclusion
+        flags come from the first/last chunk, the tone is the length-weighted
+        majority and lists are de-duplicated (case and accent insensitive).
+        Required scores no chunk returned fall back to the fallback analysis.
+        """
+        def weighted_score(get) -> Optional[float]:
+            values = [(v, w) for v, w in ((get(r), w) for r, w in parts) if isinstance(v, (int, float))]
+            if not values:
+                return None
+            return round(sum(v * w for v, w in values) / sum(w for _, w in values), 1)
+
+        def section(r: dict, name: str) -> dict:
+            value = r.get(name)
+            return value if isinstance(value, dict) else {}
+
+        results = [r for r, _ in parts]
+        tones = Counter()
+        for r, w in parts:
+            if r.get('sentiment_tone'):
+                tones[r['sentiment_tone']] += w
+
+        merged = {
+            "content_score": weighted_score(lambda r: r.get('content_score')),
+            "semantic_clarity": weighted_score(lambda r: r.get('semantic_clarity')),
+            "semantic_confidence": weighted_score(lambda r: r.get('semantic_confidence')),
+            "structure_analysis": {
+                "has_intro": bool(first and section(first, 'structure_analysis').get('has_intro')),
+                "has_body": any(section(r, 'structure_analysis').get('has_body') for r in results),
+                "has_conclusion": bool(last and section(last, 'structure_analysis').get('has_conclusion')),
+                "feedback": cls._merge_text(section(r, 'structure_analysis').get('feedback') for r in results),
+            },
+            "clarity_analysis": {
+                "score": weighted_score(lambda r: section(r, 'clarity_analysis').get('score')),
+                "feedback": cls._merge_text(section(r, 'clarity_analysis').get('feedback') for r in results),
+            },
+            "persuasion_analysis": {
+                "detected_techniques": cls._merge_lists(
+                    [section(r, 'persuasion_analysis').get('detected_techniques') for r in results]
+                ),
+                "feedback": cls._merge_text(section(r, 'persuasion_analysis').get('feedback') for r in results),
+            },
+            "sentiment_tone": tones.most_common(1)[0][0] if tones else "Neutral",
+            "key_improvements": cls._merge_lists([r.get('key_improvements') for r in results], limit=3),
+            "positive_highlights": cls._merge_lists([r.get('positive_highlights') for r in results], limit=3),
+        }
+        fallback = cls._get_fallback_analysis()
+        if merged["content_score"] is None:
+            merged["content_score"] = fallback["content_score"]
+        if merged["clarity_analysis"]["score"] is None:
+            merged["clarity_analysis"]["score"] = fallback["clarity_analysis"]["score"]
+        return {k: v for k, v in merged.items() if v is not None}
+
+    @staticmethod
+    def _normalize(text: str) -> str:
+        text = unicodedata.normalize('NFKD', str(text).casefold())
+        text = ''.join(c for c in text if not unicodedata.combining(c))
+        return ' '.join(re.sub(r'[^\w\s]', ' ', text).split())
+
+    @classmethod
+    def _merge_lists(cls, lists: List, limit: Optional[int] = None) -> List[str]:
+        """De-duplicate items, taking them round-robin so every chunk is represented"""
+        lists = [l for l in lists if isinstance(l, list)]
+        merged, seen = [], set()
+        for depth in range(max((len(l) for l in lists), default=0)):
+            for items in lists:
+                if depth < len(items) and items[depth]:
+                    key = cls._normalize(items[depth])
+                    if key and key not in seen:
+                        seen.add(key)
+                        merged.append(items[depth])
+        return merged[:limit] if limit else merged
+
+    @classmethod
+    def _merge_text(cls, values, limit: int = 3) -> str:
+        return " ".join(cls._merge_lists([[v] for v in values if v], limit=limit))
 
-    def _get_fallback_analysis(self):
+    @staticmethod
+    def _get_fallback_analysis():
         return {
             "content_score": 5.0,
             "structure_analysis": {
@@ -0,0 +1,311 @@
+"""
+Session History Store
+Persists analysis results in an embedded SQLite database and maintains
+incremental per-user progress rollups
+"""
+
+import sqlite3
+import threading
+import uuid
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from services.serialization import encode_json
+
+# Metrics tracked by the progress rollups
+ROLLUP_METRICS = ('confidence', 'clarity', 'pacing', 'nervousness', 'filler_rate')
+
+
+@dataclass
+class SessionSummary:
+    id: str
+    user_id: str
+    analyzed_at: str
+    duration: float
+    confidence: float
+    clarity: float
+    pacing: float
+    nervousness: float
+    filler_rate: float
+
+
+class HistoryStore:
+    """
+    SQLite-backed store of analysis results
+
+    Every saved session updates three rollups in the same transaction:
+    all-time sums, sums over the user's last `window_size` sessions and an
+    exponential moving average. Reading a user's progress is a single
+    primary-key lookup, independent of how many sessions they have.
+    """
+
+    def __init__(self, db_path: str = "speakeasy.db", window_size: int = 10, ema_alpha: float = 0.2):
+        self.db_path = db_path
+        self.window_size = window_size
+        self.ema_alpha = ema_alpha
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+
+    def _create_schema(self):
+        metric_columns = ', '.join(f"{m} REAL NOT NULL" for m in ROLLUP_METRICS)
+        rollup_columns = ', '.join(
+            f"sum_{m} REAL NOT NULL DEFAULT 0, win_sum_{m} REAL NOT NULL DEFAULT 0, "
+            f"ema_{m} REAL NOT NULL DEFAULT 0"
+            for m in ROLLUP_METRICS
+        )
+        daily_columns = ', '.join(f"sum_{m} REAL NOT NULL DEFAULT 0" for m in ROLLUP_METRICS)
+        with self._conn:
+            self._conn.executescript(f"""
+                CREATE TABLE IF NOT EXISTS analyses (
+                    id TEXT PRIMARY KEY,
+                    user_id TEXT NOT NULL,
+                    analyzed_at TEXT NOT NULL,
+                    duration REAL NOT NULL,
+                    {metric_columns},
+                    result BLOB NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_analyses_user_time
+                    ON analyses (user_id, analyzed_at);
+                CREATE INDEX IF NOT EXISTS idx_analyses_time
+                    ON analyses (analyzed_at);
+
+                CREATE TABLE IF NOT EXISTS user_rollups (
+                    user_id TEXT PRIMARY KEY,
+                    session_count INTEGER NOT NULL DEFAULT 0,
+                    window_count INTEGER NOT NULL DEFAULT 0,
+                    total_duration REAL NOT NULL DEFAULT 0,
+                    first_at TEXT,
+                    last_at TEXT,
+                    {rollup_columns}
+                );
+
+                CREATE TABLE IF NOT EXISTS user_daily_rollups (
+                    user_id TEXT NOT NULL,
+                    day TEXT NOT NULL,
+                    session_count INTEGER NOT NULL DEFAULT 0,
+                    total_duration REAL NOT NULL DEFAULT 0,
+                    {daily_columns},
+                    PRIMARY KEY (user_id, day)
+                );
+            """)
+
+    @staticmethod
+    def _metrics(payload: Dict) -> Dict[str, float]:
+        scores = payload['scores']
+        duration = payload['duration']
+        return {
+            'confidence': float(scores['confidence']),
+            'clarity': float(scores['clarity']),
+            'pacing': float(scores['pacing']),
+            'nervousness': float(scores['nervousness']),
+            # Same per-minute rate used by the explainability engine
+            'filler_rate': len(payload['fillerWords']) / max(1, duration / 60),
+        }
+
+    def save(self, user_id: str, payload: Dict, analysis_id: Optional[str] = None) -> str:
+        """
+        Persist an analysis payload and update the user's rollups
+
+        Args:
+            user_id: Owner of the session
+            payload: Analysis document (as built by `build_payload`)
+            analysis_id: Optional id; generated when omitted
+
+        Returns:
+            The analysis id
+        """
+        analysis_id = analysis_id or uuid.uuid4().hex
+        self.save_once(analysis_id, user_id, payload)
+        return analysis_id
+
+    def save_once(
+        self,
+        analysis_id: str,
+        user_id: str,
+        payload: Dict,
+        on_insert: Optional[Callable[[sqlite3.Connection], None]] = None
+    ) -> bool:
+        """
+        Persist an analysis under `analysis_id` unless it is already stored
+
+        The row, the rollups and `on_insert` (further writes on this
+        connection, e.g. features and timeline of the same database) run in
+        one transaction, so a retried job never counts twice.
+
+        Returns:
+            False when the analysis already existed (nothing was written)
+        """
+        analyzed_at = payload['analyzedAt']
+        duration = float(payload['duration'])
+        metrics = self._metrics(payload)
+        body = encode_json(payload)
+
+        with self._lock, self._conn:
+            inserted = self._conn.execute(
+                f"INSERT OR IGNORE INTO analyses (id, user_id, analyzed_at, duration, "
+                f"{', '.join(ROLLUP_METRICS)}, result) "
+                f"VALUES (?, ?, ?, ?, {', '.join('?' * len(ROLLUP_METRICS))}, ?)",
+                (analysis_id, user_id, analyzed_at, duration,
+                 *(metrics[m] for m in ROLLUP_METRICS), body)
+            ).rowcount == 1
+            if inserted:
+                self._update_rollups(user_id, analyzed_at, duration, metrics)
+                self._update_daily(user_id, analyzed_at, duration, metrics)
+                if on_insert is not None:
+                    on_insert(self._conn)
+
+        return inserted
+
+    def _update_rollups(self, user_id: str, analyzed_at: str, duration: float, metrics: Dict[str, float]):
+        row = self._conn.execute(
+            "SELECT * FROM user_rollups WHERE user_id = ?", (user_id,)
+        ).fetchone()
+
+        if row is None:
+            values = {'session_count': 1, 'window_count': 1, 'total_duration': duration,
+                      'first_at': analyzed_at, 'last_at': analyzed_at}
+            for m in ROLLUP_METRICS:
+                values[f'sum_{m}'] = metrics[m]
+                values[f'win_sum_{m}'] = metrics[m]
+                values[f'ema_{m}'] = metrics[m]
+            columns = ', '.join(values)
+            self._conn.execute(
+                f"INSERT INTO user_rollups (user_id, {columns}) "
+                f"VALUES (?, {', '.join('?' * len(values))})",
+                (user_id, *values.values())
+            )
+            return
+
+        values = {
+            'session_count': row['session_count'] + 1,
+            'total_duration': row['total_duration'] + duration,
+            'first_at': min(row['first_at'], analyzed_at),
+            'last_at': max(row['last_at'], analyzed_at),
+        }
+        for m in ROLLUP_METRICS:
+            values[f'sum_{m}'] = row[f'sum_{m}'] + metrics[m]
+            values[f'ema_{m}'] = (1 - self.ema_alpha) * row[f'ema_{m}'] + self.ema_alpha * metrics[m]
+
+        if analyzed_at >= row['last_at']:
+            # Newest session: slide the window by adding it and dropping the
+            # session that just fell out (one indexed row lookup)
+            window_count = row['window_count'] + 1
+            for m in ROLLUP_METRICS:
+                values[f'win_sum_{m}'] = row[f'win_sum_{m}'] + metrics[m]
+            if window_count > self.window_size:
+                dropped = self._conn.execute(
+                    f"SELECT {', '.join(ROLLUP_METRICS)} FROM analyses WHERE user_id = ? "
+                    "ORDER BY analyzed_at DESC, rowid DESC LIMIT 1 OFFSET ?",
+                    (user_id, self.window_size)
+                ).fetchone()
+                for m in ROLLUP_METRICS:
+                    values[f'win_sum_{m}'] -= dropped[m]
+                window_count = self.window_size
+            values['window_count'] = window_count
+        else:
+            # Back-filled session: rebuild the window sums from the index
+            recent = self._conn.execute(
+                f"SELECT {', '.join(f'COALESCE(SUM({m}), 0) AS {m}' for m in ROLLUP_METRICS)}, "
+                "COUNT(*) AS n FROM (SELECT * FROM analyses WHERE user_id = ? "
+                "ORDER BY analyzed_at DESC, rowid DESC LIMIT ?)",
+                (user_id, self.window_size)
+            ).fetchone()
+            for m in ROLLUP_METRICS:
+                values[f'win_sum_{m}'] = recent[m]
+            values['window_count'] = recent['n']
+
+        self._conn.execute(
+            f"UPDATE user_rollups SET {', '.join(f'{k} = ?' for k in values)} WHERE user_id = ?",
+            (*values.values(), user_id)
+        )
+
+    def _update_daily(self, user_id: str, analyzed_at: str, duration: float, metrics: Dict[str, float]):
+        day = analyzed_at[:10]
+        sums = ', '.join(f"sum_{m}" for m in ROLLUP_METRICS)
+        increments = ', '.join(f"sum_{m} = sum_{m} + excluded.sum_{m}" for m in ROLLUP_METRICS)
+        self._conn.execute(
+            f"INSERT INTO user_daily_rollups (user_id, day, session_count, total_duration, {sums}) "
+            f"VALUES (?, ?, 1, ?, {', '.join('?' * len(ROLLUP_METRICS))}) "
+            f"ON CONFLICT (user_id, day) DO UPDATE SET "
+            f"session_count = session_count + 1, "
+            f"total_duration = total_duration + excluded.total_duration, {increments}",
+            (user_id, day, duration, *(metrics[m] for m in ROLLUP_METRICS))
+        )
+
+    def _query(self, sql: str, params=()) -> List[sqlite3.Row]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def get_result(self, analysis_id: str) -> Optional[bytes]:
+        """Stored analysis document (JSON bytes) or None"""
+        rows = self._query("SELECT result FROM analyses WHERE id = ?", (analysis_id,))
+        return bytes(rows[0]['result']) if rows else None
+
+    def list_sessions(self, user_id: str, limit: int = 50, before: Optional[str] = None) -> List[SessionSummary]:
+        """Most recent sessions of a user (newest first), paged by `before` timestamp"""
+        query = (
+            f"SELECT id, user_id, analyzed_at, duration, {', '.join(ROLLUP_METRICS)} "
+            "FROM analyses WHERE user_id = ?"
+        )
+        params = [user_id]
+        if before:
+            query += " AND analyzed_at < ?"
+            params.append(before)
+        query += " ORDER BY analyzed_at DESC LIMIT ?"
+        params.append(limit)
+        return [SessionSummary(**dict(row)) for row in self._query(query, params)]
+
+    def get_progress(self, user_id: str) -> Optional[Dict]:
+        """
+        Precomputed progress of a user
+
+        Returns:
+            Dictionary with session counts and all-time, recent-window and
+            exponential moving averages per metric, or None for unknown users
+        """
+        rows = self._query("SELECT * FROM user_rollups WHERE user_id = ?", (user_id,))
+        if not rows:
+            return None
+
+        row = rows[0]
+        count = row['session_count']
+        window_count = max(1, row['window_count'])
+        return {
+            'userId': user_id,
+            'sessionCount': count,
+            'totalDuration': row['total_duration'],
+            'firstAt': row['first_at'],
+            'lastAt': row['last_at'],
+            'windowSize': self.window_size,
+            'windowCount': row['window_count'],
+            'allTime': {m: round(row[f'sum_{m}'] / count, 2) for m in ROLLUP_METRICS},
+            'recent': {m: round(row[f'win_sum_{m}'] / window_count, 2) for m in ROLLUP_METRICS},
+            'ema': {m: round(row[f'ema_{m}'], 2) for m in ROLLUP_METRICS},
+        }
+
+    def get_daily_trend(self, user_id: str, since: Optional[str] = None) -> List[Dict]:
+        """Per-day averages from the daily rollups (oldest first)"""
+        query = "SELECT * FROM user_daily_rollups WHERE user_id = ?"
+        params = [user_id]
+        if since:
+            query += " AND day >= ?"
+            params.append(since[:10])
+        query += " ORDER BY day"
+        return [
+            {
+                'day': row['day'],
+                'sessionCount': row['session_count'],
+                'totalDuration': row['total_duration'],
+                'averages': {
+                    m: round(row[f'sum_{m}'] / row['session_count'], 2) for m in ROLLUP_METRICS
+                },
+            }
+            for row in self._query(query, params)
+        ]
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,200 @@
+"""
+Durable Job Queue
+SQLite-backed queue coordinating API nodes and analysis workers, with
+leases (visibility timeouts), heartbeats and bounded retries
+"""
+
+import sqlite3
+import time
+import uuid
+from contextlib import closing
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class Job:
+    id: str
+    audio_path: str
+    user_id: str
+    status: str          # 'queued', 'running', 'done', 'failed'
+    attempts: int
+    max_attempts: int
+    worker_id: Optional[str] = None
+    result: Optional[bytes] = None
+    error: Optional[str] = None
+
+
+class JobQueue:
+    """
+    Job queue in a shared SQLite database
+
+    A claimed job is leased to one worker until `visible_at`; the worker's
+    heartbeats push the lease forward. If the worker dies, the lease expires
+    and another worker re-claims the job, up to `max_attempts` attempts.
+    Each call opens its own connection, so one instance can be shared by
+    threads and several processes/nodes can use the same file.
+    """
+
+    def __init__(self, db_path: str = "jobs.db", max_attempts: int = 3):
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    audio_path TEXT NOT NULL,
+                    user_id TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    max_attempts INTEGER NOT NULL,
+                    visible_at REAL NOT NULL,
+                    worker_id TEXT,
+                    heartbeat_at REAL,
+                    created_at REAL NOT NULL,
+                    finished_at REAL,
+                    result BLOB,
+                    error TEXT
+                );
+                CREATE INDEX IF NOT EXISTS idx_jobs_claim
+                    ON jobs (status, visible_at, created_at);
+            """)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @staticmethod
+    def _job(row: sqlite3.Row) -> Job:
+        return Job(
+            id=row['id'],
+            audio_path=row['audio_path'],
+            user_id=row['user_id'],
+            status=row['status'],
+            attempts=row['attempts'],
+            max_attempts=row['max_attempts'],
+            worker_id=row['worker_id'],
+            result=bytes(row['result']) if row['result'] is not None else None,
+            error=row['error'],
+        )
+
+    def enqueue(self, audio_path: str, user_id: str) -> str:
+        """Add a job for an audio file on shared storage; returns the job id"""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, audio_path, user_id, status, max_attempts, visible_at, created_at) "
+                "VALUES (?, ?, ?, 'queued', ?, ?, ?)",
+                (job_id, audio_path, user_id, self.max_attempts, now, now)
+            )
+        return job_id
+
+    def claim(self, worker_id: str, visibility_timeout: float) -> Optional[Job]:
+        """
+        Lease the oldest available job (queued, or running with an expired lease)
+
+        Returns:
+            The claimed Job, or None if nothing is available
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+
+            # Jobs whose lease expired on their last attempt are given up
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', finished_at = ?, "
+                "error = COALESCE(error, 'Worker lease expired') "
+                "WHERE status = 'running' AND visible_at <= ? AND attempts >= max_attempts",
+                (now, now)
+            )
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status IN ('queued', 'running') AND visible_at <= ? "
+                "ORDER BY created_at LIMIT 1",
+                (now,)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+
+            conn.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, worker_id = ?, "
+                "visible_at = ?, heartbeat_at = ? WHERE id = ?",
+                (worker_id, now + visibility_timeout, now, row['id'])
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+        job = self._job(row)
+        job.status = 'running'
+        job.attempts += 1
+        job.worker_id = worker_id
+        return job
+
+    def heartbeat(self, job_id: str, worker_id: str, visibility_timeout: float) -> bool:
+        """Extend the lease; False if the job is no longer owned by this worker"""
+        now = time.time()
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET visible_at = ?, heartbeat_at = ? "
+                "WHERE id = ? AND worker_id = ? AND status = 'running'",
+                (now + visibility_timeout, now, job_id, worker_id)
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, job_id: str, worker_id: str, result: bytes) -> bool:
+        """Store the result of a job still leased by this worker"""
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'done', result = ?, error = NULL, finished_at = ? "
+                "WHERE id = ? AND worker_id = ? AND status = 'running'",
+                (result, time.time(), job_id, worker_id)
+            )
+            return cursor.rowcount == 1
+
+    def fail(self, job_id: str, worker_id: str, error: str, retry_delay: float = 5.0) -> Optional[str]:
+        """
+        Record a failed attempt; the job is re-queued after `retry_delay`
+        seconds until it runs out of attempts
+
+        Returns:
+            The new job status ('queued' or 'failed'), or None if the job is
+            no longer leased by this worker (nothing is recorded)
+        """
+        now = time.time()
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT attempts, max_attempts FROM jobs WHERE id = ? AND worker_id = ? AND status = 'running'",
+                (job_id, worker_id)
+            ).fetchone()
+            if row is None:
+                return None
+            status = 'queued' if row['attempts'] < row['max_attempts'] else 'failed'
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, worker_id = NULL, visible_at = ?, "
+                "finished_at = ? WHERE id = ? AND worker_id = ? AND status = 'running'",
+                (status, error, now + retry_delay * row['attempts'],
+                 now if status == 'failed' else None, job_id, worker_id)
+            )
+        # Re-claimed by another worker between the read and the update
+        return status if cursor.rowcount == 1 else None
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._job(row) if row else None
+
+    def pending_count(self) -> int:
+        """Jobs waiting or running"""
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'running')"
+            ).fetchone()
+        return row[0]
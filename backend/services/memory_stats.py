@@ -0,0 +1,91 @@
+"""
+Process Memory Accounting
+Resident, proportional and unique set sizes read from /proc (Linux), to
+check how much of each worker's memory is shared with its siblings
+"""
+
+import os
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+# smaps fields summed into each figure (values are in kB)
+_FIELDS = {
+    'rss': ('Rss',),
+    'pss': ('Pss',),
+    'uss': ('Private_Clean', 'Private_Dirty'),
+    'shared': ('Shared_Clean', 'Shared_Dirty'),
+    'swap': ('Swap',),
+}
+
+
+@dataclass
+class MemoryUsage:
+    pid: int
+    rss: int     # Resident bytes, shared pages counted in full
+    pss: int     # Shared pages divided among the processes mapping them
+    uss: int     # Pages only this process maps: what a new worker costs
+    shared: int  # Resident bytes shared with other processes
+    swap: int
+
+
+def process_memory(pid: Optional[int] = None) -> Optional[MemoryUsage]:
+    """
+    Memory usage of a process (this one by default)
+
+    Reads /proc/<pid>/smaps_rollup, or sums /proc/<pid>/smaps on kernels
+    without it.
+
+    Returns:
+        MemoryUsage, or None where /proc is unavailable or the process is gone
+    """
+    pid = pid or os.getpid()
+    totals: Dict[str, int] = {}
+    for name in ('smaps_rollup', 'smaps'):
+        try:
+            with open(f"/proc/{pid}/{name}") as f:
+                for line in f:
+                    key, _, value = line.partition(':')
+                    parts = value.split()
+                    if len(parts) == 2 and parts[1] == 'kB':
+                        totals[key] = totals.get(key, 0) + int(parts[0]) * 1024
+            break
+        except (FileNotFoundError, PermissionError):
+            continue
+    if not totals:
+        return None
+    return MemoryUsage(pid=pid, **{
+        field: sum(totals.get(key, 0) for key in keys) for field, keys in _FIELDS.items()
+    })
+
+
+def child_pids(pid: int) -> List[int]:
+    """Direct children of a process (from /proc/<pid>/task/*/children)"""
+    children = []
+    try:
+        tasks = os.listdir(f"/proc/{pid}/task")
+    except FileNotFoundError:
+        return children
+    for task in tasks:
+        try:
+            with open(f"/proc/{pid}/task/{task}/children") as f:
+                children.extend(int(child) for child in f.read().split())
+        except FileNotFoundError:
+            pass
+    return sorted(children)
+
+
+def process_tree_memory(pid: int) -> List[MemoryUsage]:
+    """Memory of a process and its direct children (master + workers)"""
+    usages = [process_memory(p) for p in [pid, *child_pids(pid)]]
+    return [usage for usage in usages if usage is not None]
+
+
+def format_table(usages: List[MemoryUsage]) -> str:
+    mb = 1024 * 1024
+    lines = [f"{'pid':>8} {'rss MB':>9} {'pss MB':>9} {'uss MB':>9} {'shared MB':>10}"]
+    for u in usages:
+        lines.append(f"{u.pid:>8} {u.rss / mb:>9.1f} {u.pss / mb:>9.1f} {u.uss / mb:>9.1f} {u.shared / mb:>10.1f}")
+    if usages:
+        lines.append(f"{'total':>8} {'':>9} {sum(u.pss for u in usages) / mb:>9.1f} "
+                     f"{sum(u.uss for u in usages) / mb:>9.1f}")
+    return "\n".join(lines)
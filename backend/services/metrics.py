@@ -0,0 +1,147 @@
+"""
+Process Metrics
+In-memory counters, gauges and summaries, rendered in the
+Prometheus text format for GET /metrics
+"""
+
+import threading
+from collections import defaultdict, deque
+from typing import Callable, Deque, Dict, Optional, Tuple
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class SummaryWindow:
+    """Recent observations (latencies, sizes) for percentile estimates"""
+
+    def __init__(self, size: int = 200):
+        self._samples: Deque[float] = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float):
+        with self._lock:
+            self._samples.append(value)
+            self.count += 1
+            self.total += value
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+            self.count = 0
+            self.total = 0.0
+
+    def percentile(self, q: float, min_samples: int = 1) -> Optional[float]:
+        """q-th percentile (0-100) of the window, None with too few samples"""
+        with self._lock:
+            if len(self._samples) < max(1, min_samples):
+                return None
+            samples = sorted(self._samples)
+        # Linear interpolation between closest ranks (numpy's default)
+        position = (len(samples) - 1) * q / 100
+        low = int(position)
+        high = min(low + 1, len(samples) - 1)
+        return samples[low] + (samples[high] - samples[low]) * (position - low)
+
+
+class Metrics:
+    """
+    Thread-safe metrics registry
+
+    Gauges can be registered as callbacks so values owned by other objects
+    (breaker state, admission slots) are read at scrape time. Summaries
+    keep a window of recent observations per label set.
+    """
+
+    SUMMARY_QUANTILES = (50, 95, 99)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[Labels, float]] = defaultdict(dict)
+        self._gauges: Dict[str, Callable[[], float]] = {}
+        self._summaries: Dict[str, Dict[Labels, SummaryWindow]] = defaultdict(dict)
+        self._help: Dict[str, str] = {}
+
+    def inc(self, name: str, value: float = 1.0, help: str = "", **labels: str):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._counters[name][key] = self._counters[name].get(key, 0.0) + value
+            if help:
+                self._help.setdefault(name, help)
+
+    def describe(self, name: str, help: str):
+        with self._lock:
+            self._help[name] = help
+
+    def gauge(self, name: str, fn: Callable[[], float], help: str = ""):
+        """Register (or replace) a gauge read from `fn` at scrape time"""
+        with self._lock:
+            self._gauges[name] = fn
+            if help:
+                self._help[name] = help
+
+    def summary(self, name: str, help: str = "", **labels: str) -> SummaryWindow:
+        """Get (or create) the observation window for `name` and `labels`"""
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            if key not in self._summaries[name]:
+                self._summaries[name][key] = SummaryWindow()
+            if help:
+                self._help.setdefault(name, help)
+            return self._summaries[name][key]
+
+    def reset(self):
+        """Forget recorded counters and summaries (gauges stay registered)"""
+        with self._lock:
+            self._counters.clear()
+            # Windows are held by their users, so empty them in place
+            windows = [w for by_labels in self._summaries.values() for w in by_labels.values()]
+        for window in windows:
+            window.clear()
+
+    def render(self) -> str:
+        """Prometheus text exposition of every metric"""
+        with self._lock:
+            counters = {name: dict(values) for name, values in self._counters.items()}
+            gauges = dict(self._gauges)
+            summaries = {name: dict(windows) for name, windows in self._summaries.items()}
+
+        lines = []
+        for name, values in sorted(counters.items()):
+            lines += self._header(name, 'counter')
+            for labels, value in sorted(values.items()):
+                lines.append(f"{name}{self._labels(labels)} {value:g}")
+        for name, fn in sorted(gauges.items()):
+            lines += self._header(name, 'gauge')
+            lines.append(f"{name} {float(fn()):g}")
+        for name, windows in sorted(summaries.items()):
+            lines += self._header(name, 'summary')
+            for labels, window in sorted(windows.items()):
+                for q in self.SUMMARY_QUANTILES:
+                    value = window.percentile(q)
+                    if value is not None:
+                        quantile = labels + (('quantile', f"{q / 100:g}"),)
+                        lines.append(f"{name}{self._labels(quantile)} {value:.6f}")
+                lines.append(f"{name}_count{self._labels(labels)} {window.count}")
+                lines.append(f"{name}_sum{self._labels(labels)} {window.total:.6f}")
+        return "\n".join(lines) + "\n"
+
+    def _header(self, name: str, kind: str):
+        lines = [f"# HELP {name} {self._help[name]}"] if name in self._help else []
+        return lines + [f"# TYPE {name} {kind}"]
+
+    @staticmethod
+    def _labels(labels: Labels) -> str:
+        if not labels:
+            return ""
+        return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+def _escape(value) -> str:
+    """Label value escaped for the text format (backslash, quote, newline)"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# Process-wide registry
+metrics = Metrics()
@@ -0,0 +1,173 @@
+"""
+Analysis Pipeline
+Runs prosody, filler detection, explainability and semantic analysis on one
+audio file and builds the response document
+"""
+
+import json
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from services.prosody_analyzer import ProsodyAnalyzer, ProsodyMetrics
+from services.filler_detector import FillerDetector, FillerWord
+from services.explainability import ExplainabilityEngine
+from services.gemini_coach import GeminiCoach
+from services.serialization import build_payload
+from services.history_store import HistoryStore
+from services.feature_store import FeatureStore
+from services.timeline_store import TimelineStore
+from services.tracing import tracer
+
+
+@dataclass
+class AnalysisOutput:
+    payload: Dict                 # Response document (see serialization.build_payload)
+    prosody: ProsodyMetrics
+    fillers: List[FillerWord]
+    transcription: str
+    gemini_result: Optional[Dict]
+    duration: float
+    timings: Dict[str, float] = field(default_factory=dict)  # Seconds per stage
+
+
+@contextmanager
+def _stage(timings: Dict[str, float], name: str, **attributes):
+    """Time a stage (for Server-Timing) under a trace span of the same name"""
+    start = time.perf_counter()
+    try:
+        with tracer.span(name, **attributes) as span:
+            yield span
+    finally:
+        timings[name] = time.perf_counter() - start
+
+
+def analyze_file(audio_path: str) -> AnalysisOutput:
+    """
+    Run the full analysis on an audio file (blocking; call from a worker thread)
+
+    Args:
+        audio_path: Path to the uploaded audio
+
+    Returns:
+        AnalysisOutput with the response payload and the intermediate features
+    """
+    timings: Dict[str, float] = {}
+
+    # Perform prosody analysis
+    with _stage(timings, 'prosody') as span:
+        prosody_analyzer = ProsodyAnalyzer(
+            sample_rate=int(os.getenv("SPEAKEASY_PROSODY_SAMPLE_RATE", "44100")),
+            memory_budget_mb=float(os.getenv("SPEAKEASY_DSP_MEMORY_MB", "256"))
+        )
+        span.set(sample_rate=prosody_analyzer.sample_rate, memory_budget_mb=prosody_analyzer.memory_budget_mb)
+        prosody_metrics = prosody_analyzer.analyze(audio_path)
+        span.set(audio_duration=prosody_metrics.duration)
+    duration = prosody_metrics.duration
+    tracer.set_attributes(audio_duration=duration)
+
+    # Detect language, filler words and transcript (audio decoded once)
+    with _stage(timings, 'asr') as span:
+        filler_detector = FillerDetector(model_size=os.getenv("SPEAKEASY_ASR_MODEL", "small"))
+        span.set(
+            model_size=filler_detector.model_size,
+            beam_size=filler_detector.beam_size,
+            alignment=filler_detector.alignment
+        )
+        audio = filler_detector.load_audio(audio_path)
+        language = filler_detector.detect_language(audio)
+        fillers, transcription, segments = filler_detector.analyze(audio, language=language)
+        span.set(language=language, fillers=len(fillers), segments=len(segments))
+        del audio
+
+    # Generate explainability report
+    with _stage(timings, 'explain'):
+        explainability_engine = ExplainabilityEngine(language=language)
+        report = explainability_engine.generate_report(
+            prosody_metrics,
+            fillers,
+            duration
+        )
+
+    # Perform Semantic Analysis with Gemini
+    with _stage(timings, 'semantic') as span:
+        gemini_coach = GeminiCoach()
+        span.set(transcript_chars=len(transcription))
+        gemini_result = gemini_coach.analyze(transcription, segments)
+
+    # Merge recommendations (Physical + Semantic)
+    combined_recommendations = explainability_engine.merge_semantic_recommendations(
+        report['recommendations'],
+        gemini_result
+    )
+
+    # Build response straight from the service dataclasses
+    payload = build_payload(
+        report,
+        fillers,
+        prosody_metrics,
+        combined_recommendations,
+        transcription,
+        duration,
+        datetime.now().isoformat(),
+        gemini_result,
+        language
+    )
+
+    return AnalysisOutput(
+        payload=payload,
+        prosody=prosody_metrics,
+        fillers=fillers,
+        transcription=transcription,
+        gemini_result=gemini_result,
+        duration=duration,
+        timings=timings
+    )
+
+
+def persist_analysis(
+    output: AnalysisOutput,
+    user_id: str,
+    history_store: HistoryStore,
+    feature_store: FeatureStore,
+    timeline_store: TimelineStore,
+    analysis_id: Optional[str] = None
+) -> str:
+    """
+    Save an analysis to the session history, feature store and timeline index
+
+    All three are written in one transaction (the stores must share a
+    database file). With an `analysis_id` (a job id) persisting is
+    idempotent: when an earlier attempt already saved it, nothing is
+    written and the stored payload replaces `output.payload`.
+
+    Sets `analysisId` on the payload and returns it.
+    """
+    if not history_store.db_path == feature_store.db_path == timeline_store.db_path:
+        raise ValueError("History, feature and timeline stores must share one database")
+
+    analysis_id = analysis_id or uuid.uuid4().hex
+    output.payload['analysisId'] = analysis_id
+
+    def write_features(conn):
+        feature_store.write(
+            conn,
+            analysis_id,
+            user_id,
+            output.payload['analyzedAt'],
+            output.duration,
+            output.prosody,
+            output.fillers,
+            output.transcription,
+            output.gemini_result,
+            output.payload.get('language') or 'es'
+        )
+        timeline_store.write(conn, analysis_id, output.payload)
+
+    if not history_store.save_once(analysis_id, user_id, output.payload, on_insert=write_features):
+        output.payload = json.loads(history_store.get_result(analysis_id))
+    return analysis_id
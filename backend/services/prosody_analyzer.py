@@ -3,10 +3,33 @@ Prosody Analysis Service
 Analyzes audio features: pitch, tempo, pauses, energy
 """
 
+import tempfile
+import time
+
 import librosa
 import numpy as np
-from dataclasses import dataclass
-from typing import List, Tuple
+from numpy.lib.stride_tricks import sliding_window_view
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+from services.audio_io import PcmSpool, decode_to_spool
+from services.tracing import tracer
+
+# Approximate working memory per frame of a DSP block: the complex STFT,
+# its magnitude and piptrack's float32 temporaries over 1025 bins
+BYTES_PER_FRAME = 80 * 1024
+
+@dataclass
+class WindowedProsody:
+    """Sliding-window prosody statistics (one entry per window)"""
+    window_seconds: float
+    step_seconds: float
+    starts: np.ndarray            # Window start times in seconds
+    speech_rate_wpm: np.ndarray   # 0 when the window has too little speech
+    speech_ratio: np.ndarray      # Fraction of non-silent frames
+    pitch_std: np.ndarray         # Hz, over voiced frames
+    energy_mean: np.ndarray       # Normalized RMS
+    energy_std: np.ndarray
 
 @dataclass
 class ProsodyMetrics:
@@ -17,44 +40,75 @@ class ProsodyMetrics:
     pause_locations: List[float]
     energy_variance: float
     speech_rate_wpm: int
+    duration: float = 0.0  # Seconds of decoded audio
+    windows: Optional[WindowedProsody] = None
+    pitch_contour: List[float] = field(default_factory=list)
+    energy_contour: List[float] = field(default_factory=list)
+    contour_hop_seconds: float = 0.0
 
 class ProsodyAnalyzer:
     """
     Analyzes speech prosody using Librosa DSP library
     """
     
-    def __init__(self, sample_rate: int = 44100):
+    def __init__(self, sample_rate: int = 44100, memory_budget_mb: float = 256.0):
         self.sample_rate = sample_rate
         self.silence_threshold_db = 20  # dB below peak for silence detection
         self.min_pause_duration = 0.5  # seconds
+        self.n_fft = 2048  # librosa's default frame length for piptrack, RMS and onsets
+        self.hop_length = 512  # Shared frame grid for piptrack, RMS and onsets
+        self.n_mels = 128  # Mel bands for the onset envelope (librosa default)
+        self.window_seconds = 5.0  # Sliding window for local pace/pitch/energy
+        self.window_step_seconds = 1.0
+        self.min_window_speech = 1.0  # seconds of speech needed to estimate local WPM
+        self.contour_points = 200  # Max points returned for the timeline contours
+        self.memory_budget_mb = memory_budget_mb  # Working set for blockwise DSP
     
     def analyze(self, audio_path: str) -> ProsodyMetrics:
         """
         Perform complete prosody analysis on audio file
         
+        The audio is decoded to a memory-mapped spool file and the frame-level
+        features are extracted block by block, so memory use depends on
+        `memory_budget_mb` rather than on the recording length.
+        
         Args:
             audio_path: Path to audio file
             
         Returns:
             ProsodyMetrics object with all analysis results
         """
-        # Load audio file
-        y, sr = librosa.load(audio_path, sr=self.sample_rate)
+        # Decode to disk and extract frame-level features, shared by the
+        # whole-clip and windowed metrics below
+        with decode_to_spool(audio_path, self.sample_rate) as pcm:
+            sr = pcm.sample_rate
+            n_samples = len(pcm)
+            with tracer.span('frame_features', sample_rate=sr, audio_duration=pcm.duration):
+                pitch_track, rms, onset_mean, onset_median = self._extract_frame_features(pcm)
+        
+        total_duration = n_samples / sr
+        onsets = self._detect_onsets(onset_mean, sr)
         
         # 1. Pitch Analysis (F0 tracking)
-        pitch_mean, pitch_std = self._analyze_pitch(y, sr)
+        pitch_mean, pitch_std = self._analyze_pitch(pitch_track)
         
         # 2. Tempo Detection
-        tempo_bpm = self._analyze_tempo(y, sr)
+        tempo_bpm = self._analyze_tempo(onset_median, sr)
         
         # 3. Pause Detection
-        pause_count, pause_locations = self._detect_pauses(y, sr)
+        pause_count, pause_locations = self._detect_pauses(rms, n_samples, sr)
         
         # 4. Energy Analysis (confidence indicator)
-        energy_variance = self._analyze_energy(y)
+        energy_variance = self._analyze_energy(rms)
         
         # 5. Speech Rate Estimation
-        speech_rate_wpm = self._estimate_speech_rate(y, sr, pause_locations)
+        speech_rate_wpm = self._estimate_speech_rate(total_duration, pause_locations, onsets)
+        
+        # 6. Windowed analysis and timeline contours
+        windows = self._analyze_windows(pitch_track, rms, onsets, sr)
+        pitch_contour, energy_contour, contour_hop = self._downsample_contours(
+            pitch_track, rms, sr
+        )
         
         return ProsodyMetrics(
             pitch_mean=pitch_mean,
@@ -63,60 +117,190 @@ class ProsodyAnalyzer:
             pause_count=pause_count,
             pause_locations=pause_locations,
             energy_variance=energy_variance,
-            speech_rate_wpm=speech_rate_wpm
+            speech_rate_wpm=speech_rate_wpm,
+            duration=float(total_duration),
+            windows=windows,
+            pitch_contour=pitch_contour,
+            energy_contour=energy_contour,
+            contour_hop_seconds=contour_hop
         )
     
-    def _analyze_pitch(self, y: np.ndarray, sr: int) -> Tuple[float, float]:
+    def _block_frames(self) -> int:
+        """Frames per DSP block that fit in the memory budget"""
+        # Half the budget for block temporaries; the rest covers the
+        # frame-level tracks and interpreter overhead
+        budget = self.memory_budget_mb * 1024 * 1024 / 2
+        return max(64, int(budget // BYTES_PER_FRAME))
+    
+    def _extract_frame_features(
+        self,
+        pcm: PcmSpool
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
         """
-        Extract pitch (F0) statistics using piptrack
+        Extract per-frame pitch, RMS and onset strength block by block
+        
+        Blocks are cut on the frame grid and each reads n_fft // 2 samples
+        of context on either side (zeros past the signal edges), so centered
+        frames come out exactly as librosa computes them on the whole
+        signal. One STFT per block feeds both piptrack and the mel
+        spectrogram. The onset envelope needs the global peak of the mel dB
+        spectrogram (for the 80 dB floor), so the mel frames are spooled to
+        disk in a first pass and differenced in a second.
         
         Returns:
-            (mean_pitch, std_pitch) in Hz
+            (pitch_track, rms, onset_env_mean, onset_env_median), one value
+            per frame; the onset envelopes match onset_strength with
+            aggregate=np.mean (onset detection) and np.median (beat tracking)
+        """
+        sr = pcm.sample_rate
+        hop = self.hop_length
+        half = self.n_fft // 2
+        n_frames = 1 + len(pcm) // hop
+        block = self._block_frames()
+        
+        pitch_track = np.zeros(n_frames, dtype=np.float32)
+        rms = np.zeros(n_frames, dtype=np.float32)
+        mel_max = -np.inf
+        # Seconds per step summed over blocks, recorded as trace spans that
+        # start with the pass and last the summed time
+        spent = dict.fromkeys(('rms', 'stft', 'piptrack', 'mel'), 0.0)
+        start = time.perf_counter()
+        
+        with tempfile.TemporaryFile() as mel_spool:
+            # Pass 1: pitch, RMS and unclamped mel dB per block
+            for f0 in range(0, n_frames, block):
+                f1 = min(n_frames, f0 + block)
+                y = pcm.read(f0 * hop - half, (f1 - 1) * hop + half)
+                
+                t0 = time.perf_counter()
+                rms[f0:f1] = librosa.feature.rms(
+                    y=y, frame_length=self.n_fft, hop_length=hop, center=False
+                )[0]
+                
+                t1 = time.perf_counter()
+                magnitude = np.abs(librosa.stft(
+                    y, n_fft=self.n_fft, hop_length=hop, center=False
+                ))
+                t2 = time.perf_counter()
+                pitch_track[f0:f1] = self._track_pitch(magnitude, sr)
+                
+                t3 = time.perf_counter()
+                mel_db = librosa.power_to_db(
+                    librosa.feature.melspectrogram(
+                        S=magnitude ** 2, sr=sr, n_fft=self.n_fft,
+                        n_mels=self.n_mels, fmax=0.5 * sr
+                    ),
+                    top_db=None
+                )
+                del magnitude
+                if mel_db.size:
+                    mel_max = max(mel_max, float(mel_db.max()))
+                np.ascontiguousarray(mel_db.T).tofile(mel_spool)
+                t4 = time.perf_counter()
+                spent['rms'] += t1 - t0
+                spent['stft'] += t2 - t1
+                spent['piptrack'] += t3 - t2
+                spent['mel'] += t4 - t3
+            mel_spool.flush()
+            blocks = -(-n_frames // block)
+            for name, seconds in spent.items():
+                tracer.record(name, start, start + seconds, blocks=blocks)
+            
+            # Pass 2: clamp to 80 dB below the global peak and difference
+            # consecutive frames (one frame of overlap between blocks)
+            start = time.perf_counter()
+            floor = mel_max - 80.0
+            n_diffs = n_frames - 1
+            onset_mean = np.zeros(n_diffs, dtype=np.float32)
+            onset_median = np.zeros(n_diffs, dtype=np.float32)
+            frame_bytes = self.n_mels * 4
+            for f0 in range(0, n_diffs, block):
+                f1 = min(n_diffs, f0 + block)
+                mel_spool.seek(f0 * frame_bytes)
+                frames = np.fromfile(mel_spool, dtype=np.float32, count=(f1 + 1 - f0) * self.n_mels)
+                # Bands on the first axis, as librosa lays them out, so the
+                # mean reduces in the same order
+                mel_db = np.ascontiguousarray(frames.reshape(-1, self.n_mels).T)
+                mel_db = np.maximum(mel_db, floor)
+                flux = np.maximum(0.0, mel_db[:, 1:] - mel_db[:, :-1])
+                onset_mean[f0:f1] = np.mean(flux, axis=0)
+                onset_median[f0:f1] = np.median(flux, axis=0)
+            tracer.record('onset_envelope', start, blocks=-(-n_diffs // block))
+        
+        # Same lag + centering shift and trim as onset_strength
+        shift = 1 + self.n_fft // (2 * hop)
+        onset_mean = np.pad(onset_mean, (shift, 0))[:n_frames]
+        onset_median = np.pad(onset_median, (shift, 0))[:n_frames]
+        
+        return pitch_track, rms, onset_mean, onset_median
+    
+    def _track_pitch(self, magnitude: np.ndarray, sr: int) -> np.ndarray:
+        """
+        Track per-frame pitch (F0) using piptrack
+        
+        Args:
+            magnitude: STFT magnitude of a block of frames
+        
+        Returns:
+            Pitch in Hz for each frame (0 where unvoiced)
         """
         # Use piptrack for pitch detection
         pitches, magnitudes = librosa.piptrack(
-            y=y,
+            S=magnitude,
             sr=sr,
+            n_fft=self.n_fft,
+            hop_length=self.hop_length,
             fmin=75,   # Minimum frequency (low male voice)
             fmax=400   # Maximum frequency (high female voice)
         )
         
-        # Extract pitch values where magnitude is high
-        pitch_values = []
-        for t in range(pitches.shape[1]):
-            index = magnitudes[:, t].argmax()
-            pitch = pitches[index, t]
-            if pitch > 0:  # Valid pitch
-                pitch_values.append(pitch)
+        # Keep the pitch of the strongest bin in each frame
+        index = magnitudes.argmax(axis=0)
+        return pitches[index, np.arange(pitches.shape[1])]
+    
+    def _analyze_pitch(self, pitch_track: np.ndarray) -> Tuple[float, float]:
+        """
+        Extract pitch (F0) statistics from the frame-level track
         
-        if len(pitch_values) == 0:
+        Returns:
+            (mean_pitch, std_pitch) in Hz
+        """
+        pitch_array = pitch_track[pitch_track > 0]  # Valid pitch
+        
+        if len(pitch_array) == 0:
             return 0.0, 0.0
         
-        pitch_array = np.array(pitch_values)
         return float(np.mean(pitch_array)), float(np.std(pitch_array))
     
-    def _analyze_tempo(self, y: np.ndarray, sr: int) -> float:
+    def _analyze_tempo(self, onset_median: np.ndarray, sr: int) -> float:
         """
         Detect tempo (beats per minute)
         
+        Args:
+            onset_median: Median-aggregated onset envelope (beat_track's own)
+        
         Returns:
             Tempo in BPM
         """
-        tempo, _ = librosa.beat.beat_track(y=y, sr=sr)
+        tempo, _ = librosa.beat.beat_track(
+            onset_envelope=onset_median,
+            sr=sr,
+            hop_length=self.hop_length
+        )
         return float(tempo)
     
-    def _detect_pauses(self, y: np.ndarray, sr: int) -> Tuple[int, List[float]]:
+    def _detect_pauses(self, rms: np.ndarray, n_samples: int, sr: int) -> Tuple[int, List[float]]:
         """
         Detect pauses (silence periods) in speech
         
+        Works on the whole-clip RMS track, so pauses that straddle DSP
+        blocks are found like any other.
+        
         Returns:
             (pause_count, pause_timestamps)
         """
         # Split audio into non-silent intervals
-        intervals = librosa.effects.split(
-            y,
-            top_db=self.silence_threshold_db
-        )
+        intervals = self._split_nonsilent(rms, n_samples)
         
         # Find gaps between intervals (pauses)
         pauses = []
@@ -130,7 +314,29 @@ class ProsodyAnalyzer:
         
         return len(pauses), pauses
     
-    def _analyze_energy(self, y: np.ndarray) -> float:
+    def _split_nonsilent(self, rms: np.ndarray, n_samples: int) -> np.ndarray:
+        """
+        Non-silent intervals in samples, as librosa.effects.split computes
+        them from the same RMS frames (top_db below the loudest frame)
+        
+        Returns:
+            Array of [start, end) sample pairs
+        """
+        if len(rms) == 0:
+            return np.zeros((0, 2), dtype=int)
+        db = librosa.amplitude_to_db(rms, ref=np.max, top_db=None)
+        non_silent = db > -self.silence_threshold_db
+        
+        edges = [np.flatnonzero(np.diff(non_silent.astype(int))) + 1]
+        if non_silent[0]:
+            edges.insert(0, np.array([0]))
+        if non_silent[-1]:
+            edges.append(np.array([len(non_silent)]))
+        
+        edges = np.minimum(np.concatenate(edges) * self.hop_length, n_samples)
+        return edges.reshape((-1, 2))
+    
+    def _analyze_energy(self, rms: np.ndarray) -> float:
         """
         Analyze energy variance (volume consistency)
         High variance may indicate nervousness or emphasis
@@ -138,9 +344,6 @@ class ProsodyAnalyzer:
         Returns:
             Energy variance (normalized)
         """
-        # Calculate RMS energy
-        rms = librosa.feature.rms(y=y)[0]
-        
         # Normalize and calculate variance
         rms_normalized = rms / (np.max(rms) + 1e-6)
         variance = float(np.std(rms_normalized))
@@ -149,9 +352,9 @@ class ProsodyAnalyzer:
     
     def _estimate_speech_rate(
         self,
-        y: np.ndarray,
-        sr: int,
-        pause_locations: List[float]
+        total_duration: float,
+        pause_locations: List[float],
+        onsets: np.ndarray
     ) -> int:
         """
         Estimate words per minute (WPM)
@@ -161,23 +364,12 @@ class ProsodyAnalyzer:
         Returns:
             Estimated WPM
         """
-        # Calculate total duration
-        total_duration = len(y) / sr
-        
         # Subtract pause time
         speaking_duration = total_duration - (len(pause_locations) * self.min_pause_duration)
         
         if speaking_duration <= 0:
             return 0
         
-        # Detect onset events (syllable approximation)
-        onset_env = librosa.onset.onset_strength(y=y, sr=sr)
-        onsets = librosa.onset.onset_detect(
-            onset_envelope=onset_env,
-            sr=sr,
-            backtrack=True
-        )
-        
         # Estimate syllables (rough approximation)
         syllable_count = len(onsets)
         
@@ -188,3 +380,135 @@ class ProsodyAnalyzer:
         wpm = int((word_count / speaking_duration) * 60)
         
         return wpm
+    
+    def _detect_onsets(self, onset_env: np.ndarray, sr: int) -> np.ndarray:
+        """
+        Detect onset events (syllable approximation)
+        
+        Args:
+            onset_env: Mean-aggregated onset envelope
+        
+        Returns:
+            Onset frame indices
+        """
+        return librosa.onset.onset_detect(
+            onset_envelope=onset_env,
+            sr=sr,
+            hop_length=self.hop_length,
+            backtrack=True
+        )
+    
+    def _analyze_windows(
+        self,
+        pitch_track: np.ndarray,
+        rms: np.ndarray,
+        onsets: np.ndarray,
+        sr: int
+    ) -> WindowedProsody:
+        """
+        Compute local speech rate, pitch variation and energy over sliding
+        windows of the frame-level features
+        
+        All per-frame quantities are stacked and summed over strided window
+        views in a single pass, so no window is recomputed from audio.
+        
+        Returns:
+            WindowedProsody with one value per window
+        """
+        n_frames = min(len(pitch_track), len(rms))
+        frame_seconds = self.hop_length / sr
+        if n_frames == 0:
+            empty = np.zeros(0)
+            return WindowedProsody(
+                self.window_seconds, self.window_step_seconds,
+                empty, empty, empty, empty, empty, empty
+            )
+        
+        win = max(1, min(n_frames, int(round(self.window_seconds / frame_seconds))))
+        step = max(1, int(round(self.window_step_seconds / frame_seconds)))
+        
+        pitch = pitch_track[:n_frames].astype(np.float64)
+        voiced = (pitch > 0).astype(np.float64)
+        energy = rms[:n_frames].astype(np.float64) / (np.max(rms) + 1e-6)
+        silence_ratio = 10 ** (-self.silence_threshold_db / 20)
+        active = (energy > silence_ratio).astype(np.float64)
+        onset_mask = np.zeros(n_frames)
+        onset_mask[onsets[onsets < n_frames]] = 1.0
+        
+        frames = np.stack([
+            onset_mask,
+            active,
+            voiced,
+            pitch * voiced,
+            pitch ** 2 * voiced,
+            energy,
+            energy ** 2,
+        ])
+        sums = sliding_window_view(frames, win, axis=1)[:, ::step].sum(axis=-1)
+        syllables, active_frames, voiced_frames, pitch_sum, pitch_sq, energy_sum, energy_sq = sums
+        
+        speaking_seconds = active_frames * frame_seconds
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # Same 1.5 syllables/word approximation as the whole-clip estimate
+            wpm = np.where(
+                speaking_seconds >= self.min_window_speech,
+                (syllables / 1.5) / speaking_seconds * 60,
+                0.0
+            )
+            pitch_mean = np.where(voiced_frames > 0, pitch_sum / voiced_frames, 0.0)
+            pitch_var = np.where(voiced_frames > 0, pitch_sq / voiced_frames - pitch_mean ** 2, 0.0)
+        energy_mean = energy_sum / win
+        energy_var = energy_sq / win - energy_mean ** 2
+        
+        return WindowedProsody(
+            window_seconds=win * frame_seconds,
+            step_seconds=step * frame_seconds,
+            starts=np.arange(len(syllables)) * step * frame_seconds,
+            speech_rate_wpm=wpm,
+            speech_ratio=active_frames / win,
+            pitch_std=np.sqrt(np.maximum(pitch_var, 0.0)),
+            energy_mean=energy_mean,
+            energy_std=np.sqrt(np.maximum(energy_var, 0.0))
+        )
+    
+    def _downsample_contours(
+        self,
+        pitch_track: np.ndarray,
+        rms: np.ndarray,
+        sr: int
+    ) -> Tuple[List[float], List[float], float]:
+        """
+        Downsample the pitch and energy tracks for the timeline display
+        
+        Pitch is averaged over voiced frames only (0 where a block is unvoiced);
+        energy is normalized RMS averaged per block.
+        
+        Returns:
+            (pitch_contour, energy_contour, seconds_per_point)
+        """
+        n_frames = min(len(pitch_track), len(rms))
+        if n_frames == 0:
+            return [], [], 0.0
+        
+        block = int(np.ceil(n_frames / self.contour_points))
+        n_blocks = int(np.ceil(n_frames / block))
+        pad = n_blocks * block - n_frames
+        
+        pitch = np.pad(pitch_track[:n_frames].astype(np.float64), (0, pad)).reshape(n_blocks, block)
+        voiced_counts = (pitch > 0).sum(axis=1)
+        pitch_contour = np.where(
+            voiced_counts > 0,
+            pitch.sum(axis=1) / np.maximum(voiced_counts, 1),
+            0.0
+        )
+        
+        energy = rms[:n_frames].astype(np.float64) / (np.max(rms) + 1e-6)
+        energy = np.pad(energy, (0, pad)).reshape(n_blocks, block)
+        block_counts = np.minimum(block, n_frames - np.arange(n_blocks) * block)
+        energy_contour = energy.sum(axis=1) / block_counts
+        
+        return (
+            np.round(pitch_contour, 1).tolist(),
+            np.round(energy_contour, 3).tolist(),
+            block * self.hop_length / sr
+        )
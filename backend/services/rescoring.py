@@ -0,0 +1,109 @@
+"""
+Re-scoring Service
+Recomputes scores, markers and recommendations from stored features with
+tuned ExplainabilityEngine thresholds (no audio decoding or ASR)
+"""
+
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from services.explainability import ExplainabilityEngine
+from services.feature_store import FeatureStore
+
+SCORE_NAMES = ('confidence', 'clarity', 'pacing', 'nervousness')
+
+# Marker/recommendation rebuilds need the full feature blobs, so cap them
+MAX_DETAILED_SESSIONS = 200
+
+
+def rescore(
+    feature_store: FeatureStore,
+    thresholds: Dict,
+    analysis_ids: Optional[List[str]] = None,
+    user_id: Optional[str] = None,
+    since: Optional[str] = None,
+    fuse_semantic: bool = False,
+    include_details: bool = False
+) -> Dict:
+    """
+    Re-evaluate stored analyses with overridden thresholds
+
+    Scores are computed in one vectorized pass per spoken language and
+    compared against the current default thresholds of that language.
+
+    Args:
+        feature_store: Source of the stored features
+        thresholds: ExplainabilityEngine threshold overrides
+        analysis_ids / user_id / since: Optional selection filters
+        fuse_semantic: Fuse the Gemini scores as `_calculate_scores` does when
+            given a semantic analysis (the live pipeline scores acoustics only)
+        include_details: Also rebuild markers and recommendations for up to
+            MAX_DETAILED_SESSIONS sessions
+
+    Returns:
+        Dictionary with per-session scores (column arrays as lists), the
+        baseline scores and a per-score summary of the changes
+    """
+    features = feature_store.load_scalars(analysis_ids, user_id, since)
+    count = len(features['analysis_id'])
+
+    # One engine pair per language: the WPM thresholds depend on it, and
+    # the baseline must match the scores the analysis returned
+    tuned: Dict[str, ExplainabilityEngine] = {}
+    new_scores = {name: np.zeros(count) for name in SCORE_NAMES}
+    old_scores = {name: np.zeros(count) for name in SCORE_NAMES}
+    for language in sorted(set(features['language'])):
+        rows = features['language'] == language
+        subset = {name: column[rows] for name, column in features.items()}
+        tuned[language] = ExplainabilityEngine(thresholds, language=language)
+        new = tuned[language].calculate_scores_batch(subset, fuse_semantic)
+        old = ExplainabilityEngine(language=language).calculate_scores_batch(subset, fuse_semantic)
+        for name in SCORE_NAMES:
+            new_scores[name][rows] = new[name]
+            old_scores[name][rows] = old[name]
+
+    summary = {}
+    for name in SCORE_NAMES:
+        delta = new_scores[name] - old_scores[name]
+        summary[name] = {
+            'meanBefore': round(float(old_scores[name].mean()), 2) if len(delta) else 0.0,
+            'meanAfter': round(float(new_scores[name].mean()), 2) if len(delta) else 0.0,
+            'meanDelta': round(float(delta.mean()), 3) if len(delta) else 0.0,
+            'maxAbsDelta': round(float(np.abs(delta).max()), 2) if len(delta) else 0.0,
+            'changed': int(np.count_nonzero(delta)),
+        }
+
+    def effective(engine: ExplainabilityEngine) -> Dict:
+        return {name: getattr(engine, name) for name in ExplainabilityEngine.TUNABLE_THRESHOLDS}
+
+    result = {
+        'count': count,
+        # Default-language thresholds, plus those of each language selected
+        'thresholds': effective(ExplainabilityEngine(thresholds)),
+        'languageThresholds': {language: effective(engine) for language, engine in tuned.items()},
+        'analysisIds': features['analysis_id'].tolist(),
+        'languages': features['language'].tolist(),
+        'scores': {name: new_scores[name].tolist() for name in SCORE_NAMES},
+        'baselineScores': {name: old_scores[name].tolist() for name in SCORE_NAMES},
+        'summary': summary,
+    }
+
+    if include_details:
+        details = []
+        for analysis_id in features['analysis_id'][:MAX_DETAILED_SESSIONS]:
+            stored = feature_store.load(analysis_id)
+            engine = tuned.get(stored.language) or ExplainabilityEngine(thresholds, language=stored.language)
+            semantic = stored.gemini_result if fuse_semantic else None
+            report = engine.generate_report(stored.prosody, stored.fillers, stored.duration, semantic)
+            details.append({
+                'analysisId': analysis_id,
+                'scores': {name: getattr(report['scores'], name) for name in SCORE_NAMES},
+                'timelineMarkers': [vars(m) for m in report['timeline_markers']],
+                'recommendations': engine.merge_semantic_recommendations(
+                    report['recommendations'], stored.gemini_result
+                ),
+            })
+        result['details'] = details
+
+    return result
@@ -0,0 +1,227 @@
+"""
+Response Serialization Service
+Builds the analysis payload straight from the service dataclasses and
+encodes it as JSON or as a compact MessagePack document
+"""
+
+import json
+from typing import Dict, List, Optional
+
+import msgpack
+import numpy as np
+
+JSON_MEDIA_TYPE = 'application/json'
+MSGPACK_MEDIA_TYPE = 'application/x-msgpack'
+
+# Accept header values that select the binary encoding
+MSGPACK_ALIASES = ('application/x-msgpack', 'application/msgpack', 'application/vnd.msgpack')
+
+# Marker enums are dictionary-encoded as uint8 codes in the binary format
+MARKER_TYPES = ['filler', 'pause', 'fast', 'slow', 'confident', 'nervous']
+MARKER_SEVERITIES = ['low', 'medium', 'high']
+
+GEMINI_FIELDS = (
+    'content_score',
+    'structure_analysis',
+    'clarity_analysis',
+    'persuasion_analysis',
+    'sentiment_tone',
+    'key_improvements',
+    'positive_highlights',
+)
+
+
+def build_payload(
+    report: Dict,
+    fillers: List,
+    prosody,
+    recommendations: List[str],
+    transcription: Optional[str],
+    duration: float,
+    analyzed_at: str,
+    gemini_result: Optional[Dict] = None,
+    language: Optional[str] = None
+) -> Dict:
+    """
+    Build the `AnalysisResult` document as plain Python containers
+
+    Fields are read directly from the service dataclasses (`FillerWord`,
+    `ProsodyMetrics`, `TimelineMarker`) so no intermediate Pydantic objects
+    are created per marker or word.
+    """
+    scores = report['scores']
+    return {
+        'scores': {
+            'confidence': scores.confidence,
+            'clarity': scores.clarity,
+            'pacing': scores.pacing,
+            'nervousness': scores.nervousness,
+        },
+        'timelineMarkers': [
+            {
+                'start': m.start,
+                'end': m.end,
+                'type': m.type,
+                'severity': m.severity,
+                'color': m.color,
+                'label': m.label,
+                'reason': m.reason,
+            }
+            for m in report['timeline_markers']
+        ],
+        'fillerWords': [
+            {'word': f.word, 'start': f.start, 'end': f.end, 'confidence': f.confidence}
+            for f in fillers
+        ],
+        'prosodyMetrics': {
+            'pitchMean': prosody.pitch_mean,
+            'pitchStd': prosody.pitch_std,
+            'tempoBpm': prosody.tempo_bpm,
+            'pauseCount': prosody.pause_count,
+            'pauseLocations': [float(p) for p in prosody.pause_locations],
+            'energyVariance': prosody.energy_variance,
+            'speechRateWpm': prosody.speech_rate_wpm,
+            'pitchContour': prosody.pitch_contour,
+            'energyContour': prosody.energy_contour,
+            'contourHopSeconds': prosody.contour_hop_seconds,
+        },
+        'recommendations': recommendations,
+        'transcription': transcription,
+        'duration': duration,
+        'analyzedAt': analyzed_at,
+        'language': language,
+        'geminiAnalysis': (
+            {k: gemini_result[k] for k in GEMINI_FIELDS if k in gemini_result}
+            if gemini_result else None
+        ),
+    }
+
+
+def negotiate(accept: Optional[str]) -> str:
+    """Pick the response media type from an Accept header (JSON by default)"""
+    if not accept:
+        return JSON_MEDIA_TYPE
+
+    best, best_q = JSON_MEDIA_TYPE, 0.0
+    for part in accept.split(','):
+        media_type, _, params = part.strip().partition(';')
+        q = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        media_type = media_type.strip().lower()
+        if media_type in MSGPACK_ALIASES and q > best_q:
+            best, best_q = MSGPACK_MEDIA_TYPE, q
+        elif media_type in (JSON_MEDIA_TYPE, '*/*', 'application/*') and q > best_q:
+            best, best_q = JSON_MEDIA_TYPE, q
+    return best
+
+
+def encode(payload: Dict, media_type: str) -> bytes:
+    """Encode a payload for the negotiated media type"""
+    if media_type == MSGPACK_MEDIA_TYPE:
+        return encode_msgpack(payload)
+    return encode_json(payload)
+
+
+def encode_json(payload: Dict) -> bytes:
+    """Compact JSON encoding (no whitespace, UTF-8)"""
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _f32(values) -> bytes:
+    return np.asarray(values, dtype='<f4').tobytes()
+
+
+def _codes(values: List[str], table: List[str]) -> bytes:
+    index = {name: i for i, name in enumerate(table)}
+    return np.fromiter((index[v] for v in values), dtype=np.uint8, count=len(values)).tobytes()
+
+
+def encode_msgpack(payload: Dict) -> bytes:
+    """
+    Binary encoding with column-oriented, typed-array timelines
+
+    Numeric arrays become little-endian float32 byte strings, marker
+    type/severity become uint8 codes into `MARKER_TYPES`/`MARKER_SEVERITIES`,
+    and colors are sent once per marker type.
+    """
+    markers = payload['timelineMarkers']
+    words = payload['fillerWords']
+    prosody = payload['prosodyMetrics']
+
+    doc = dict(payload)
+    doc['timelineMarkers'] = {
+        'start': _f32([m['start'] for m in markers]),
+        'end': _f32([m['end'] for m in markers]),
+        'type': _codes([m['type'] for m in markers], MARKER_TYPES),
+        'severity': _codes([m['severity'] for m in markers], MARKER_SEVERITIES),
+        'label': [m['label'] for m in markers],
+        'reason': [m['reason'] for m in markers],
+        'colors': {m['type']: m['color'] for m in markers},
+    }
+    doc['fillerWords'] = {
+        'word': [w['word'] for w in words],
+        'start': _f32([w['start'] for w in words]),
+        'end': _f32([w['end'] for w in words]),
+        'confidence': _f32([w['confidence'] for w in words]),
+    }
+    doc['prosodyMetrics'] = dict(
+        prosody,
+        pauseLocations=_f32(prosody['pauseLocations']),
+        pitchContour=_f32(prosody['pitchContour']),
+        energyContour=_f32(prosody['energyContour']),
+    )
+    doc['encoding'] = {
+        'version': 1,
+        'arrays': 'float32-le',
+        'markerTypes': MARKER_TYPES,
+        'markerSeverities': MARKER_SEVERITIES,
+    }
+    return msgpack.packb(doc, use_bin_type=True)
+
+
+def decode_msgpack(data: bytes) -> Dict:
+    """Inverse of `encode_msgpack` (float arrays come back as float32 values)"""
+    doc = msgpack.unpackb(data, raw=False)
+    encoding = doc.pop('encoding')
+    types = encoding['markerTypes']
+    severities = encoding['markerSeverities']
+
+    def floats(buf: bytes) -> List[float]:
+        return np.frombuffer(buf, dtype='<f4').astype(float).tolist()
+
+    m = doc['timelineMarkers']
+    marker_types = [types[c] for c in np.frombuffer(m['type'], dtype=np.uint8)]
+    doc['timelineMarkers'] = [
+        {
+            'start': start,
+            'end': end,
+            'type': marker_type,
+            'severity': severities[severity],
+            'color': m['colors'][marker_type],
+            'label': label,
+            'reason': reason,
+        }
+        for start, end, marker_type, severity, label, reason in zip(
+            floats(m['start']), floats(m['end']), marker_types,
+            np.frombuffer(m['severity'], dtype=np.uint8), m['label'], m['reason']
+        )
+    ]
+
+    w = doc['fillerWords']
+    doc['fillerWords'] = [
+        {'word': word, 'start': start, 'end': end, 'confidence': confidence}
+        for word, start, end, confidence in zip(
+            w['word'], floats(w['start']), floats(w['end']), floats(w['confidence'])
+        )
+    ]
+
+    p = doc['prosodyMetrics']
+    for key in ('pauseLocations', 'pitchContour', 'energyContour'):
+        p[key] = floats(p[key])
+    return doc
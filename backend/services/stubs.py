@@ -0,0 +1,113 @@
+"""
+Local Stand-ins for Remote and Heavy Models
+Deterministic Gemini and Whisper replacements for load tests, selected with
+SPEAKEASY_GEMINI_STUB=1 / SPEAKEASY_ASR_STUB=1
+"""
+
+import json
+import os
+import random
+import time
+from types import SimpleNamespace
+
+from services.audio_io import probe_duration
+
+# Words cycled through by the stub transcript ('este' and 'bueno' are fillers)
+_STUB_WORDS = (
+    "hoy quiero hablarles sobre este proyecto que bueno nos ayuda a "
+    "comunicar mejor nuestras ideas en cada presentación"
+).split()
+
+
+def gemini_stub_enabled() -> bool:
+    return os.getenv("SPEAKEASY_GEMINI_STUB", "0") == "1"
+
+
+def asr_stub_enabled() -> bool:
+    return os.getenv("SPEAKEASY_ASR_STUB", "0") == "1"
+
+
+class _StubResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class StubGeminiModel:
+    """
+    Answers generate_content with a fixed analysis after a simulated delay
+
+    Latency is drawn from a log-normal around SPEAKEASY_GEMINI_STUB_LATENCY
+    seconds (default 1.5) so hedging and percentiles behave realistically.
+    """
+
+    def __init__(self):
+        self.median_latency = float(os.getenv("SPEAKEASY_GEMINI_STUB_LATENCY", "1.5"))
+        self.failure_rate = float(os.getenv("SPEAKEASY_GEMINI_STUB_FAILURE_RATE", "0"))
+
+    def generate_content(self, prompt, request_options=None):
+        time.sleep(self.median_latency * random.lognormvariate(0, 0.35))
+        if random.random() < self.failure_rate:
+            raise RuntimeError("Stub Gemini failure")
+        return _StubResponse(json.dumps({
+            "content_score": 7.0,
+            "semantic_clarity": 7.5,
+            "semantic_confidence": 6.5,
+            "structure_analysis": {
+                "has_intro": True, "has_body": True, "has_conclusion": False,
+                "feedback": "Estructura generada por el stub de pruebas."
+            },
+            "clarity_analysis": {"score": 7.5, "feedback": "Claridad simulada."},
+            "persuasion_analysis": {"detected_techniques": ["Anécdota"], "feedback": "Impacto simulado."},
+            "sentiment_tone": "Entusiasta",
+            "key_improvements": ["Añade un cierre explícito.", "Usa más ejemplos concretos."],
+            "positive_highlights": ["Buen ritmo general."]
+        }))
+
+
+class StubWhisperModel:
+    """
+    Whisper stand-in returning a synthetic transcript for the audio duration
+
+    Emits ~2.5 words per second in 5-second segments after a simulated
+    inference time of SPEAKEASY_ASR_STUB_RTF x duration (default 0.05).
+    """
+
+    is_multilingual = True
+    device = 'cpu'
+    dims = SimpleNamespace(n_mels=80)
+
+    def __init__(self, model_size: str):
+        self.model_size = model_size
+        self.real_time_factor = float(os.getenv("SPEAKEASY_ASR_STUB_RTF", "0.05"))
+        self.language = os.getenv("SPEAKEASY_ASR_STUB_LANGUAGE", "es")
+
+    def detect_language(self, mel):
+        return None, {self.language: 1.0}
+
+    def transcribe(self, audio, word_timestamps: bool = False, **kwargs):
+        duration = probe_duration(audio) if isinstance(audio, str) else len(audio) / 16000
+        duration = duration or 0.0
+        time.sleep(duration * self.real_time_factor)
+
+        segments, texts, index = [], [], 0
+        for seg_start in range(0, int(duration), 5):
+            seg_end = min(duration, seg_start + 5.0)
+            words = []
+            t = float(seg_start)
+            while t + 0.4 <= seg_end:
+                words.append({
+                    'word': ' ' + _STUB_WORDS[index % len(_STUB_WORDS)],
+                    'start': round(t, 2),
+                    'end': round(t + 0.3, 2),
+                    'probability': 0.9,
+                })
+                index += 1
+                t += 0.4
+            text = ''.join(w['word'] for w in words)
+            segment = {'id': len(segments), 'start': float(seg_start), 'end': seg_end, 'text': text}
+            if word_timestamps:
+                segment['words'] = words
+            segments.append(segment)
+            texts.append(text)
+
+        return {'text': ''.join(texts), 'segments': segments, 'language': kwargs.get('language') or self.language}
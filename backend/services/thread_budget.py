@@ -0,0 +1,182 @@
+"""
+Thread Budgeting
+Splits the CPU cores between concurrent analyses and caps the torch, BLAS
+/OpenMP and numba thread pools of each to its share
+"""
+
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+# Read by BLAS/OpenMP/numba when their pools start; set as well as the
+# runtime limits so late-initialized libraries and subprocesses agree
+THREAD_ENV_VARS = (
+    'OMP_NUM_THREADS',
+    'OPENBLAS_NUM_THREADS',
+    'MKL_NUM_THREADS',
+    'NUMEXPR_NUM_THREADS',
+    'NUMBA_NUM_THREADS',
+)
+
+
+@dataclass
+class ThreadBudget:
+    threads: int                                   # Threads per pool
+    cpus: List[int] = field(default_factory=list)  # CPU set to pin to (empty = no pinning)
+    torch_threads: int = 0                         # torch intra-op threads (0 = `threads`)
+
+
+def available_cpus() -> List[int]:
+    """Logical CPUs this process may run on"""
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def physical_cores(cpus: Optional[List[int]] = None) -> List[List[int]]:
+    """
+    Group logical CPUs into physical cores (SMT siblings together)
+
+    Reads the Linux sysfs topology; elsewhere every logical CPU is treated
+    as its own core.
+    """
+    cpus = cpus if cpus is not None else available_cpus()
+    cores: Dict[Tuple[str, str], List[int]] = {}
+    for cpu in cpus:
+        base = f"/sys/devices/system/cpu/cpu{cpu}/topology"
+        try:
+            with open(f"{base}/physical_package_id") as f:
+                package = f.read().strip()
+            with open(f"{base}/core_id") as f:
+                core = f.read().strip()
+        except OSError:
+            package, core = '0', f"cpu{cpu}"
+        cores.setdefault((package, core), []).append(cpu)
+    # Keep packages contiguous so a worker's cores share a socket
+    def order(item):
+        (package, _), group = item
+        return (int(package) if package.isdigit() else 0, min(group))
+
+    return [sorted(group) for _, group in sorted(cores.items(), key=order)]
+
+
+def plan_budgets(n_workers: int, pin: bool = False, use_smt: bool = False) -> List[ThreadBudget]:
+    """
+    Divide the available cores between `n_workers` concurrent analyses
+
+    Each worker gets an equal, contiguous share of physical cores (the
+    first workers get one more when they don't divide evenly). Threads per
+    pool equal the physical cores of the share, or its logical CPUs with
+    `use_smt`. With more workers than cores, each gets one thread and
+    workers share cores round-robin.
+
+    Args:
+        n_workers: Number of concurrent analyses
+        pin: Include the CPU set of each share (for sched_setaffinity)
+        use_smt: Count hyperthreads as extra threads
+    """
+    cores = physical_cores()
+    n_workers = max(1, n_workers)
+    budgets = []
+    if n_workers >= len(cores):
+        for i in range(n_workers):
+            budgets.append(ThreadBudget(1, list(cores[i % len(cores)]) if pin else []))
+        return budgets
+
+    base, extra = divmod(len(cores), n_workers)
+    start = 0
+    for i in range(n_workers):
+        share = cores[start:start + base + (1 if i < extra else 0)]
+        start += len(share)
+        cpus = [cpu for core in share for cpu in core]
+        budgets.append(ThreadBudget(len(cpus) if use_smt else len(share), cpus if pin else []))
+    return budgets
+
+
+def apply_budget(budget: ThreadBudget) -> Dict[str, object]:
+    """
+    Cap this process's thread pools (and pin it when the budget has CPUs)
+
+    The limits are process-wide; in a threaded server each analysis thread
+    gets its own OpenMP team of this size. Optional libraries that are
+    missing are skipped.
+
+    Returns:
+        What was applied, for logging
+    """
+    threads = max(1, budget.threads)
+    applied: Dict[str, object] = {'threads': threads}
+
+    for name in THREAD_ENV_VARS:
+        os.environ[name] = str(threads)
+
+    if budget.cpus and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, budget.cpus)
+        applied['cpus'] = budget.cpus
+
+    try:
+        import torch
+        torch.set_num_threads(max(1, budget.torch_threads or threads))
+        try:
+            # Only allowed before the first inter-op parallel work
+            torch.set_num_interop_threads(1)
+        except RuntimeError:
+            pass
+        applied['torch'] = torch.get_num_threads()
+    except ImportError:
+        pass
+
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(threads)
+        applied['blas'] = threads
+    except ImportError:
+        pass
+
+    try:
+        import numba
+        numba.set_num_threads(min(threads, numba.config.NUMBA_NUM_THREADS))
+        applied['numba'] = numba.get_num_threads()
+    except ImportError:
+        pass
+
+    return applied
+
+
+def budget_from_env(concurrent_analyses: int) -> Optional[ThreadBudget]:
+    """
+    Process-wide budget for a server running `concurrent_analyses` at once
+
+    SPEAKEASY_THREADS_PER_ANALYSIS: BLAS/OpenMP/numba threads of each
+    analysis's DSP stage: 'auto' (cores / concurrent analyses, default), a
+    number, or 'off' to leave the libraries' defaults.
+
+    SPEAKEASY_TORCH_THREADS: torch threads, 'auto' (default) or a number.
+    Whisper inference is serialized per model by its inference lock, so
+    only one ASR pass runs in the process at a time and 'auto' gives it
+    every physical core instead of a 1/N share.
+    """
+    setting = os.getenv("SPEAKEASY_THREADS_PER_ANALYSIS", "auto").strip().lower()
+    if setting == 'off':
+        return None
+    if setting == 'auto':
+        # Smallest share, so concurrent analyses never oversubscribe
+        threads = plan_budgets(concurrent_analyses)[-1].threads
+    else:
+        # OpenMP (BLAS) starts a team per calling thread, so the cap
+        # applies to each concurrent analysis
+        threads = max(1, min(len(available_cpus()), int(setting)))
+
+    torch_setting = os.getenv("SPEAKEASY_TORCH_THREADS", "auto").strip().lower()
+    if torch_setting == 'auto':
+        torch_threads = plan_budgets(1)[0].threads
+    else:
+        torch_threads = max(1, min(len(available_cpus()), int(torch_setting)))
+    return ThreadBudget(threads, torch_threads=torch_threads)
+
+
+def cpu_summary() -> str:
+    cores = physical_cores()
+    logical = sum(len(core) for core in cores)
+    return f"{len(cores)} cores / {logical} logical CPUs"
+
@@ -0,0 +1,206 @@
+"""
+Timeline Index
+Stores the timeline markers and filler words of each analysis as intervals
+so a time window of a long session can be read without loading the rest
+"""
+
+import json
+import math
+import sqlite3
+import threading
+from typing import Dict, Iterable, Optional
+
+from services.serialization import encode_json
+
+# Item kinds and the payload lists they come from
+TIMELINE_KINDS = {'marker': 'timelineMarkers', 'filler': 'fillerWords'}
+
+# Items are grouped by length: bucket 0 holds items up to 1 s, bucket b
+# items up to 4**b s
+BUCKET_BASE = 4
+
+
+def length_bucket(length: float) -> int:
+    return 0 if length <= 1.0 else math.ceil(math.log(length, BUCKET_BASE))
+
+
+class TimelineStore:
+    """
+    SQLite interval index over markers and filler words
+
+    Items are numbered (`seq`) in start-time order, grouped into length
+    buckets and indexed on (analysis_id, bucket, start_time, seq). An item
+    overlaps the window [t0, t1] when start <= t1 and end >= t0; since no
+    item of a bucket is longer than the bucket's stored maximum, its start
+    must lie in [t0 - max_length, t1]. The query is one index range scan
+    per bucket with the end condition checked on that range only, so a
+    single long marker widens the scan of its own (sparse) bucket rather
+    than of every item. Pages continue after the last `seq` returned, so
+    page size stays constant however long the session is.
+    """
+
+    def __init__(self, db_path: str = "speakeasy.db"):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            columns = {row['name'] for row in self._conn.execute("PRAGMA table_info(timeline_items)")}
+            if columns and 'bucket' not in columns:
+                # Index from before length buckets: rebuilt lazily from the
+                # stored results on first read
+                self._conn.executescript("""
+                    DROP TABLE timeline_items;
+                    DROP TABLE IF EXISTS timeline_spans;
+                """)
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS timeline_items (
+                    analysis_id TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    kind TEXT NOT NULL,
+                    bucket INTEGER NOT NULL,
+                    start_time REAL NOT NULL,
+                    end_time REAL NOT NULL,
+                    item TEXT NOT NULL,
+                    PRIMARY KEY (analysis_id, seq)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS idx_timeline_bucket_start
+                    ON timeline_items (analysis_id, bucket, start_time, seq);
+
+                CREATE TABLE IF NOT EXISTS timeline_spans (
+                    analysis_id TEXT PRIMARY KEY,
+                    item_count INTEGER NOT NULL,
+                    bucket_lengths TEXT NOT NULL,  -- JSON {bucket: longest item}
+                    duration REAL NOT NULL
+                );
+            """)
+
+    def save(self, analysis_id: str, payload: Dict):
+        """
+        Index the markers and filler words of an analysis payload
+        (replacing any earlier index of the same analysis)
+        """
+        with self._lock, self._conn:
+            self.write(self._conn, analysis_id, payload)
+
+    @staticmethod
+    def write(conn: sqlite3.Connection, analysis_id: str, payload: Dict):
+        """Index a payload on `conn`, inside the caller's transaction"""
+        items = sorted(
+            (
+                (float(item['start']), float(item['end']), kind, item)
+                for kind, key in TIMELINE_KINDS.items()
+                for item in payload.get(key) or []
+            ),
+            key=lambda row: (row[0], row[1])
+        )
+        rows = []
+        bucket_lengths: Dict[int, float] = {}
+        for seq, (start, end, kind, item) in enumerate(items):
+            length = max(0.0, end - start)
+            bucket = length_bucket(length)
+            bucket_lengths[bucket] = max(bucket_lengths.get(bucket, 0.0), length)
+            rows.append((analysis_id, seq, kind, bucket, start, end, encode_json({'kind': kind, **item}).decode()))
+
+        conn.execute("DELETE FROM timeline_items WHERE analysis_id = ?", (analysis_id,))
+        conn.executemany(
+            "INSERT INTO timeline_items (analysis_id, seq, kind, bucket, start_time, end_time, item) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            rows
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO timeline_spans (analysis_id, item_count, bucket_lengths, duration) "
+            "VALUES (?, ?, ?, ?)",
+            (analysis_id, len(rows), json.dumps(bucket_lengths), float(payload.get('duration') or 0.0))
+        )
+
+    def has(self, analysis_id: str) -> bool:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM timeline_spans WHERE analysis_id = ?", (analysis_id,)
+            ).fetchone() is not None
+
+    def query(
+        self,
+        analysis_id: str,
+        start: float = 0.0,
+        end: Optional[float] = None,
+        kinds: Optional[Iterable[str]] = None,
+        limit: int = 200,
+        cursor: Optional[int] = None
+    ) -> Optional[Dict]:
+        """
+        Items overlapping [start, end], in start-time order
+
+        Args:
+            analysis_id: Analysis to read
+            start: Window start in seconds
+            end: Window end in seconds (end of the session by default)
+            kinds: Restrict to these kinds ('marker', 'filler'); all by default
+            limit: Page size
+            cursor: `nextCursor` of the previous page
+
+        Returns:
+            Dictionary with the page of items and `nextCursor` (None on the
+            last page), or None for unknown analyses
+        """
+        kinds = list(kinds) if kinds else list(TIMELINE_KINDS)
+        unknown = set(kinds) - set(TIMELINE_KINDS)
+        if unknown:
+            raise ValueError(f"Unknown timeline kinds: {', '.join(sorted(unknown))}")
+
+        with self._lock:
+            span = self._conn.execute(
+                "SELECT * FROM timeline_spans WHERE analysis_id = ?", (analysis_id,)
+            ).fetchone()
+            if span is None:
+                return None
+
+            if end is None:
+                end = max(span['duration'], start)
+                upper = float('inf')  # Items may run slightly past the duration
+            else:
+                upper = end
+            floor = float('-inf')
+            after = -1
+            if cursor is not None:
+                last = self._conn.execute(
+                    "SELECT start_time FROM timeline_items WHERE analysis_id = ? AND seq = ?",
+                    (analysis_id, cursor)
+                ).fetchone()
+                if last is None:
+                    raise ValueError("Invalid cursor")
+                # Earlier starts were all returned by previous pages
+                floor = last['start_time']
+                after = cursor
+
+            # One start-time range per length bucket
+            ranges, params = [], []
+            for bucket, max_length in json.loads(span['bucket_lengths']).items():
+                ranges.append(
+                    "SELECT seq, start_time, item FROM timeline_items "
+                    "WHERE analysis_id = ? AND bucket = ? AND start_time BETWEEN ? AND ? "
+                    # Unary + keeps the planner on the bucket/start index
+                    f"AND end_time >= ? AND +seq > ? AND kind IN ({', '.join('?' * len(kinds))})"
+                )
+                params.extend((analysis_id, int(bucket), max(start - max_length, floor), upper,
+                               start, after, *kinds))
+            rows = self._conn.execute(
+                " UNION ALL ".join(ranges) + " ORDER BY start_time, seq LIMIT ?",
+                (*params, limit + 1)
+            ).fetchall() if ranges else []
+
+        page = rows[:limit]
+        return {
+            'analysisId': analysis_id,
+            'start': start,
+            'end': end,
+            'duration': span['duration'],
+            'itemCount': span['item_count'],
+            'items': [json.loads(row['item']) for row in page],
+            'nextCursor': page[-1]['seq'] if len(rows) > limit else None,
+        }
+
+    def close(self):
+        self._conn.close()
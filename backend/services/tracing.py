@@ -0,0 +1,275 @@
+"""
+Request Tracing
+Per-request traces made of timed spans (pipeline stages and sub-stages with
+their attributes), handed to pluggable exporters when the request ends, to
+explain individual slow requests without external services
+"""
+
+import json
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import wraps
+from typing import Callable, Dict, Iterator, List, Optional
+
+# Wall-clock offset of perf_counter, so spans time with the monotonic clock
+# and still report absolute start times
+_EPOCH_OFFSET = time.time() - time.perf_counter()
+
+
+class _Trace:
+    """Finished spans of one trace, collected from any thread"""
+
+    def __init__(self, trace_id: str):
+        self.trace_id = trace_id
+        self.spans: List["Span"] = []
+        self.closed = False
+        self._lock = threading.Lock()
+
+    def add(self, span: "Span"):
+        with self._lock:
+            if not self.closed:  # e.g. a losing hedged call finishing late
+                self.spans.append(span)
+
+    def close(self) -> List["Span"]:
+        with self._lock:
+            self.closed = True
+            return self.spans
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: Optional[str]
+    span_id: str
+    parent_id: Optional[str]
+    start: float                    # perf_counter() at start
+    end: Optional[float] = None
+    attributes: Dict = field(default_factory=dict)
+    error: Optional[str] = None
+    _trace: Optional[_Trace] = field(default=None, repr=False, compare=False)
+
+    def set(self, **attributes):
+        """Add or overwrite attributes"""
+        self.attributes.update(attributes)
+
+    @property
+    def duration(self) -> Optional[float]:
+        return None if self.end is None else self.end - self.start
+
+    def to_dict(self) -> Dict:
+        return {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'parentId': self.parent_id,
+            'name': self.name,
+            'startTime': self.start + _EPOCH_OFFSET,
+            'durationMs': None if self.end is None else round((self.end - self.start) * 1000, 3),
+            'attributes': self.attributes,
+            'error': self.error,
+        }
+
+
+class SpanExporter:
+    """Receives the spans of each finished trace (root span last)"""
+
+    def export(self, spans: List[Span]):
+        raise NotImplementedError
+
+    def shutdown(self):
+        pass
+
+
+class InMemoryExporter(SpanExporter):
+    """Keeps the most recent traces for GET /api/traces/{trace_id}"""
+
+    def __init__(self, max_traces: int = 200):
+        self.max_traces = max_traces
+        self._traces: "OrderedDict[str, List[Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]):
+        if not spans:
+            return
+        trace_id = spans[-1].trace_id
+        with self._lock:
+            self._traces[trace_id] = [span.to_dict() for span in spans]
+            self._traces.move_to_end(trace_id)
+            while len(self._traces) > self.max_traces:
+                self._traces.popitem(last=False)
+
+    def get(self, trace_id: str) -> Optional[List[Dict]]:
+        with self._lock:
+            return self._traces.get(trace_id)
+
+    def trace_ids(self) -> List[str]:
+        """Retained trace ids, most recent first"""
+        with self._lock:
+            return list(reversed(self._traces))
+
+
+class JsonlFileExporter(SpanExporter):
+    """Appends one JSON line per span to a local file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]):
+        lines = ''.join(json.dumps(span.to_dict(), ensure_ascii=False, default=str) + '\n' for span in spans)
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(lines)
+
+
+# Exporters selectable with SPEAKEASY_TRACE_EXPORTER; register_exporter adds more
+EXPORTERS: Dict[str, Callable[[], SpanExporter]] = {
+    'memory': lambda: InMemoryExporter(int(os.getenv("SPEAKEASY_TRACE_MAX_TRACES", "200"))),
+    'file': lambda: JsonlFileExporter(os.getenv("SPEAKEASY_TRACE_FILE", "traces.jsonl")),
+}
+
+
+def register_exporter(name: str, factory: Callable[[], SpanExporter]):
+    EXPORTERS[name] = factory
+
+
+def exporters_from_env() -> List[SpanExporter]:
+    """
+    Exporters named in SPEAKEASY_TRACE_EXPORTER (comma-separated,
+    default 'memory'; 'none' disables tracing)
+    """
+    names = [n.strip() for n in os.getenv("SPEAKEASY_TRACE_EXPORTER", "memory").split(',') if n.strip()]
+    unknown = [n for n in names if n != 'none' and n not in EXPORTERS]
+    if unknown:
+        raise ValueError(f"Unknown trace exporter(s): {', '.join(unknown)}")
+    return [EXPORTERS[n]() for n in names if n != 'none']
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("speakeasy_current_span", default=None)
+
+
+class Tracer:
+    """
+    Span bookkeeping on context variables
+
+    The current span follows asyncio tasks and run_in_threadpool calls
+    (both copy the context); plain thread pools need `bind`. Outside a
+    trace (or with no exporters) spans are detached and never exported,
+    so instrumented code needs no checks.
+    """
+
+    def __init__(self, exporters: Optional[List[SpanExporter]] = None):
+        self.exporters: List[SpanExporter] = exporters or []
+
+    def configure(self, exporters: List[SpanExporter]):
+        for exporter in self.exporters:
+            exporter.shutdown()
+        self.exporters = exporters
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.exporters)
+
+    def exporter(self, kind: type) -> Optional[SpanExporter]:
+        """First configured exporter of a class (e.g. InMemoryExporter)"""
+        return next((e for e in self.exporters if isinstance(e, kind)), None)
+
+    @staticmethod
+    def current() -> Optional[Span]:
+        return _current_span.get()
+
+    def current_trace_id(self) -> Optional[str]:
+        span = _current_span.get()
+        return span.trace_id if span else None
+
+    def set_attributes(self, **attributes):
+        """Add attributes to the current span (no-op outside a trace)"""
+        span = _current_span.get()
+        if span is not None:
+            span.set(**attributes)
+
+    @contextmanager
+    def trace(self, name: str, **attributes) -> Iterator[Span]:
+        """Root span of a new trace; exports the whole trace when it ends"""
+        if not self.enabled:
+            yield Span(name, None, '', None, time.perf_counter(), attributes=attributes)
+            return
+        trace = _Trace(secrets.token_hex(16))
+        span = Span(name, trace.trace_id, secrets.token_hex(8), None, time.perf_counter(),
+                    attributes=attributes, _trace=trace)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.end = time.perf_counter()
+            _current_span.reset(token)
+            spans = trace.close()
+            spans.append(span)
+            self._export(spans)
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Span]:
+        """Child span of the current span"""
+        parent = _current_span.get()
+        if parent is None or parent._trace is None:
+            yield Span(name, None, '', None, time.perf_counter(), attributes=attributes)
+            return
+        span = Span(name, parent.trace_id, secrets.token_hex(8), parent.span_id, time.perf_counter(),
+                    attributes=attributes, _trace=parent._trace)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.end = time.perf_counter()
+            _current_span.reset(token)
+            parent._trace.add(span)
+
+    def record(self, name: str, start: float, end: Optional[float] = None, **attributes) -> float:
+        """
+        Record a finished span under the current span
+
+        For work timed with perf_counter() rather than wrapped in `span`
+        (waits, or totals accumulated over blocks).
+
+        Returns:
+            Duration in seconds
+        """
+        end = time.perf_counter() if end is None else end
+        parent = _current_span.get()
+        if parent is not None and parent._trace is not None:
+            parent._trace.add(Span(name, parent.trace_id, secrets.token_hex(8), parent.span_id,
+                                   start, end, attributes))
+        return end - start
+
+    def bind(self, fn: Callable) -> Callable:
+        """Wrap `fn` to run under the current span in another thread"""
+        parent = _current_span.get()
+
+        @wraps(fn)
+        def run(*args, **kwargs):
+            token = _current_span.set(parent)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _current_span.reset(token)
+        return run
+
+    def _export(self, spans: List[Span]):
+        for exporter in self.exporters:
+            try:
+                exporter.export(spans)
+            except Exception as e:
+                print(f"Trace export failed ({type(exporter).__name__}): {e}")
+
+
+tracer = Tracer()
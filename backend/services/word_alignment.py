@@ -0,0 +1,170 @@
+"""
+Selective Word Alignment
+Adds Whisper word timestamps to chosen decoding windows of a finished
+transcription, so only the windows whose words are needed pay for alignment
+"""
+
+from typing import Callable, Dict, List, Optional, Tuple
+
+import torch
+import whisper
+from whisper.audio import N_FRAMES, N_SAMPLES
+from whisper.timing import add_word_timestamps
+from whisper.tokenizer import get_tokenizer
+from whisper.utils import get_end
+
+
+def _lead_words(segments: List[dict]) -> List[dict]:
+    """
+    Words whose times depend on the speech end before the window
+
+    Whisper shortens the first two words of a segment when they follow a
+    long pause, measured from the end of the previous segment. A segment
+    of one or two words passes that dependence on to the next segment.
+    """
+    words = []
+    for segment in segments:
+        if not segment['words']:
+            continue
+        words.extend(segment['words'][:2])
+        if len(segment['words']) > 2:
+            break
+    return words
+
+
+def _end_depends_on_previous(segments: List[dict]) -> bool:
+    """Whether the window's last word end depends on the speech end before it"""
+    spoken = [segment for segment in segments if segment['words']]
+    return bool(spoken) and all(len(segment['words']) <= 2 for segment in spoken)
+
+
+class WindowAligner:
+    """
+    Word alignment of the 30-second windows of one transcription
+
+    transcribe(word_timestamps=True) aligns every window right after
+    decoding it. Here the transcription runs without alignment and windows
+    are aligned afterwards from the same inputs: the window's segments and
+    tokens, the same slice of the log-Mel spectrogram and the end of the
+    speech before the window. That last value is the only one carried
+    across windows; when it can change a requested word, it is resolved
+    exactly by aligning the preceding windows it depends on (usually one).
+
+    `align_all` is the reference that aligns every window; `matching_words`
+    returns the same times for the words it is asked for. Whisper's own
+    word-timestamp path also re-seeks each window to the last aligned word,
+    so its windows (and text) can differ; both paths here share the windows
+    of the plain transcription.
+
+    Not thread-safe: hold the model's inference lock while aligning.
+    """
+
+    def __init__(self, model, audio, segments: List[dict], language: str):
+        self.model = model
+        self.audio = audio
+        self.windows: List[Tuple[int, List[dict]]] = []
+        for segment in segments:
+            if not self.windows or self.windows[-1][0] != segment['seek']:
+                self.windows.append((segment['seek'], []))
+            self.windows[-1][1].append(segment)
+
+        self.alignments = 0  # add_word_timestamps calls (for logging/metrics)
+        self._tokenizer = get_tokenizer(
+            model.is_multilingual,
+            num_languages=model.num_languages,
+            language=language,
+            task='transcribe'
+        )
+        # Same precision transcribe() decodes and aligns with
+        self._dtype = torch.float16 if str(model.device).startswith('cuda') else torch.float32
+        self._mel: Optional[torch.Tensor] = None
+        self._exact_end_after: Dict[int, float] = {}
+
+    def __len__(self) -> int:
+        return len(self.windows)
+
+    def has_text(self, index: int) -> bool:
+        eot = self._tokenizer.eot
+        return any(token < eot for segment in self.windows[index][1] for token in segment['tokens'])
+
+    def window_text(self, index: int) -> str:
+        return ' '.join(segment['text'] for segment in self.windows[index][1])
+
+    def align_all(self) -> List[List[dict]]:
+        """Every window aligned in order (the full-alignment reference)"""
+        aligned, last_speech = [], 0.0
+        for index in range(len(self.windows)):
+            segments = self._align(index, last_speech) if self.has_text(index) else self._unaligned(index)
+            last_speech = get_end(segments)
+            self._exact_end_after[index] = last_speech
+            aligned.append(segments)
+        return aligned
+
+    def matching_words(self, index: int, match: Callable[[dict], bool]) -> List[dict]:
+        """
+        Words of window `index` accepted by `match`, with the same times
+        `align_all` gives them
+        """
+        if not self.has_text(index):
+            return []
+        last_speech, exact = self._end_before(index)
+        segments = self._align(index, last_speech)
+        if not exact and any(match(word) for word in _lead_words(segments)):
+            segments = self._align(index, self._exact_end_before(index))
+            exact = True
+        if exact or not _end_depends_on_previous(segments):
+            self._exact_end_after[index] = get_end(segments)
+        return [word for segment in segments for word in segment['words'] if match(word)]
+
+    def _end_before(self, index: int) -> Tuple[float, bool]:
+        """Speech end before window `index`: (value, whether it is exact)"""
+        if index == 0:
+            return 0.0, True
+        if index - 1 in self._exact_end_after:
+            return self._exact_end_after[index - 1], True
+        if not self.has_text(index - 1):
+            return self._exact_end_before(index), True
+        # Unaligned estimate: end of the previous window's last segment
+        return self.windows[index - 1][1][-1]['end'], False
+
+    def _exact_end_before(self, index: int) -> float:
+        return 0.0 if index == 0 else self._exact_end(index - 1)
+
+    def _exact_end(self, index: int) -> float:
+        """Exact speech end after window `index` (aligning what it depends on)"""
+        if index not in self._exact_end_after:
+            if not self.has_text(index):
+                segments = self._unaligned(index)
+            else:
+                last_speech, exact = self._end_before(index)
+                segments = self._align(index, last_speech)
+                if not exact and _end_depends_on_previous(segments):
+                    segments = self._align(index, self._exact_end_before(index))
+            self._exact_end_after[index] = get_end(segments)
+        return self._exact_end_after[index]
+
+    def _unaligned(self, index: int) -> List[dict]:
+        return [{**segment, 'words': []} for segment in self.windows[index][1]]
+
+    def _align(self, index: int, last_speech: float) -> List[dict]:
+        """Align one window (on copies of its segments)"""
+        if self._mel is None:
+            # Whole-signal spectrogram as in transcribe(): its log scale is
+            # clamped against the global maximum
+            self._mel = whisper.log_mel_spectrogram(self.audio, self.model.dims.n_mels, padding=N_SAMPLES)
+        seek, window = self.windows[index]
+        content_frames = self._mel.shape[-1] - N_FRAMES
+        segment_size = min(N_FRAMES, content_frames - seek)
+        mel_segment = whisper.pad_or_trim(self._mel[:, seek:seek + segment_size], N_FRAMES)
+
+        segments = [dict(segment) for segment in window]
+        add_word_timestamps(
+            segments=segments,
+            model=self.model,
+            tokenizer=self._tokenizer,
+            mel=mel_segment.to(self.model.device).to(self._dtype),
+            num_frames=segment_size,
+            last_speech_timestamp=last_speech,
+        )
+        self.alignments += 1
+        return segments
@@ -0,0 +1,38 @@
+import os
+
+from services.job_queue import JobQueue
+from worker import _record_failure
+
+
+def test_failure_after_lost_lease_keeps_upload(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"))
+    audio_path = tmp_path / "upload.m4a"
+    audio_path.write_bytes(b"audio")
+    job_id = queue.enqueue(str(audio_path), "user")
+
+    # The first worker's lease expires at once, so a second worker re-claims the job
+    first = queue.claim("worker-a", visibility_timeout=0)
+    second = queue.claim("worker-b", visibility_timeout=60)
+    assert first.id == second.id == job_id
+
+    assert queue.fail(job_id, "worker-a", "boom") is None
+    _record_failure(queue, first, "worker-a", "boom", lease_lost=False)
+
+    assert os.path.exists(audio_path)
+    job = queue.get(job_id)
+    assert job.status == "running"
+    assert job.worker_id == "worker-b"
+    assert job.error is None
+
+
+def test_failure_on_last_attempt_removes_upload(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"), max_attempts=1)
+    audio_path = tmp_path / "upload.m4a"
+    audio_path.write_bytes(b"audio")
+    job_id = queue.enqueue(str(audio_path), "user")
+
+    job = queue.claim("worker-a", visibility_timeout=60)
+    _record_failure(queue, job, "worker-a", "boom", lease_lost=False)
+
+    assert not os.path.exists(audio_path)
+    assert queue.get(job_id).status == "failed"
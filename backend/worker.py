@@ -0,0 +1,189 @@
+"""
+SpeakEasy Coach - Analysis Worker
+Claims jobs from the shared job queue, runs the analysis pipeline and
+stores the result for the API node (SPEAKEASY_MODE=api)
+
+Usage:
+    cd backend
+    python worker.py --worker-id node1-a
+    python worker.py --processes 4 --pin-cpus    # one process per core group
+"""
+
+import argparse
+import multiprocessing
+import os
+import socket
+import threading
+import time
+import traceback
+import uuid
+
+from dotenv import load_dotenv
+
+from services.feature_store import FeatureStore
+from services.history_store import HistoryStore
+from services.job_queue import Job, JobQueue
+from services.timeline_store import TimelineStore
+from services.pipeline import analyze_file, persist_analysis
+from services.serialization import encode_json
+from services.thread_budget import ThreadBudget, apply_budget, cpu_summary, plan_budgets
+from services.tracing import InMemoryExporter, exporters_from_env, tracer
+
+load_dotenv()
+
+
+class Heartbeat(threading.Thread):
+    """Keeps a job's lease alive while the analysis runs"""
+
+    def __init__(self, queue: JobQueue, job_id: str, worker_id: str, visibility_timeout: float):
+        super().__init__(daemon=True)
+        self.queue = queue
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.visibility_timeout = visibility_timeout
+        self.lost = False
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.visibility_timeout / 3):
+            if not self.queue.heartbeat(self.job_id, self.worker_id, self.visibility_timeout):
+                self.lost = True  # Lease expired and the job was re-claimed
+                return
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def run_worker(
+    worker_id: str,
+    queue: JobQueue,
+    history_store: HistoryStore,
+    feature_store: FeatureStore,
+    timeline_store: TimelineStore,
+    visibility_timeout: float = 120.0,
+    poll_seconds: float = 1.0,
+    max_jobs: int = 0
+):
+    """
+    Process jobs until interrupted (or until `max_jobs` jobs when > 0)
+    """
+    print(f"Worker {worker_id} polling {queue.db_path}")
+    processed = 0
+    while not max_jobs or processed < max_jobs:
+        job = queue.claim(worker_id, visibility_timeout)
+        if job is None:
+            time.sleep(poll_seconds)
+            continue
+
+        print(f"[{worker_id}] Job {job.id} attempt {job.attempts}/{job.max_attempts}: {job.audio_path}")
+        heartbeat = Heartbeat(queue, job.id, worker_id, visibility_timeout)
+        heartbeat.start()
+        start = time.perf_counter()
+        try:
+            with tracer.trace('job', job_id=job.id, attempt=job.attempts, worker_id=worker_id) as span:
+                output = analyze_file(job.audio_path)
+                # The job id is the analysis id: a retry after a partial or
+                # discarded attempt doesn't save the session twice
+                span.set(analysis_id=persist_analysis(
+                    output, job.user_id, history_store, feature_store, timeline_store,
+                    analysis_id=job.id
+                ))
+            heartbeat.stop()
+            if heartbeat.lost or not queue.complete(job.id, worker_id, encode_json(output.payload)):
+                print(f"[{worker_id}] Lost lease on job {job.id}; result discarded")
+            else:
+                print(f"[{worker_id}] Job {job.id} done in {time.perf_counter() - start:.1f}s")
+                _remove(job.audio_path)
+        except Exception as e:
+            heartbeat.stop()
+            print(f"[{worker_id}] Job {job.id} failed: {e}\n{traceback.format_exc()}")
+            _record_failure(queue, job, worker_id, str(e) or type(e).__name__, heartbeat.lost)
+        processed += 1
+
+
+def _record_failure(queue: JobQueue, job: Job, worker_id: str, error: str, lease_lost: bool):
+    """
+    Record a failed attempt, removing the upload only once the job is given up
+
+    After a lost lease another worker may be analyzing the same file, so it
+    is kept unless this worker's update actually failed the job.
+    """
+    if lease_lost:
+        print(f"[{worker_id}] Lost lease on job {job.id}; failure not recorded")
+        return
+    status = queue.fail(job.id, worker_id, error)
+    if status is None:
+        print(f"[{worker_id}] Lost lease on job {job.id}; failure not recorded")
+    elif status == 'failed':
+        _remove(job.audio_path)
+
+
+def _remove(path: str):
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def _run(args: argparse.Namespace, worker_id: str, budget: ThreadBudget):
+    """Worker process entry point: apply the thread budget, then poll"""
+    print(f"[{worker_id}] Thread budget: {apply_budget(budget)}")
+    # Job traces (joined to the API node's by job_id); nothing reads
+    # in-memory traces on a worker
+    tracer.configure([e for e in exporters_from_env() if not isinstance(e, InMemoryExporter)])
+    run_worker(
+        worker_id,
+        JobQueue(args.queue),
+        HistoryStore(args.db),
+        FeatureStore(args.db),
+        TimelineStore(args.db),
+        visibility_timeout=args.visibility_timeout,
+        poll_seconds=args.poll,
+        max_jobs=args.max_jobs
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SpeakEasy Coach analysis worker")
+    parser.add_argument('--worker-id', default=f"{socket.gethostname()}-{uuid.uuid4().hex[:6]}")
+    parser.add_argument('--queue', default=os.getenv("SPEAKEASY_QUEUE_PATH", "jobs.db"))
+    parser.add_argument('--db', default=os.getenv("SPEAKEASY_DB_PATH", "speakeasy.db"))
+    parser.add_argument('--visibility-timeout', type=float, default=120.0,
+                        help="Lease length in seconds (renewed every third of it)")
+    parser.add_argument('--poll', type=float, default=1.0, help="Idle poll interval in seconds")
+    parser.add_argument('--max-jobs', type=int, default=0, help="Exit after N jobs (0 = run forever)")
+    parser.add_argument('--processes', type=int, default=1,
+                        help="Worker processes on this node, each with its own share of the cores")
+    parser.add_argument('--threads', type=int, default=0,
+                        help="torch/BLAS/numba threads per process (0 = its share of physical cores)")
+    parser.add_argument('--pin-cpus', action='store_true', help="Pin each process to its share of the cores")
+    parser.add_argument('--smt', action='store_true', help="Count hyperthreads in the thread budget")
+    args = parser.parse_args()
+
+    budgets = plan_budgets(args.processes, pin=args.pin_cpus, use_smt=args.smt)
+    if args.threads:
+        for budget in budgets:
+            budget.threads = args.threads
+    print(f"{cpu_summary()}; {args.processes} worker process(es)")
+
+    if args.processes == 1:
+        _run(args, args.worker_id, budgets[0])
+        return
+
+    # Spawned (not forked) so each process initializes its own pools
+    context = multiprocessing.get_context('spawn')
+    processes = [
+        context.Process(target=_run, args=(args, f"{args.worker_id}-{i}", budget), name=f"worker-{i}")
+        for i, budget in enumerate(budgets)
+    ]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+
+
+if __name__ == '__main__':
+    main()
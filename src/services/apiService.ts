@@ -4,7 +4,7 @@
  */
 
 import { Platform } from "react-native";
-import type { AnalysisResult } from "../types";
+import type { AnalysisResult, CaptureFormat, TimelinePage } from "../types";
 
 // Platform-specific API URL
 const getApiBaseUrl = () => {
@@ -82,6 +82,44 @@ export class ApiService {
     }
   }
 
+  /**
+   * Markers and filler words overlapping a time window of a stored analysis
+   */
+  static async getTimeline(
+    analysisId: string,
+    start: number,
+    end: number,
+    options: { kinds?: ("marker" | "filler")[]; limit?: number; cursor?: number } = {},
+  ): Promise<TimelinePage> {
+    const params = new URLSearchParams({
+      start: String(start),
+      end: String(end),
+    });
+    if (options.kinds?.length) params.set("kind", options.kinds.join(","));
+    if (options.limit) params.set("limit", String(options.limit));
+    if (options.cursor !== undefined) params.set("cursor", String(options.cursor));
+
+    const response = await fetch(
+      `${API_BASE_URL}/api/analyses/${analysisId}/timeline?${params}`,
+    );
+    if (!response.ok) {
+      throw new Error((await response.text()) || "No se pudo cargar la línea de tiempo");
+    }
+    return response.json();
+  }
+
+  /**
+   * Recording format the server decodes fastest (mono 16 kHz Opus or PCM)
+   */
+  static async getCaptureFormat(): Promise<CaptureFormat | null> {
+    try {
+      const response = await fetch(`${API_BASE_URL}/api/capture-format`);
+      return response.ok ? await response.json() : null;
+    } catch {
+      return null;
+    }
+  }
+
   /**
    * Health check
    */
@@ -14,6 +14,9 @@ export interface ProsodyMetrics {
   pauseLocations: number[]; // Timestamps in seconds
   energyVariance: number;
   speechRateWpm: number;
+  pitchContour?: number[]; // Downsampled pitch in Hz (0 = unvoiced)
+  energyContour?: number[]; // Downsampled normalized energy (0-1)
+  contourHopSeconds?: number; // Seconds between contour points
 }
 
 export interface FillerWord {
@@ -49,6 +52,41 @@ export interface AnalysisResult {
   transcription?: string;
   duration: number;
   analyzedAt: string;
+  analysisId?: string; // Server-side history id
+  language?: string; // Detected spoken language ('es', 'en')
+}
+
+// Marker or filler word from GET /api/analyses/{id}/timeline
+export type TimelineItem =
+  | ({ kind: "marker" } & TimelineMarker)
+  | ({ kind: "filler" } & FillerWord);
+
+export interface TimelinePage {
+  analysisId: string;
+  start: number;
+  end: number;
+  duration: number;
+  itemCount: number; // Items in the whole analysis
+  items: TimelineItem[];
+  nextCursor: number | null; // Pass back as `cursor` for the next page
+}
+
+export interface AudioFormat {
+  container: string; // 'ogg', 'wav'
+  codec: string; // 'opus', 'pcm_s16le'
+  mimeType: string;
+  extension: string;
+  sampleRate: number; // Hz
+  channels: number;
+  bitRate: number; // bits/s
+}
+
+// Recording format advertised by GET /api/capture-format
+export interface CaptureFormat {
+  preferred: AudioFormat;
+  alternatives: AudioFormat[];
+  maxUploadMb: number;
+  maxDurationSeconds: number;
 }
 
 export interface Recording {